@@ -20,6 +20,9 @@ import app.models.user
 import app.models.product
 import app.models.cart
 import app.models.order
+import app.models.job
+import app.models.sales
+import app.models.delivery
 
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
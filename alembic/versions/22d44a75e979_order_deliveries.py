@@ -0,0 +1,40 @@
+"""order_deliveries: delivery address, coordinates and window for the route planner
+
+Revision ID: 22d44a75e979
+Revises: 96188be10097
+Create Date: 2026-10-17 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '22d44a75e979'
+down_revision: Union[str, Sequence[str], None] = '96188be10097'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'order_deliveries',
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('address', sa.String(), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('window_start', sa.DateTime(), nullable=True),
+        sa.Column('window_end', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.PrimaryKeyConstraint('order_id'),
+    )
+    op.create_index('ix_order_deliveries_window_start', 'order_deliveries', ['window_start'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('order_deliveries')
@@ -0,0 +1,111 @@
+"""baseline schema: users, product drafts, channel posts, cart, orders
+
+Revision ID: 2fd918303539
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2fd918303539'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLES = ('client', 'worker', 'admin', 'leader')
+ORDER_STATUSES = ('reserved', 'processing', 'processed', 'handed_to_courier', 'in_delivery', 'delivered', 'cancelled')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('phone', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('full_name', sa.String(), nullable=True),
+        sa.Column('role', sa.Enum(*ROLES, name='roleenum'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('blacklisted', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_phone', 'users', ['phone'], unique=True)
+
+    op.create_table(
+        'product_drafts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('creator_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('image_path', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('published', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['creator_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_product_drafts_id', 'product_drafts', ['id'])
+
+    op.create_table(
+        'channel_posts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('draft_id', sa.Integer(), nullable=False),
+        sa.Column('posted_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['draft_id'], ['product_drafts.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_channel_posts_id', 'channel_posts', ['id'])
+
+    op.create_table(
+        'cart_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('draft_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('added_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['draft_id'], ['product_drafts.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_cart_items_id', 'cart_items', ['id'])
+
+    op.create_table(
+        'orders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=True),
+        sa.Column('status', sa.Enum(*ORDER_STATUSES, name='orderstatus'), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_orders_id', 'orders', ['id'])
+
+    op.create_table(
+        'order_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('draft_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['draft_id'], ['product_drafts.id']),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_order_items_id', 'order_items', ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('order_items', 'orders', 'cart_items', 'channel_posts', 'product_drafts', 'users'):
+        op.drop_table(table)
+    bind = op.get_bind()
+    sa.Enum(name='orderstatus').drop(bind, checkfirst=True)
+    sa.Enum(name='roleenum').drop(bind, checkfirst=True)
@@ -0,0 +1,33 @@
+"""product_drafts.sku and unique (creator_id, sku) for the catalog importer
+
+Revision ID: 3e262c2256da
+Revises: 2fd918303539
+Create Date: 2026-10-17 09:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e262c2256da'
+down_revision: Union[str, Sequence[str], None] = '2fd918303539'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующие товары остаются без артикула: NULL в уникальном ключе не конфликтует
+    with op.batch_alter_table('product_drafts') as batch:
+        batch.add_column(sa.Column('sku', sa.String(), nullable=True))
+        batch.create_unique_constraint('uq_product_drafts_creator_sku', ['creator_id', 'sku'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('product_drafts') as batch:
+        batch.drop_constraint('uq_product_drafts_creator_sku', type_='unique')
+        batch.drop_column('sku')
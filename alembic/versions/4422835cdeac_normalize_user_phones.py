@@ -0,0 +1,55 @@
+"""normalize users.phone to +<digits>, the format lookups and login use
+
+Revision ID: 4422835cdeac
+Revises: 22d44a75e979
+Create Date: 2026-10-17 09:45:00.000000
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4422835cdeac'
+down_revision: Union[str, Sequence[str], None] = '22d44a75e979'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+users = sa.table('users', sa.column('id', sa.Integer), sa.column('phone', sa.String))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Та же функция, что у регистрации и поиска контактов (и тот же PHONE_DEFAULT_COUNTRY_CODE)
+    from app.crud.user_crud import normalize_phones
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(users.c.id, users.c.phone).order_by(users.c.id)).all()
+    taken = {phone for _, phone in rows}
+    updates = []
+    for (user_id, phone), normalized in zip(rows, normalize_phones([phone for _, phone in rows])):
+        if normalized is None or normalized == phone:
+            continue  # не телефон (служебная учётная запись) или уже нормализован
+        if normalized in taken:
+            # Два аккаунта на один номер — склеивать их миграция не берётся
+            logger.warning("users.id=%s: phone %r not normalized, %s is already taken", user_id, phone, normalized)
+            continue
+        taken.add(normalized)
+        updates.append({"user_id": user_id, "normalized": normalized})
+    if updates:
+        bind.execute(
+            users.update().where(users.c.id == sa.bindparam("user_id")).values(phone=sa.bindparam("normalized")),
+            updates,
+        )
+    logger.info("users.phone normalized: %d rows", len(updates))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Исходное написание номеров не сохраняется: нормализованные номера остаются
+    pass
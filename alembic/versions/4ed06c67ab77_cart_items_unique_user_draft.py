@@ -0,0 +1,37 @@
+"""cart_items: unique (user_id, draft_id) for the bulk cart upsert
+
+Revision ID: 4ed06c67ab77
+Revises: f4290ac307d3
+Create Date: 2026-10-17 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4ed06c67ab77'
+down_revision: Union[str, Sequence[str], None] = 'f4290ac307d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Повторы одного товара в корзине сливаются в самую раннюю строку с суммой количеств
+    op.execute(
+        "UPDATE cart_items SET quantity = ("
+        "SELECT SUM(COALESCE(other.quantity, 1)) FROM cart_items other "
+        "WHERE other.user_id = cart_items.user_id AND other.draft_id = cart_items.draft_id"
+        ") WHERE id IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, draft_id HAVING COUNT(*) > 1)"
+    )
+    op.execute("DELETE FROM cart_items WHERE id NOT IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, draft_id)")
+    with op.batch_alter_table('cart_items') as batch:
+        batch.create_unique_constraint('uq_cart_items_user_draft', ['user_id', 'draft_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('cart_items') as batch:
+        batch.drop_constraint('uq_cart_items_user_draft', type_='unique')
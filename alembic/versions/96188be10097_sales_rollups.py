@@ -0,0 +1,124 @@
+"""sales rollups: sales_daily, sales_product_daily, sales_creator_daily with backfill
+
+Revision ID: 96188be10097
+Revises: deabb992ea74
+Create Date: 2026-10-17 09:35:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '96188be10097'
+down_revision: Union[str, Sequence[str], None] = 'deabb992ea74'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ORDER_STATUSES = ('reserved', 'processing', 'processed', 'handed_to_courier', 'in_delivery', 'delivered', 'cancelled')
+# Тип orderstatus на Postgres уже создан вместе с orders
+order_status = sa.Enum(*ORDER_STATUSES, name='orderstatus').with_variant(
+    postgresql.ENUM(*ORDER_STATUSES, name='orderstatus', create_type=False), 'postgresql'
+)
+
+orders = sa.table(
+    'orders',
+    sa.column('id', sa.Integer), sa.column('total', sa.Float),
+    sa.column('status', sa.String), sa.column('created_at', sa.DateTime),
+)
+order_items = sa.table(
+    'order_items',
+    sa.column('order_id', sa.Integer), sa.column('draft_id', sa.Integer),
+    sa.column('quantity', sa.Integer), sa.column('price', sa.Float),
+)
+product_drafts = sa.table('product_drafts', sa.column('id', sa.Integer), sa.column('creator_id', sa.Integer))
+
+
+def _backfill() -> None:
+    """Агрегаты по всей истории заказов — то же, что scripts/rebuild_sales_rollups.py."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("LOCK TABLE orders IN SHARE MODE")
+    day = sa.func.date(orders.c.created_at)
+    order_units = (
+        sa.select(order_items.c.order_id, sa.func.sum(order_items.c.quantity).label('units'))
+        .group_by(order_items.c.order_id)
+        .subquery()
+    )
+    line_revenue = order_items.c.quantity * order_items.c.price
+    op.execute(
+        sa.table('sales_daily', *(sa.column(name) for name in ('day', 'status', 'orders', 'revenue', 'units')))
+        .insert().from_select(
+            ['day', 'status', 'orders', 'revenue', 'units'],
+            sa.select(day, orders.c.status, sa.func.count(), sa.func.coalesce(sa.func.sum(orders.c.total), 0.0),
+                      sa.func.coalesce(sa.func.sum(order_units.c.units), 0))
+            .select_from(orders.outerjoin(order_units, order_units.c.order_id == orders.c.id))
+            .group_by(day, orders.c.status),
+        )
+    )
+    op.execute(
+        sa.table('sales_product_daily', *(sa.column(name) for name in ('day', 'status', 'draft_id', 'units', 'revenue')))
+        .insert().from_select(
+            ['day', 'status', 'draft_id', 'units', 'revenue'],
+            sa.select(day, orders.c.status, order_items.c.draft_id,
+                      sa.func.sum(order_items.c.quantity), sa.func.sum(line_revenue))
+            .select_from(order_items.join(orders, orders.c.id == order_items.c.order_id))
+            .group_by(day, orders.c.status, order_items.c.draft_id),
+        )
+    )
+    op.execute(
+        sa.table('sales_creator_daily',
+                 *(sa.column(name) for name in ('day', 'status', 'creator_id', 'orders', 'units', 'revenue')))
+        .insert().from_select(
+            ['day', 'status', 'creator_id', 'orders', 'units', 'revenue'],
+            sa.select(day, orders.c.status, product_drafts.c.creator_id, sa.func.count(sa.distinct(orders.c.id)),
+                      sa.func.sum(order_items.c.quantity), sa.func.sum(line_revenue))
+            .select_from(
+                order_items
+                .join(orders, orders.c.id == order_items.c.order_id)
+                .join(product_drafts, product_drafts.c.id == order_items.c.draft_id)
+            )
+            .group_by(day, orders.c.status, product_drafts.c.creator_id),
+        )
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sales_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', order_status, nullable=False),
+        sa.Column('orders', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'status'),
+    )
+    op.create_table(
+        'sales_product_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', order_status, nullable=False),
+        sa.Column('draft_id', sa.Integer(), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'status', 'draft_id'),
+    )
+    op.create_table(
+        'sales_creator_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', order_status, nullable=False),
+        sa.Column('creator_id', sa.Integer(), nullable=False),
+        sa.Column('orders', sa.Integer(), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'status', 'creator_id'),
+    )
+    _backfill()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('sales_creator_daily', 'sales_product_daily', 'sales_daily'):
+        op.drop_table(table)
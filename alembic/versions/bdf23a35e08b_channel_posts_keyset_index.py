@@ -0,0 +1,36 @@
+"""channel_posts: keyset index (posted_at, id), index on draft_id, posted_at not null
+
+Revision ID: bdf23a35e08b
+Revises: 3e262c2256da
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bdf23a35e08b'
+down_revision: Union[str, Sequence[str], None] = '3e262c2256da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Курсор ленты — (posted_at, id): NULL в posted_at выпал бы из keyset-пагинации
+    op.execute("UPDATE channel_posts SET posted_at = CURRENT_TIMESTAMP WHERE posted_at IS NULL")
+    with op.batch_alter_table('channel_posts') as batch:
+        batch.alter_column('posted_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_channel_posts_posted_at_id', 'channel_posts', ['posted_at', 'id'])
+    op.create_index('ix_channel_posts_draft_id', 'channel_posts', ['draft_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_channel_posts_draft_id', table_name='channel_posts')
+    op.drop_index('ix_channel_posts_posted_at_id', table_name='channel_posts')
+    with op.batch_alter_table('channel_posts') as batch:
+        batch.alter_column('posted_at', existing_type=sa.DateTime(), nullable=True)
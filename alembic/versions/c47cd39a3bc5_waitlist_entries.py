@@ -0,0 +1,42 @@
+"""waitlist_entries: queue for products that ran out during reservation
+
+Revision ID: c47cd39a3bc5
+Revises: 4ed06c67ab77
+Create Date: 2026-10-17 09:25:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47cd39a3bc5'
+down_revision: Union[str, Sequence[str], None] = '4ed06c67ab77'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'waitlist_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('draft_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['draft_id'], ['product_drafts.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('draft_id', 'position', name='uq_waitlist_entries_draft_position'),
+    )
+    op.create_index('ix_waitlist_entries_id', 'waitlist_entries', ['id'])
+    op.create_index('ix_waitlist_entries_user_id', 'waitlist_entries', ['user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('waitlist_entries')
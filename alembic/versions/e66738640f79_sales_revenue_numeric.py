@@ -0,0 +1,37 @@
+"""sales rollups: revenue columns Float -> Numeric(14, 2)
+
+Revision ID: e66738640f79
+Revises: 4422835cdeac
+Create Date: 2026-10-17 09:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e66738640f79'
+down_revision: Union[str, Sequence[str], None] = '4422835cdeac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('sales_daily', 'sales_product_daily', 'sales_creator_daily')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Накопленная во float ошибка округляется до копеек
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column('revenue', existing_type=sa.Float(), type_=sa.Numeric(14, 2),
+                               existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column('revenue', existing_type=sa.Numeric(14, 2), type_=sa.Float(),
+                               existing_nullable=False)
@@ -0,0 +1,78 @@
+"""catalog search: tsvector + pg_trgm indexes on Postgres, FTS5 table on SQLite
+
+Revision ID: f4290ac307d3
+Revises: bdf23a35e08b
+Create Date: 2026-10-17 09:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4290ac307d3'
+down_revision: Union[str, Sequence[str], None] = 'bdf23a35e08b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# DDL зафиксирован на момент ревизии (копия app.models.product.SEARCH_DDL_*)
+UPGRADE = {
+    'postgresql': (
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "ALTER TABLE product_drafts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(description, '')), 'B')"
+        ") STORED",
+        "CREATE INDEX IF NOT EXISTS ix_product_drafts_search_vector "
+        "ON product_drafts USING gin (search_vector)",
+        "CREATE INDEX IF NOT EXISTS ix_product_drafts_title_trgm "
+        "ON product_drafts USING gin (lower(title) gin_trgm_ops)",
+    ),
+    'sqlite': (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS product_drafts_fts USING fts5("
+        "title, description, content='product_drafts', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS product_drafts_fts_ai AFTER INSERT ON product_drafts BEGIN "
+        "INSERT INTO product_drafts_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS product_drafts_fts_ad AFTER DELETE ON product_drafts BEGIN "
+        "INSERT INTO product_drafts_fts(product_drafts_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS product_drafts_fts_au AFTER UPDATE OF title, description ON product_drafts BEGIN "
+        "INSERT INTO product_drafts_fts(product_drafts_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO product_drafts_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END",
+        # Индексирует уже существующие товары
+        "INSERT INTO product_drafts_fts(product_drafts_fts) VALUES ('rebuild')",
+    ),
+}
+
+# pg_trgm не удаляется: расширение могут использовать и другие схемы
+DOWNGRADE = {
+    'postgresql': (
+        "DROP INDEX IF EXISTS ix_product_drafts_title_trgm",
+        "DROP INDEX IF EXISTS ix_product_drafts_search_vector",
+        "ALTER TABLE product_drafts DROP COLUMN IF EXISTS search_vector",
+    ),
+    'sqlite': (
+        "DROP TRIGGER IF EXISTS product_drafts_fts_au",
+        "DROP TRIGGER IF EXISTS product_drafts_fts_ad",
+        "DROP TRIGGER IF EXISTS product_drafts_fts_ai",
+        "DROP TABLE IF EXISTS product_drafts_fts",
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for statement in UPGRADE.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in DOWNGRADE.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
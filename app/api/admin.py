@@ -0,0 +1,228 @@
+# app/api/admin.py
+# Роуты сотрудников склада и администраторов: массовые операции с заказами,
+# дашборд продаж (читает только агрегаты app.services.sales_rollups),
+# выгрузки для бухгалтерии (потоком или фоновой задачей, app.services.exports),
+# адреса доставки и курьерские маршруты (app.services.route_planner).
+import json
+import uuid
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core import security
+from app.core.config import settings
+from app.models.delivery import OrderDelivery
+from app.models.job import Job, JobStatus
+from app.models.order import Order, OrderStatus
+from app.models.user import User
+from app.schemas.delivery import DeliveryIn, DeliveryOut, RoutePlan
+from app.schemas.export import ExportJob
+from app.schemas.order import OrderTransitionRequest, OrderTransitionResult
+from app.schemas.sales import SalesDashboard
+from app.services import exports, job_queue, sales_rollups
+from app.services.order_processing import transition_orders
+from app.services.route_planner import deliverable_stops, route_planner, shift_start
+
+router = APIRouter()
+
+
+@router.post("/orders/transition", response_model=OrderTransitionResult)
+def bulk_transition_orders(
+    payload: OrderTransitionRequest,
+    db: Session = Depends(security.get_db),
+    current_user: User = Depends(security.require_role("worker", "admin")),
+):
+    """
+    Переводит пачку заказов в новый статус одним запросом.
+    Заказы с недопустимым текущим статусом или несуществующие возвращаются в rejected.
+    """
+    if len(payload.order_ids) > settings.ORDER_TRANSITION_MAX_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many orders, max {settings.ORDER_TRANSITION_MAX_BATCH} per request",
+        )
+    result = transition_orders(db, payload.order_ids, payload.to_status, actor_id=current_user.id)
+    db.commit()
+    return result
+
+
+@router.get("/jobs/stats", response_model=dict[str, int])
+def jobs_stats(
+    db: Session = Depends(security.get_db),
+    current_user: User = Depends(security.require_role("admin")),
+):
+    """Число фоновых задач по статусам."""
+    return job_queue.queue_stats(db)
+
+
+@router.get("/sales", response_model=SalesDashboard)
+def sales_dashboard(
+    date_from: date | None = Query(None, description="Первый день периода (UTC), по умолчанию — 29 дней назад"),
+    date_to: date | None = Query(None, description="Последний день периода (UTC), по умолчанию — сегодня"),
+    status: list[OrderStatus] | None = Query(None, description="Статусы заказов; по умолчанию все, кроме cancelled"),
+    limit: int = Query(10, ge=1, le=100, description="Размер списков лидеров"),
+    db: Session = Depends(security.get_read_db),
+    current_user: User = Depends(security.require_role("admin")),
+):
+    """
+    Выручка, число заказов и штук по дням и статусам, лидеры среди товаров и авторов.
+    Время ответа зависит от длины периода, а не от объёма истории заказов.
+    """
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+    if (date_to - date_from).days >= settings.SALES_DASHBOARD_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Period too long, max {settings.SALES_DASHBOARD_MAX_DAYS} days",
+        )
+    statuses = tuple(dict.fromkeys(status)) if status else sales_rollups.SOLD_STATUSES
+    return sales_rollups.dashboard(db, date_from, date_to, statuses, limit)
+
+
+def _check_export(kind: str, fmt: str, date_from: date | None, date_to: date | None) -> None:
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from is after date_to")
+    try:
+        exports.check_export(kind, fmt)
+    except exports.ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _export_job_out(job: Job) -> ExportJob:
+    download_url = None
+    if job.status == JobStatus.done:
+        download_url = f"/api/admin/exports/jobs/{job.id}/file"
+    return ExportJob(
+        job_id=job.id,
+        status=job.status,
+        status_url=f"/api/admin/exports/jobs/{job.id}",
+        download_url=download_url,
+        error=job.last_error if job.status == JobStatus.failed else None,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+    )
+
+
+def _get_export_job(db: Session, job_id: int) -> Job:
+    job = db.get(Job, job_id)
+    if job is None or job.kind != "export":
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.get("/exports/jobs/{job_id}", response_model=ExportJob)
+def export_job_status(
+    job_id: int,
+    db: Session = Depends(security.get_db),
+    current_user: User = Depends(security.require_role("admin")),
+):
+    """Статус фоновой выгрузки; когда файл готов — ссылка на скачивание."""
+    return _export_job_out(_get_export_job(db, job_id))
+
+
+@router.get("/exports/jobs/{job_id}/file", response_class=FileResponse)
+def export_job_file(
+    job_id: int,
+    db: Session = Depends(security.get_db),
+    current_user: User = Depends(security.require_role("admin")),
+):
+    """Файл готовой фоновой выгрузки (хранится EXPORT_FILE_TTL_HOURS часов)."""
+    job = _get_export_job(db, job_id)
+    if job.status != JobStatus.done:
+        raise HTTPException(status_code=409, detail=f"Export is {job.status.value}")
+    payload = json.loads(job.payload)
+    path = exports.exports_dir() / payload["file"]
+    if not path.is_file():
+        raise HTTPException(status_code=410, detail="Export file expired")
+    return FileResponse(path, media_type=exports.FORMATS[payload["format"]], filename=payload["filename"])
+
+
+@router.get("/exports/{kind}", response_class=StreamingResponse)
+def export_stream(
+    kind: str,
+    format: str = Query("csv", description="csv | xlsx"),
+    date_from: date | None = Query(None, description="Первый день периода (UTC)"),
+    date_to: date | None = Query(None, description="Последний день периода (UTC)"),
+    current_user: User = Depends(security.require_role("admin")),
+):
+    """
+    Выгрузка orders (позиции заказов с названиями товаров) или catalog потоком:
+    строки читаются курсором пачками и сразу пишутся в ответ, память не растёт
+    с объёмом периода. Для очень больших периодов — POST (фоновая задача).
+    """
+    _check_export(kind, format, date_from, date_to)
+    return StreamingResponse(
+        exports.stream_export(kind, format, date_from, date_to),
+        media_type=exports.FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{exports.filename(kind, format, date_from, date_to)}"',
+        },
+    )
+
+
+@router.post("/exports/{kind}", response_model=ExportJob, status_code=202)
+def export_enqueue(
+    kind: str,
+    format: str = Query("csv", description="csv | xlsx"),
+    date_from: date | None = Query(None, description="Первый день периода (UTC)"),
+    date_to: date | None = Query(None, description="Последний день периода (UTC)"),
+    db: Session = Depends(security.get_db),
+    current_user: User = Depends(security.require_role("admin")),
+):
+    """Ставит выгрузку фоновой задачей; статус и ссылка на файл — GET /exports/jobs/{job_id}."""
+    _check_export(kind, format, date_from, date_to)
+    payload = {
+        "kind": kind,
+        "format": format,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "filename": exports.filename(kind, format, date_from, date_to),
+        "file": f"{uuid.uuid4().hex}.{format}",
+        "requested_by": current_user.id,
+    }
+    job_id = job_queue.enqueue_one(db, "export", payload, max_attempts=2)
+    db.commit()
+    return _export_job_out(db.get(Job, job_id))
+
+
+@router.put("/orders/{order_id}/delivery", response_model=DeliveryOut)
+def set_order_delivery(
+    order_id: int,
+    payload: DeliveryIn,
+    db: Session = Depends(security.get_db),
+    current_user: User = Depends(security.require_role("worker", "admin")),
+):
+    """Адрес, координаты и окно доставки заказа (для планирования маршрутов)."""
+    if db.get(Order, order_id) is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    delivery = db.get(OrderDelivery, order_id)
+    if delivery is None:
+        delivery = OrderDelivery(order_id=order_id)
+        db.add(delivery)
+    for field, value in payload.model_dump().items():
+        setattr(delivery, field, value)
+    db.commit()
+    return delivery
+
+
+@router.get("/courier-routes", response_model=RoutePlan)
+def courier_routes(
+    day: date | None = Query(None, description="День доставки (UTC), по умолчанию — сегодня"),
+    start_at: datetime | None = Query(None, description="Выезд со склада (UTC), по умолчанию — начало смены"),
+    max_stops: int | None = Query(None, ge=1, le=200, description="Стопов на курьера, по умолчанию COURIER_MAX_STOPS"),
+    db: Session = Depends(security.get_read_db),
+    current_user: User = Depends(security.require_role("worker", "admin")),
+):
+    """
+    Пачки курьеров и порядок объезда для заказов handed_to_courier с окном
+    доставки в этот день или без окна. Заказы без координат — в unplanned.
+    """
+    day = day or datetime.utcnow().date()
+    stops = deliverable_stops(db, day)
+    db.close()  # соединение не держим, пока считаются маршруты
+    plan = route_planner.plan(stops, start_at or shift_start(day), max_stops)
+    return RoutePlan(day=day, **plan)
@@ -3,39 +3,75 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from datetime import timedelta
 
 from app.core import security
 from app.core.config import settings
+from app.crud.user_crud import normalize_phone
 from app.models.user import User, RoleEnum
+from app.schemas.user import Token, UserOut
 
 router = APIRouter()
 
-@router.post("/register")
-def register(phone: str, password: str, full_name: str | None = None, db: Session = Depends(security.get_db)):
-    """
-    Регистрация пользователя: phone + password.
-    По умолчанию роль = client.
-    """
-    existing = db.query(User).filter(User.phone == phone).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Phone already registered")
-    hashed = security.get_password_hash(password)
+def _get_user_by_phone(db: Session, phone: str) -> User | None:
+    return db.query(User).filter(User.phone == phone).first()
+
+def _create_user(db: Session, phone: str, hashed: str, full_name: str | None) -> User | None:
+    if _get_user_by_phone(db, phone):
+        return None
     user = User(phone=phone, hashed_password=hashed, full_name=full_name, role=RoleEnum.client)
     db.add(user)
     db.commit()
     db.refresh(user)
-    return {"id": user.id, "phone": user.phone, "role": user.role.value}
+    return user
+
+def _update_password_hash(db: Session, user: User, hashed: str) -> None:
+    user.hashed_password = hashed
+    db.commit()
+
+# Эндпоинты async: bcrypt выполняется в отдельном ограниченном пуле
+# (security.password_pool), а запросы к БД — в общем threadpool.
+# Так шторм логинов упирается в пул bcrypt (429 при переполнении),
+# а не занимает все потоки остальных эндпоинтов.
 
-@router.post("/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(security.get_db)):
+@router.post("/register", response_model=UserOut)
+async def register(phone: str, password: str, full_name: str | None = None, db: Session = Depends(security.get_db)):
+    """
+    Регистрация пользователя: phone + password.
+    По умолчанию роль = client. Номер хранится нормализованным (+<цифры>),
+    как его ищут логин и синхронизация контактов.
+    """
+    normalized = normalize_phone(phone)
+    if normalized is None:
+        raise HTTPException(status_code=400, detail="Invalid phone number")
+    phone = normalized
+    if await run_in_threadpool(_get_user_by_phone, db, phone):
+        raise HTTPException(status_code=400, detail="Phone already registered")
+    hashed = await security.get_password_hash_async(password)
+    user = await run_in_threadpool(_create_user, db, phone, hashed, full_name)
+    if user is None:
+        raise HTTPException(status_code=400, detail="Phone already registered")
+    return user
+
+@router.post("/token", response_model=Token)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(security.get_db)):
     """
     Логин: возвращает access_token (JWT).
     OAuth2PasswordRequestForm ожидает username и password — используем phone как username.
+    Номер нормализуется так же, как при регистрации; логин, не похожий на телефон
+    (служебные учётные записи), ищется как есть.
+    Если хеш создан с устаревшими параметрами CryptContext — пересчитываем его.
     """
-    user = db.query(User).filter(User.phone == form_data.username).first()
-    if not user or not user.hashed_password or not security.verify_password(form_data.password, user.hashed_password):
+    phone = normalize_phone(form_data.username) or form_data.username
+    user = await run_in_threadpool(_get_user_by_phone, db, phone)
+    if not user or not user.hashed_password:
+        raise HTTPException(status_code=400, detail="Incorrect credentials")
+    ok, new_hash = await security.verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not ok:
         raise HTTPException(status_code=400, detail="Incorrect credentials")
+    if new_hash:
+        await run_in_threadpool(_update_password_hash, db, user, new_hash)
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     token = security.create_access_token(subject=str(user.id), expires_delta=access_token_expires)
-    return {"access_token": token, "token_type": "bearer"}
+    return Token(access_token=token)
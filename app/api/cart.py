@@ -0,0 +1,84 @@
+# app/api/cart.py
+# Роуты корзины: просмотр, пакетное изменение позиций и оформление (резерв).
+# Просмотр — async (security.get_read_query, AsyncSession при DB_ASYNC_ENABLED).
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.exc import IntegrityError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from app.core import security
+from app.core.config import settings
+from app.crud import cart_crud
+from app.models.user import User
+from app.schemas.cart import CartBulkRequest, CartBulkResult, CartView
+from app.schemas.order import ReservationResult
+from app.services.order_processing import StockConflict, reservation_batcher
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Ошибки пачки, после которых повтор имеет смысл: конкуренция за остатки не
+# разрешилась за попытки run_reservation, база недоступна или пул исчерпан
+_RETRYABLE_ERRORS = (StockConflict, IntegrityError, OperationalError, PoolTimeoutError)
+
+
+@router.get("", response_model=CartView)
+async def get_cart(
+    query=Depends(security.get_read_query),
+    current_user: User = Depends(security.get_current_user),
+):
+    """Корзина текущего пользователя с суммой и стоимостью доставки."""
+    return cart_crud.cart_view_from_rows(await query(cart_crud.cart_view_query(current_user.id)))
+
+
+@router.post("/bulk", response_model=CartBulkResult)
+def bulk_update_cart(
+    payload: CartBulkRequest,
+    db: Session = Depends(security.get_db),
+    current_user: User = Depends(security.get_current_user),
+):
+    """
+    Пакетное добавление/изменение/удаление позиций одним запросом.
+    Возвращает обновлённую корзину и список неизвестных/неопубликованных товаров.
+    """
+    # apply_bulk делает commit и current_user истекает: id берём заранее,
+    # иначе cart_view перечитал бы пользователя лишним SELECT
+    user_id = current_user.id
+    changes: dict[int, int] = {}
+    for item in payload.items:
+        # Повтор товара в запросе: для add суммируем, для set побеждает последний
+        if payload.mode == "add":
+            changes[item.draft_id] = changes.get(item.draft_id, 0) + item.quantity
+        else:
+            changes[item.draft_id] = item.quantity
+    skipped = cart_crud.apply_bulk(db, user_id, changes, payload.mode)
+    cart = cart_crud.cart_view(db, user_id)
+    cart["skipped_draft_ids"] = skipped
+    return cart
+
+
+@router.post("/checkout", response_model=ReservationResult)
+def checkout(request: Request, current_user: User = Depends(security.get_current_user)):
+    """
+    Резервирует товары корзины: создаёт заказ со статусом reserved.
+    Позиции, которых не хватило, попадают в лист ожидания (waitlisted, с позицией).
+    """
+    try:
+        result = reservation_batcher.reserve(current_user.id, timeout=settings.RESERVATION_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        raise HTTPException(status_code=503, detail="Reservation timed out, retry later", headers={"Retry-After": "1"})
+    except _RETRYABLE_ERRORS as e:
+        logger.warning(f"Checkout for user {current_user.id} failed: {type(e).__name__}")
+        raise HTTPException(status_code=503, detail="Reservation is temporarily unavailable, retry later",
+                            headers={"Retry-After": "1"})
+    except Exception:
+        # Пачка уже залогирована с traceback в ReservationBatcher
+        raise HTTPException(status_code=500, detail="Reservation failed")
+    # Резерв пишет сессия пачки, а не сессия запроса — отмечаем запись для
+    # read-your-writes (следующий GET /api/cart не должен уйти на отстающую реплику)
+    request.state.db_wrote = True
+    if result["order_id"] is None and not result["waitlisted"] and not result["unavailable"]:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+    return result
@@ -0,0 +1,90 @@
+# app/api/channel.py
+# Живая лента канала: подписка на новые посты по SSE и WebSocket.
+# Переподключение без потерь: SSE — заголовок Last-Event-ID (браузер шлёт сам)
+# или ?last_id=, WebSocket — ?last_id=. Отставшего клиента сервер отключает
+# (SSE: событие resync, WebSocket: код 1013), клиент переподключается с last_id.
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.channel_hub import HubUnavailable, SlowConsumer, channel_hub
+
+router = APIRouter()
+
+_SSE_HEARTBEAT = b": ping\n\n"
+_SSE_RESYNC = b"event: resync\ndata: {}\n\n"
+# Код закрытия «Try Again Later»
+_WS_TRY_AGAIN = 1013
+
+
+def _resume_id(last_id: int | None, last_event_id: str | None) -> int | None:
+    if last_id is not None:
+        return last_id
+    if last_event_id and last_event_id.strip().isdigit():
+        return int(last_event_id)
+    return None
+
+
+@router.get("/stream")
+async def stream(
+    last_id: int | None = Query(None, ge=0),
+    last_event_id: str | None = Header(None),
+):
+    """
+    Server-Sent Events: event: post (id — post_id, data — элемент ленты),
+    event: reset — пропущено слишком много, перечитайте /api/products/feed,
+    event: resync — клиент не успевал читать, переподключитесь с Last-Event-ID.
+    """
+    # Подписка открывается внутри генератора: если клиент отключится до начала
+    # ответа, генератор не запустится и в хабе ничего не останется. Здесь —
+    # только проверка, чтобы ответить 503 до заголовков потока
+    try:
+        channel_hub.check_available()
+    except HubUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    resume_id = _resume_id(last_id, last_event_id)
+
+    async def events():
+        try:
+            async with channel_hub.subscribe(resume_id) as subscription:
+                # Интервал переподключения для EventSource
+                yield b"retry: 3000\n\n"
+                while True:
+                    try:
+                        item = await subscription.next(settings.CHANNEL_HEARTBEAT_SECONDS)
+                    except SlowConsumer:
+                        yield _SSE_RESYNC
+                        return
+                    yield _SSE_HEARTBEAT if item is None else item.sse
+        except HubUnavailable:
+            # Место заняли между проверкой и подпиской — клиент переподключится
+            yield _SSE_RESYNC
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx не должен буферизовать поток
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def websocket_feed(websocket: WebSocket, last_id: int | None = Query(None, ge=0)):
+    """
+    WebSocket: кадры {"event":"post","id":..,"data":{..}}, {"event":"reset"},
+    {"event":"ping"} — heartbeat. Сообщения от клиента игнорируются.
+    """
+    await websocket.accept()
+    try:
+        async with channel_hub.subscribe(last_id) as subscription:
+            while True:
+                try:
+                    item = await subscription.next(settings.CHANNEL_HEARTBEAT_SECONDS)
+                except SlowConsumer:
+                    await websocket.close(code=_WS_TRY_AGAIN, reason="slow consumer, reconnect with last_id")
+                    return
+                await websocket.send_text('{"event":"ping"}' if item is None else item.ws)
+    except HubUnavailable as e:
+        await websocket.close(code=_WS_TRY_AGAIN, reason=str(e))
+    except WebSocketDisconnect:
+        pass
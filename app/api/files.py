@@ -0,0 +1,253 @@
+# app/api/files.py
+# Загрузка и отдача файлов (фото товаров).
+# Загрузка пишется на диск потоком (app.services.file_storage), отдача:
+#   - FILE_STORAGE_ACCEL_REDIRECT задан -> X-Accel-Redirect, файл отдаёт nginx (sendfile);
+#   - иначе приложение само, с поддержкой Range (докачка, перемотка);
+#   - S3 -> редирект на подписанную ссылку.
+# ?size=thumb&format=webp — уменьшенная копия из кэша вариантов (app.services.image_variants).
+# Ключ файла — хэш содержимого, поэтому ответы кэшируются как immutable.
+import asyncio
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+
+from app.core import security
+from app.core.config import settings
+from app.models.product import ProductDraft
+from app.models.user import User
+from app.services.file_storage import (
+    CONTENT_TYPES,
+    KEY_RE,
+    FileTooLarge,
+    NoFileInRequest,
+    UnsupportedFileType,
+    file_storage,
+)
+from app.services.image_variants import FORMATS, VariantError, variant_cache
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+# Фоновые задачи генерации вариантов (ссылки, чтобы задачи не собрал GC)
+_background: set[asyncio.Task] = set()
+
+CACHE_FOREVER = "public, max-age=31536000, immutable"
+_CHUNK = 256 * 1024
+
+
+@router.post("")
+async def upload_file(
+    request: Request,
+    draft_id: int | None = Query(None, description="Сразу привязать фото к черновику"),
+    current_user: User = Depends(security.require_role("worker", "admin")),
+):
+    """
+    Загрузка фото: multipart/form-data с полем file.
+    Тело не буферизуется целиком — пишется на диск по мере получения.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > file_storage.max_bytes + 64 * 1024:
+        raise HTTPException(status_code=413, detail="File too large")
+    if draft_id is not None:
+        # Черновик и права проверяются до чтения тела: на 404/403 файл не пишется
+        await asyncio.to_thread(_check_draft, draft_id, current_user)
+    try:
+        stored = await file_storage.save_multipart(request.headers, request.stream())
+    except FileTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedFileType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except NoFileInRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if draft_id is not None:
+        await asyncio.to_thread(_attach_to_draft, draft_id, stored.key, current_user)
+        # Запись шла в отдельной сессии — отмечаем её для read-your-writes
+        request.state.db_wrote = True
+    formats = [fmt for fmt in settings.IMAGE_PREGENERATE_FORMATS.split(",") if fmt in FORMATS]
+    if formats:
+        task = asyncio.create_task(_pregenerate(stored.key, stored.sha256, formats))
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+    return {
+        "key": stored.key,
+        "sha256": stored.sha256,
+        "size": stored.size,
+        "content_type": stored.content_type,
+        "deduplicated": stored.deduplicated,
+        "url": f"/api/files/{stored.key}",
+    }
+
+
+def _own_draft(db, draft_id: int, user: User) -> ProductDraft:
+    draft = db.get(ProductDraft, draft_id)
+    if draft is None:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    if draft.creator_id != user.id and user.role not in ("admin", "leader"):
+        raise HTTPException(status_code=403, detail="Not your draft")
+    return draft
+
+
+def _check_draft(draft_id: int, user: User) -> None:
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        _own_draft(db, draft_id, user)
+
+
+def _attach_to_draft(draft_id: int, key: str, user: User) -> None:
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        # Повторная проверка: черновик могли удалить, пока шла загрузка
+        draft = _own_draft(db, draft_id, user)
+        draft.image_path = key
+        db.commit()
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Один диапазон bytes=a-b | a- | -n -> (start, end) включительно.
+    None — заголовок не поддерживается (несколько диапазонов), отдаём файл целиком.
+    ValueError — диапазон невыполним (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
+    try:
+        if start_s == "":
+            length = int(end_s)
+            if length <= 0:
+                raise ValueError
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(start_s)
+            end = min(int(end_s), size - 1) if end_s else size - 1
+    except ValueError:
+        raise ValueError("Invalid range")
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+async def _read_range(path, start: int, end: int):
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+def file_response(request: Request, key: str, path, etag: str, media_type: str) -> Response:
+    """Ответ с файлом: ETag/304, Range/206/416, кэш-заголовки, X-Accel-Redirect."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_FOREVER, "Accept-Ranges": "bytes"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    if settings.FILE_STORAGE_ACCEL_REDIRECT:
+        headers["X-Accel-Redirect"] = settings.FILE_STORAGE_ACCEL_REDIRECT.rstrip("/") + "/" + key
+        return Response(headers=headers, media_type=media_type)
+
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)})
+            return StreamingResponse(_read_range(path, start, end), status_code=206, headers=headers,
+                                     media_type=media_type)
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_read_range(path, 0, size - 1), headers=headers, media_type=media_type)
+    # Полный файл: FileResponse (сервер может отдать его через sendfile/pathsend)
+    return FileResponse(path, headers=headers, media_type=media_type)
+
+
+async def _pregenerate(key: str, sha256: str, formats: list[str]) -> None:
+    try:
+        async with _source_file(key) as source:
+            await variant_cache.pregenerate(source, sha256, formats)
+    except Exception as e:
+        logger.warning(f"Variant pre-generation for {key} failed: {e}")
+
+
+class _source_file:
+    """Локальный путь к оригиналу; для удалённого бэкенда — временная копия."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self._tmp: Path | None = None
+
+    async def __aenter__(self) -> Path:
+        backend = file_storage.backend
+        path = backend.local_path(self.key)
+        if path is not None:
+            return path
+        fd, name = tempfile.mkstemp(dir=file_storage.staging_dir, suffix=Path(self.key).suffix)
+        os.close(fd)
+        self._tmp = Path(name)
+        await asyncio.to_thread(backend.download_to, self.key, self._tmp)
+        return self._tmp
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._tmp is not None:
+            self._tmp.unlink(missing_ok=True)
+
+
+async def _variant_response(request: Request, key: str, size: str, fmt: str) -> Response:
+    if size not in variant_cache.sizes or fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown size/format, sizes: {', '.join(variant_cache.sizes)}")
+    sha256 = key.rsplit("/", 1)[-1].split(".")[0]
+    etag = f'"{sha256}-{size}-{fmt}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_FOREVER})
+    path = await variant_cache.lookup(sha256, size, fmt)
+    if path is None:
+        # Ленивая генерация: варианта нет (формат не генерировался заранее или вытеснен)
+        if not await asyncio.to_thread(file_storage.backend.exists, key):
+            raise HTTPException(status_code=404, detail="File not found")
+        try:
+            async with _source_file(key) as source:
+                path = await variant_cache.get(source, sha256, size, fmt)
+        except VariantError:
+            raise HTTPException(status_code=422, detail="Cannot build image variant")
+    return file_response(request, variant_cache.relative_key(sha256, size, fmt), path, etag, FORMATS[fmt])
+
+
+@router.get("/{key:path}")
+async def download_file(
+    key: str,
+    request: Request,
+    size: str | None = Query(None, description="Вариант: thumb, small, medium, large"),
+    format: str = Query("webp", description="webp | jpeg (только вместе с size)"),
+):
+    """Отдача файла по ключу cas/ab/<sha256>.<ext> или его уменьшенной копии."""
+    if not KEY_RE.match(key):
+        raise HTTPException(status_code=404, detail="File not found")
+    if size is not None:
+        return await _variant_response(request, key, size, format)
+    backend = file_storage.backend
+    path = backend.local_path(key)
+    if path is None:
+        url = await asyncio.to_thread(backend.url, key)
+        return RedirectResponse(url, status_code=302, headers={"Cache-Control": "private, max-age=600"})
+    etag = '"' + key.rsplit("/", 1)[-1].split(".")[0] + '"'
+    media_type = CONTENT_TYPES.get(os.path.splitext(key)[1], "application/octet-stream")
+    return file_response(request, key, path, etag, media_type)
@@ -0,0 +1,17 @@
+# app/api/metrics.py
+# Экспозиция метрик Prometheus (см. app.core.metrics).
+import asyncio
+
+from fastapi import APIRouter, Response
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("")
+async def metrics():
+    """Метрики в текстовом формате Prometheus."""
+    # В многопроцессном режиме читаются файлы всех воркеров — не в event loop
+    body, content_type = await asyncio.to_thread(render_metrics)
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,126 @@
+# app/api/products.py
+# Роуты каталога: лента опубликованных товаров, поиск и публикация черновиков.
+# Лента листается курсором (posted_at, id) вместо OFFSET, отдаёт сильный ETag
+# и 304 на If-None-Match. Первые страницы держатся в in-process кэше
+# (app.core.catalog_cache), который сбрасывается после commit, затронувшего
+# черновики или посты канала. При DB_ASYNC_ENABLED лента читается через
+# AsyncSession (security.get_read_query) без потока threadpool.
+import base64
+import hashlib
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+
+from app.core import security
+from app.core.catalog_cache import feed_cache
+from app.crud import product_crud
+from app.models.product import ProductDraft
+from app.models.user import User
+from app.schemas.product import CatalogItem, CatalogPage, PublishedPost, SearchItem, SearchResults
+from app.services.image_variants import variant_cache, variant_url
+
+router = APIRouter()
+
+
+def encode_cursor(posted_at: datetime, post_id: int) -> str:
+    raw = f"{posted_at.isoformat()}|{post_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        posted_at, post_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(posted_at), int(post_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _render_page(rows, limit: int, image_size: str | None) -> bytes:
+    # Тело рендерится один раз (кэш + ETag), pydantic-core сразу отдаёт JSON-байты
+    items = [CatalogItem.model_validate(row) for row in rows]
+    for item in items:
+        item.image_url = variant_url(item.image_path, image_size)
+    next_cursor = encode_cursor(rows[-1].posted_at, rows[-1].post_id) if len(rows) == limit else None
+    return CatalogPage(items=items, next_cursor=next_cursor).model_dump_json().encode()
+
+
+def _check_image_size(image_size: str | None) -> None:
+    if image_size is not None and image_size not in variant_cache.sizes:
+        raise HTTPException(status_code=400, detail=f"Unknown image_size, use: {', '.join(variant_cache.sizes)}")
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+@router.get("/feed", response_model=CatalogPage)
+async def catalog_feed(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    image_size: str | None = Query(None, description="Размер фото в image_url: thumb, small, medium, large"),
+    query=Depends(security.get_read_query),
+):
+    """
+    Лента опубликованных товаров, от новых к старым.
+    cursor — значение next_cursor из предыдущей страницы.
+    """
+    _check_image_size(image_size)
+    cached = feed_cache.get((limit, image_size)) if cursor is None else None
+    if cached is not None:
+        body, etag = cached
+    else:
+        generation = feed_cache.generation
+        after = decode_cursor(cursor) if cursor is not None else None
+        rows = await query(product_crud.catalog_page_query(after, limit))
+        body = _render_page(rows, limit, image_size)
+        etag = _etag(body)
+        if cursor is None:
+            feed_cache.set((limit, image_size), body, etag, generation)
+
+    # no-cache: клиент может хранить ответ, но обязан перепроверять его по ETag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/search", response_model=SearchResults)
+def search(
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    image_size: str | None = Query(None, description="Размер фото в image_url: thumb, small, medium, large"),
+    db: Session = Depends(security.get_read_db),
+):
+    """Полнотекстовый и нечёткий поиск по опубликованным товарам."""
+    _check_image_size(image_size)
+    items = [SearchItem.model_validate(row) for row in product_crud.search_drafts(db, q, limit)]
+    for item in items:
+        item.image_url = variant_url(item.image_path, image_size)
+        item.rank = round(item.rank, 4)
+    return SearchResults(items=items)
+
+
+@router.post("/{draft_id}/publish", response_model=PublishedPost)
+def publish(
+    draft_id: int,
+    db: Session = Depends(security.get_db),
+    current_user: User = Depends(security.require_role("worker")),
+):
+    """Публикует черновик в канал (worker/leader)."""
+    draft = db.get(ProductDraft, draft_id)
+    if draft is None:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    if draft.published:
+        raise HTTPException(status_code=409, detail="Draft already published")
+    post = product_crud.publish_draft(db, draft)
+    return PublishedPost(post_id=post.id, draft_id=draft.id, posted_at=post.posted_at)
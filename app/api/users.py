@@ -0,0 +1,55 @@
+# app/api/users.py
+# Роуты пользователей: синхронизация адресной книги (кто из контактов зарегистрирован).
+import math
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core import security
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter
+from app.crud import user_crud
+from app.models.user import User
+from app.schemas.user import ContactLookupRequest, ContactLookupResult, ContactMatch
+
+router = APIRouter()
+
+# Бюджет номеров на пользователя в час (в пределах воркера)
+contact_limiter = RateLimiter(settings.CONTACT_SYNC_NUMBERS_PER_HOUR, 3600)
+
+
+@router.post("/contacts/lookup", response_model=ContactLookupResult)
+def lookup_contacts(
+    payload: ContactLookupRequest,
+    db: Session = Depends(security.get_read_db),
+    current_user: User = Depends(security.get_current_user),
+):
+    """
+    Какие номера адресной книги принадлежат зарегистрированным (и не заблокированным)
+    пользователям. Вся книга — один запрос к БД; сам пользователь в ответ не попадает.
+    Больше CONTACT_SYNC_MAX_NUMBERS номеров отклоняет схема запроса (422).
+    """
+    wait = contact_limiter.acquire(current_user.id, len(payload.phones))
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Contact sync limit exceeded, retry later",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+    numbers_by_phone: dict[str, list[str]] = {}
+    invalid = 0
+    for number, phone in zip(payload.phones, user_crud.normalize_phones(payload.phones)):
+        if phone is None:
+            invalid += 1
+        else:
+            numbers_by_phone.setdefault(phone, []).append(number)
+    rows = user_crud.find_by_phones(db, list(numbers_by_phone))
+    return ContactLookupResult(
+        matches=[
+            ContactMatch(id=row.id, phone=row.phone, full_name=row.full_name, numbers=numbers_by_phone[row.phone])
+            for row in rows
+            if row.id != current_user.id
+        ],
+        invalid=invalid,
+    )
@@ -0,0 +1,110 @@
+# app/core/catalog_cache.py
+# In-process кэш первых страниц ленты каталога (app.api.products.catalog_feed).
+# Сбрасывается после commit, затронувшего черновики или посты канала, в соседних
+# воркерах и процессах (импорт каталога) — через общий файл-журнал, как у principal_cache.
+# - ORM-изменения ChannelPost/ProductDraft подхватывает событие after_flush.
+# - Массовые UPDATE/INSERT (резервирование, возврат остатка, импорт) событий не
+#   порождают: такой код вызывает mark_catalog_changed(session), а при записи
+#   через Connection — feed_cache.invalidate() после commit.
+# Поколение кэша растёт при каждом сбросе: страница, прочитанная из БД до сброса,
+# не кладётся в кэш после него (иначе устаревшая страница жила бы до TTL).
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.principal_cache import InvalidationLog
+from app.models.product import ChannelPost, ProductDraft
+
+
+class FeedPageCache:
+    """Кэш первых страниц ленты: (limit, image_size) -> (expires_at, body, etag)."""
+
+    def __init__(self, ttl_seconds: float, broadcast_path: str | None = None):
+        self.ttl_seconds = ttl_seconds
+        self._pages: dict[tuple, tuple[float, bytes, str]] = {}
+        self._lock = threading.Lock()
+        self._log = InvalidationLog(broadcast_path) if broadcast_path else None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_sets = 0
+
+    def _sync_broadcast(self) -> None:
+        if self._log is None:
+            return
+        try:
+            if self._log.poll() != []:
+                self.invalidate(broadcast=False)
+        except OSError:
+            pass
+
+    def get(self, key: tuple) -> tuple[bytes, str] | None:
+        """Страница из кэша; при промахе generation — поколение, которое передаётся в set."""
+        self._sync_broadcast()
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, key: tuple, body: bytes, etag: str, generation: int) -> None:
+        """Кладёт страницу, если с момента чтения (generation) кэш не сбрасывался."""
+        self._sync_broadcast()
+        with self._lock:
+            if generation != self.generation:
+                self.stale_sets += 1
+                return
+            self._pages[key] = (time.monotonic() + self.ttl_seconds, body, etag)
+
+    def invalidate(self, broadcast: bool = True) -> None:
+        with self._lock:
+            self._pages.clear()
+            self.generation += 1
+        if broadcast and self._log is not None:
+            try:
+                self._log.publish([0])
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._pages)
+        return {"size": size, "hits": self.hits, "misses": self.misses, "stale_sets": self.stale_sets}
+
+
+feed_cache = FeedPageCache(
+    ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS,
+    broadcast_path=settings.CATALOG_CACHE_BROADCAST_FILE or None,
+)
+
+# Сброс кэша: после flush запоминаем, что менялись черновики/посты, после commit — сбрасываем
+_FEED_CHANGED_KEY = "catalog_feed_changed"
+
+
+def mark_catalog_changed(session: Session) -> None:
+    """Сбросить кэш ленты после commit session (для массовых UPDATE в обход ORM)."""
+    session.info[_FEED_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_feed_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (ChannelPost, ProductDraft)):
+            session.info[_FEED_CHANGED_KEY] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_feed(session):
+    if session.info.pop(_FEED_CHANGED_KEY, False):
+        feed_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_feed_changes(session):
+    session.info.pop(_FEED_CHANGED_KEY, None)
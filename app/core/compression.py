@@ -0,0 +1,118 @@
+# app/core/compression.py
+# Сжатие больших JSON/текстовых ответов (лента каталога, корзина, поиск).
+#
+# CompressionMiddleware (чистый ASGI) сжимает ответ целиком, если он пришёл одним
+# сообщением и не меньше RESPONSE_COMPRESSION_MIN_BYTES: br (quality
+# RESPONSE_BROTLI_QUALITY), если установлен brotli и клиент его принимает, иначе gzip.
+# Потоковые ответы (SSE, файлы, Range) и уже сжатые форматы проходят как есть.
+# Сильный ETag у сжатого ответа становится слабым — байты другие, а сравнение в
+# _etag_matches (app.api.products) понимает обе формы.
+import asyncio
+import gzip
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli не установлен — только gzip
+    brotli = None
+
+_COMPRESSIBLE_TYPES = ("application/json", "application/problem+json", "text/")
+# Крупные тела сжимаем в потоке, чтобы не держать event loop
+_THREAD_MIN_BYTES = 256 * 1024
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """ASGI-middleware: br/gzip для ответов от minimum_size байт."""
+
+    def __init__(self, app, minimum_size: int | None = None, gzip_level: int | None = None,
+                 brotli_quality: int | None = None):
+        self.app = app
+        self.minimum_size = settings.RESPONSE_COMPRESSION_MIN_BYTES if minimum_size is None else minimum_size
+        self.gzip_level = settings.RESPONSE_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = settings.RESPONSE_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+
+    def choose_encoding(self, accept_encoding: str) -> str | None:
+        accepted = _accepted_encodings(accept_encoding)
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def _compressible(self, headers: MutableHeaders, status: int, body: bytes) -> bool:
+        if status < 200 or status in (204, 206, 304) or len(body) < self.minimum_size:
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(_COMPRESSIBLE_TYPES) and not content_type.startswith("text/event-stream")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = self.choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Заголовки придержим до первого куска тела
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start.setdefault("headers", []))
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._compressible(headers, start["status"], body):
+                await send(start)
+                await send(message)
+                return
+            if len(body) >= _THREAD_MIN_BYTES:
+                body = await asyncio.to_thread(self.compress, encoding, body)
+            else:
+                body = self.compress(encoding, body)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag is not None and not etag.startswith("W/"):
+                headers["etag"] = f"W/{etag}"
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
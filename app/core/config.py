@@ -4,6 +4,7 @@
 # Экземпляр settings импортируется в других модулях.
 
 import os
+import tempfile
 import warnings
 from pathlib import Path
 
@@ -54,8 +55,60 @@ class Settings:
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", str(60 * 24 * 7)))
 
+    # Старт воркера: create_all (dev, рефлексия всей схемы) или check_revision
+    # (быстро: сверяет alembic_version с head миграций)
+    DB_STARTUP_MODE: str = os.getenv("DB_STARTUP_MODE", "create_all")
+    # Сколько секунд кэшировать результат пробы БД в /health/ready
+    READINESS_CACHE_SECONDS: float = float(os.getenv("READINESS_CACHE_SECONDS", "2"))
+
+    # Реплики для чтения: URL через запятую (пусто — все запросы на primary)
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    # Реплика с отставанием больше порога не используется
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_HEALTH_CHECK_INTERVAL: float = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "5"))
+
+    # Пул соединений и таймауты БД (для sqlite параметры пула не применяются)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_CONNECT_TIMEOUT: int = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+    # 0 — без ограничения времени выполнения запроса
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    # Кэш скомпилированных SQL в SQLAlchemy и кэш prepared statements asyncpg
+    DB_QUERY_CACHE_SIZE: int = int(os.getenv("DB_QUERY_CACHE_SIZE", "500"))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+    # Async-режим: create_async_engine + AsyncSession (get_async_db, лента и корзина через get_read_query)
+    DB_ASYNC_ENABLED: bool = os.getenv("DB_ASYNC_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    # Пароли: стоимость bcrypt и пул потоков для хеширования.
+    # При изменении BCRYPT_ROUNDS хеш пользователя обновится при следующем логине.
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+    # Сколько запросов может ждать свободный поток; сверх этого — 429
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
     # Путь для загрузки фай��ов (dev)
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", str(BASE_DIR / "static_uploads"))
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+
+    # Хранилище файлов: local (UPLOAD_DIR) | s3 (S3-совместимое, нужен boto3)
+    FILE_STORAGE_BACKEND: str = os.getenv("FILE_STORAGE_BACKEND", "local")
+    FILE_STORAGE_S3_BUCKET: str = os.getenv("FILE_STORAGE_S3_BUCKET", "")
+    FILE_STORAGE_S3_ENDPOINT: str = os.getenv("FILE_STORAGE_S3_ENDPOINT", "")
+    FILE_STORAGE_S3_PREFIX: str = os.getenv("FILE_STORAGE_S3_PREFIX", "")
+    # Префикс internal-location nginx (например /protected_uploads/): файл отдаёт
+    # nginx через sendfile, приложение только ставит X-Accel-Redirect
+    FILE_STORAGE_ACCEL_REDIRECT: str = os.getenv("FILE_STORAGE_ACCEL_REDIRECT", "")
+
+    # Уменьшенные копии фото: имя:ширина; кэш в UPLOAD_DIR/variants с бюджетом в байтах
+    IMAGE_VARIANT_SIZES: str = os.getenv("IMAGE_VARIANT_SIZES", "thumb:160,small:320,medium:640,large:1280")
+    IMAGE_CACHE_MAX_BYTES: int = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+    # Как часто воркер пересчитывает размер кэша по каталогу (файлы всех воркеров)
+    IMAGE_CACHE_RESCAN_SECONDS: float = float(os.getenv("IMAGE_CACHE_RESCAN_SECONDS", "60"))
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+    # Форматы, которые генерируются сразу при загрузке (остальные — при первом запросе)
+    IMAGE_PREGENERATE_FORMATS: str = os.getenv("IMAGE_PREGENERATE_FORMATS", "webp")
 
     # Окружение (development, staging, production)
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
@@ -64,8 +117,121 @@ class Settings:
     DELIVERY_FREE_THRESHOLD: float = float(os.getenv("DELIVERY_FREE_THRESHOLD", "1500.0"))
     DELIVERY_FEE: float = float(os.getenv("DELIVERY_FEE", "350.0"))
 
+    # Планирование курьерских маршрутов (app.services.route_planner): склад,
+    # стопов на курьера, средняя скорость и коэффициент извилистости дорог к
+    # расстоянию по прямой, минут на вручение, начало смены (UTC, ЧЧ:ММ).
+    # Кластеры решаются в пуле процессов, если стопов не меньше ROUTE_PLANNER_PARALLEL_MIN_STOPS
+    COURIER_DEPOT_LAT: float = float(os.getenv("COURIER_DEPOT_LAT", "55.7558"))
+    COURIER_DEPOT_LON: float = float(os.getenv("COURIER_DEPOT_LON", "37.6173"))
+    COURIER_MAX_STOPS: int = int(os.getenv("COURIER_MAX_STOPS", "25"))
+    COURIER_SPEED_KMH: float = float(os.getenv("COURIER_SPEED_KMH", "20"))
+    COURIER_ROAD_FACTOR: float = float(os.getenv("COURIER_ROAD_FACTOR", "1.3"))
+    COURIER_SERVICE_MINUTES: float = float(os.getenv("COURIER_SERVICE_MINUTES", "5"))
+    COURIER_SHIFT_START: str = os.getenv("COURIER_SHIFT_START", "07:00")
+    # Пул создаётся в каждом воркере uvicorn, поэтому по умолчанию не больше 4 процессов
+    ROUTE_PLANNER_WORKERS: int = int(os.getenv("ROUTE_PLANNER_WORKERS", str(min(4, os.cpu_count() or 2))))
+    ROUTE_PLANNER_PARALLEL_MIN_STOPS: int = int(os.getenv("ROUTE_PLANNER_PARALLEL_MIN_STOPS", "300"))
+
+    # Резервирование товаров: запросы одного воркера обрабатываются пачками
+    # в одной транзакции (одна блокировка строки товара на пачку)
+    RESERVATION_BATCH_SIZE: int = int(os.getenv("RESERVATION_BATCH_SIZE", "100"))
+    RESERVATION_BATCH_WINDOW_MS: float = float(os.getenv("RESERVATION_BATCH_WINDOW_MS", "2"))
+    RESERVATION_TIMEOUT_SECONDS: float = float(os.getenv("RESERVATION_TIMEOUT_SECONDS", "10"))
+
+    # Очередь фоновых задач (таблица jobs). В production воркер лучше запускать
+    # отдельным процессом: python scripts/run_job_worker.py
+    JOB_WORKER_IN_APP: bool = os.getenv("JOB_WORKER_IN_APP", "false").lower() in ("1", "true", "yes")
+    JOB_BATCH_SIZE: int = int(os.getenv("JOB_BATCH_SIZE", "50"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+    JOB_VISIBILITY_TIMEOUT: float = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+    ORDER_TRANSITION_MAX_BATCH: int = int(os.getenv("ORDER_TRANSITION_MAX_BATCH", "1000"))
+    # Дашборд продаж (агрегаты sales_*): максимальная длина периода в днях
+    SALES_DASHBOARD_MAX_DAYS: int = int(os.getenv("SALES_DASHBOARD_MAX_DAYS", "366"))
+
     # Логирование
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # json | text; форматирование и запись — в отдельном потоке (app.core.logging)
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Доля успешных быстрых запросов, попадающих в access-лог (ошибки и медленные — всегда)
+    ACCESS_LOG_SAMPLE_RATE: float = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.05"))
+    ACCESS_LOG_SLOW_MS: float = float(os.getenv("ACCESS_LOG_SLOW_MS", "500"))
+
+    # Метрики Prometheus (/metrics). Для нескольких воркеров — общий пустой каталог;
+    # prometheus_client читает эту переменную окружения сам
+    PROMETHEUS_MULTIPROC_DIR: str = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+    # Как часто снимать пулы БД/bcrypt и задержку event loop, с
+    METRICS_SAMPLE_INTERVAL: float = float(os.getenv("METRICS_SAMPLE_INTERVAL", "1"))
+
+    # Профилировщик SQL (app.db.profiler): группировка запросов по форме на каждый
+    # HTTP-запрос и предупреждение, если форма повторилась QUERY_REPEAT_THRESHOLD раз (N+1)
+    QUERY_PROFILER_ENABLED: bool = os.getenv("QUERY_PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+    QUERY_REPEAT_THRESHOLD: int = int(os.getenv("QUERY_REPEAT_THRESHOLD", "10"))
+    # Медленные запросы логируются всегда (0 — выключено), SELECT — с планом EXPLAIN
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "500"))
+    SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+
+    # Синхронизация контактов (POST /api/users/contacts/lookup): номера без кода
+    # страны дополняются PHONE_DEFAULT_COUNTRY_CODE; лимиты — на запрос и на
+    # пользователя в час (в пределах воркера, 0 — без лимита)
+    PHONE_DEFAULT_COUNTRY_CODE: str = os.getenv("PHONE_DEFAULT_COUNTRY_CODE", "7")
+    CONTACT_SYNC_MAX_NUMBERS: int = int(os.getenv("CONTACT_SYNC_MAX_NUMBERS", "10000"))
+    CONTACT_SYNC_NUMBERS_PER_HOUR: int = int(os.getenv("CONTACT_SYNC_NUMBERS_PER_HOUR", "50000"))
+
+    # Сжатие JSON/текстовых ответов (app.core.compression): br, если установлен
+    # brotli и клиент его принимает, иначе gzip. Ответы меньше порога не сжимаются
+    RESPONSE_COMPRESSION_ENABLED: bool = os.getenv("RESPONSE_COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESPONSE_COMPRESSION_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "4096"))
+    RESPONSE_GZIP_LEVEL: int = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+    RESPONSE_BROTLI_QUALITY: int = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+    # Выгрузки для бухгалтерии (app.services.exports): строк в пачке курсора,
+    # разделитель CSV (";" — Excel с русской локалью), срок хранения файлов фоновых выгрузок
+    EXPORT_BATCH_ROWS: int = int(os.getenv("EXPORT_BATCH_ROWS", "2000"))
+    EXPORT_CSV_DELIMITER: str = os.getenv("EXPORT_CSV_DELIMITER", ";")
+    EXPORT_FILE_TTL_HOURS: float = float(os.getenv("EXPORT_FILE_TTL_HOURS", "24"))
+
+    # Кэш аутентифицированных пользователей (get_current_user)
+    AUTH_CACHE_ENABLED: bool = os.getenv("AUTH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    AUTH_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+    AUTH_CACHE_MAX_SIZE: int = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+    # Файл-журнал для инвалидации между воркерами; пустая строка — только локально
+    AUTH_CACHE_BROADCAST_FILE: str = os.getenv(
+        "AUTH_CACHE_BROADCAST_FILE",
+        str(Path(tempfile.gettempdir()) / "projectphoenix_auth_invalidations.log")
+    )
+
+    # Кэш первых страниц ленты каталога (сбрасывается при публикации/изменении товаров)
+    CATALOG_CACHE_TTL_SECONDS: float = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "60"))
+    CATALOG_CACHE_BROADCAST_FILE: str = os.getenv(
+        "CATALOG_CACHE_BROADCAST_FILE",
+        str(Path(tempfile.gettempdir()) / "projectphoenix_catalog_invalidations.log")
+    )
+
+    # Живая лента канала (SSE/WebSocket). Между воркерами — Postgres LISTEN/NOTIFY,
+    # в остальных случаях — периодическая проверка новых постов раз в CHANNEL_POLL_INTERVAL
+    CHANNEL_QUEUE_SIZE: int = int(os.getenv("CHANNEL_QUEUE_SIZE", "256"))
+    CHANNEL_MAX_SUBSCRIBERS: int = int(os.getenv("CHANNEL_MAX_SUBSCRIBERS", "10000"))
+    CHANNEL_HISTORY_SIZE: int = int(os.getenv("CHANNEL_HISTORY_SIZE", "1000"))
+    CHANNEL_POLL_INTERVAL: float = float(os.getenv("CHANNEL_POLL_INTERVAL", "5"))
+    CHANNEL_HEARTBEAT_SECONDS: float = float(os.getenv("CHANNEL_HEARTBEAT_SECONDS", "15"))
+    CHANNEL_NOTIFY_NAME: str = os.getenv("CHANNEL_NOTIFY_NAME", "channel_posts")
+
+    # Уведомления (app.services.notifications): транспорт log | file | http
+    NOTIFICATIONS_TRANSPORT: str = os.getenv("NOTIFICATIONS_TRANSPORT", "log")
+    NOTIFICATIONS_FILE: str = os.getenv(
+        "NOTIFICATIONS_FILE",
+        str(Path(tempfile.gettempdir()) / "projectphoenix_notifications.jsonl")
+    )
+    NOTIFICATIONS_HTTP_URL: str = os.getenv("NOTIFICATIONS_HTTP_URL", "")
+    NOTIFICATIONS_DEAD_LETTER_FILE: str = os.getenv(
+        "NOTIFICATIONS_DEAD_LETTER_FILE",
+        str(Path(tempfile.gettempdir()) / "projectphoenix_notifications_dead.jsonl")
+    )
+    NOTIFICATIONS_QUEUE_SIZE: int = int(os.getenv("NOTIFICATIONS_QUEUE_SIZE", "10000"))
+    NOTIFICATIONS_COALESCE_MS: float = float(os.getenv("NOTIFICATIONS_COALESCE_MS", "500"))
+    NOTIFICATIONS_BATCH_SIZE: int = int(os.getenv("NOTIFICATIONS_BATCH_SIZE", "100"))
+    NOTIFICATIONS_MAX_ATTEMPTS: int = int(os.getenv("NOTIFICATIONS_MAX_ATTEMPTS", "5"))
 
     def validate(self) -> None:
         """Выполняет всё время при создании settings."""
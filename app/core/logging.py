@@ -0,0 +1,294 @@
+# app/core/logging.py
+# Логирование: JSON-строки, форматируемые вне пути запроса, и тайминги запросов.
+#
+# - setup_logging() вешает на корневой логгер QueueHandler: поток запроса
+#   подставляет аргументы и кладёт LogRecord в очередь, а JSON
+#   (python-json-logger) и запись в stderr выполняются в потоке QueueListener.
+#   Очередь ограничена: при переполнении записи отбрасываются и считаются.
+# - RequestTimingMiddleware (чистый ASGI) на каждый запрос выдаёт request id
+#   (X-Request-ID), меряет длительность, время и число запросов к БД
+#   (события SQLAlchemy before/after_cursor_execute) и копит статистику по
+#   шаблонам маршрутов. Access-лог сэмплируется (ACCESS_LOG_SAMPLE_RATE);
+#   ошибки и медленные запросы (ACCESS_LOG_SLOW_MS) пишутся всегда.
+import atexit
+import copy
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import warnings
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+try:
+    from pythonjsonlogger import jsonlogger
+except ImportError:  # python-json-logger не установлен — пишем текстом
+    jsonlogger = None
+
+access_logger = logging.getLogger("app.access")
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+_JSON_FORMAT = "%(asctime)s %(levelname)s %(name)s %(request_id)s %(message)s"
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+# --- Контекст запроса ---
+
+class RequestStats:
+    """Счётчики текущего запроса; общий объект для event loop и потоков threadpool."""
+
+    __slots__ = ("request_id", "db_seconds", "db_queries")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.db_seconds = 0.0
+        self.db_queries = 0
+
+
+_current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def current_request() -> RequestStats | None:
+    return _current_request.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_request.get() is not None:
+        context._timing_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    started = getattr(context, "_timing_started", None)
+    if stats is not None and started is not None:
+        stats.db_seconds += time.perf_counter() - started
+        stats.db_queries += 1
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет в запись request_id текущего запроса (выполняется в потоке вызова)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            stats = _current_request.get()
+            record.request_id = stats.request_id if stats is not None else "-"
+        return True
+
+
+# --- Очередь логов ---
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler, который оставляет слушателю форматтер (JSON, дата и т.п.).
+    Стандартный prepare() целиком форматирует запись в потоке вызова; здесь в
+    потоке вызова только подставляются args (объекты вроде ORM-моделей к
+    моменту записи слушателем могут измениться) и рендерится traceback
+    (exc_info держит кадры стека со всеми локальными переменными).
+    """
+
+    _exception_formatter = logging.Formatter()
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LoggingState:
+    handler: DeferredQueueHandler | None = None
+    listener: QueueListener | None = None
+    lock = threading.Lock()
+
+
+def _build_formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        if jsonlogger is not None:
+            return jsonlogger.JsonFormatter(_JSON_FORMAT, rename_fields={"levelname": "level", "name": "logger"})
+        warnings.warn("LOG_FORMAT=json requires python-json-logger, falling back to text")
+    return logging.Formatter(_TEXT_FORMAT)
+
+
+def setup_logging(level: str | None = None, log_format: str | None = None, stream=None) -> None:
+    """
+    Настраивает корневой логгер: QueueHandler -> QueueListener -> stderr.
+    Повторный вызов ничего не делает (reload, тесты).
+    """
+    with _LoggingState.lock:
+        if _LoggingState.listener is not None:
+            return
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(_build_formatter((log_format or settings.LOG_FORMAT).lower()))
+        handler = DeferredQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+        handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        for existing in root.handlers[:]:
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level or settings.LOG_LEVEL)
+        # processName/process в формат не входят — не тратим на них время в каждой записи
+        logging.logMultiprocessing = False
+        logging.logProcesses = False
+        # Свой access-лог uvicorn отключаем (его заменяет RequestTimingMiddleware),
+        # остальные логи uvicorn идут через общую очередь
+        for name in ("uvicorn", "uvicorn.error"):
+            logging.getLogger(name).handlers.clear()
+            logging.getLogger(name).propagate = True
+        logging.getLogger("uvicorn.access").disabled = True
+
+        listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        listener.start()
+        _LoggingState.handler, _LoggingState.listener = handler, listener
+
+
+def shutdown_logging() -> None:
+    """Дописывает оставшиеся в очереди записи и останавливает поток слушателя."""
+    with _LoggingState.lock:
+        listener, _LoggingState.listener = _LoggingState.listener, None
+    if listener is not None:
+        listener.stop()
+
+
+atexit.register(shutdown_logging)
+
+
+def logging_stats() -> dict:
+    handler = _LoggingState.handler
+    if handler is None:
+        return {"configured": False}
+    return {"configured": True, "queue_depth": handler.queue.qsize(), "dropped": handler.dropped}
+
+
+# --- Тайминги запросов ---
+
+class RouteTimings:
+    """Накопленная статистика по шаблонам маршрутов (/api/products/{draft_id}, ...)."""
+
+    def __init__(self):
+        self._routes: dict[tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, status: int, seconds: float, db_seconds: float) -> None:
+        key = (method, route)
+        with self._lock:
+            entry = self._routes.get(key)
+            if entry is None:
+                # count, errors (5xx), total, db total, max
+                entry = self._routes[key] = [0, 0, 0.0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += status >= 500
+            entry[2] += seconds
+            entry[3] += db_seconds
+            entry[4] = max(entry[4], seconds)
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            items = [(key, list(entry)) for key, entry in self._routes.items()]
+        return [
+            {
+                "method": method,
+                "route": route,
+                "count": count,
+                "errors": errors,
+                "avg_ms": round(total / count * 1000, 2),
+                "avg_db_ms": round(db_total / count * 1000, 2),
+                "max_ms": round(max_seconds * 1000, 2),
+            }
+            for (method, route), (count, errors, total, db_total, max_seconds) in sorted(items)
+        ]
+
+
+route_timings = RouteTimings()
+
+
+def route_template(scope) -> str:
+    # FastAPI кладёт совпавший маршрут в scope; неизвестные пути сводим в один
+    # ключ, чтобы сканеры не раздували статистику. Новые FastAPI хранят в route
+    # путь без префикса роутера, полный — в effective_route_context
+    effective = scope.get("fastapi", {}).get("effective_route_context")
+    route = effective if effective is not None else scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class RequestTimingMiddleware:
+    """ASGI-middleware: request id, длительность, время БД, сэмплированный access-лог."""
+
+    def __init__(self, app, sample_rate: float | None = None, slow_ms: float | None = None):
+        self.app = app
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_seconds = (settings.ACCESS_LOG_SLOW_MS if slow_ms is None else slow_ms) / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None or not _REQUEST_ID_RE.match(request_id):
+            request_id = os.urandom(8).hex()
+        stats = RequestStats(request_id)
+        token = _current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            route = route_template(scope)
+            route_timings.record(scope["method"], route, status, elapsed, stats.db_seconds)
+            if status >= 500 or elapsed >= self.slow_seconds or random.random() < self.sample_rate:
+                access_logger.log(
+                    logging.WARNING if status >= 500 else logging.INFO,
+                    "%s %s %s %.1fms",
+                    scope["method"], scope["path"], status, elapsed * 1000,
+                    extra={
+                        "request_id": request_id,
+                        "method": scope["method"],
+                        "route": route,
+                        "path": scope["path"],
+                        "status": status,
+                        "duration_ms": round(elapsed * 1000, 2),
+                        "db_ms": round(stats.db_seconds * 1000, 2),
+                        "db_queries": stats.db_queries,
+                        "sampled": status < 500 and elapsed < self.slow_seconds,
+                    },
+                )
@@ -0,0 +1,237 @@
+# app/core/metrics.py
+# Метрики Prometheus (prometheus_client), отдаются на /metrics.
+#
+# - HTTP: гистограмма длительности и счётчик запросов по шаблону маршрута,
+#   запросы в обработке (MetricsMiddleware).
+# - БД: число и длительность SQL по типу (SELECT/INSERT/...) из событий
+#   SQLAlchemy; выдачи соединений из пула, время ожидания соединения,
+#   занятые соединения и overflow.
+# - Пул bcrypt (занятость, очередь, отказы) и задержка event loop —
+#   их раз в METRICS_SAMPLE_INTERVAL снимает MetricsSampler.
+# - Уведомления: глубина очереди, время отправки пачки, отброшенные и ушедшие
+#   в dead-letter — пишет сам NotificationDispatcher (в том числе в воркере задач).
+#
+# Несколько воркеров uvicorn/gunicorn: задайте PROMETHEUS_MULTIPROC_DIR (пустой
+# каталог, очищается перед запуском сервера) — каждый процесс пишет значения в
+# свои mmap-файлы, а /metrics в любом воркере суммирует все процессы.
+import asyncio
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.logging import route_template
+
+MULTIPROCESS = bool(settings.PROMETHEUS_MULTIPROC_DIR)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=_LATENCY_BUCKETS
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being served", ["method"], multiprocess_mode="livesum"
+)
+
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["operation"])
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement latency", ["operation"], buckets=_QUERY_BUCKETS
+)
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connections checked out of the pool", ["pool"])
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection", ["pool"], buckets=_QUERY_BUCKETS
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections in use", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections open above pool_size", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured pool_size", ["pool"], multiprocess_mode="livesum")
+
+BCRYPT_RUNNING = Gauge("bcrypt_pool_running", "bcrypt tasks running", multiprocess_mode="livesum")
+BCRYPT_QUEUED = Gauge("bcrypt_pool_queued", "bcrypt tasks waiting for a thread", multiprocess_mode="livesum")
+BCRYPT_WORKERS = Gauge("bcrypt_pool_workers", "bcrypt pool threads", multiprocess_mode="livesum")
+BCRYPT_REJECTED = Counter("bcrypt_pool_rejected_total", "bcrypt tasks rejected with 429")
+BCRYPT_COMPLETED = Counter("bcrypt_pool_completed_total", "bcrypt tasks completed")
+
+NOTIFICATIONS_QUEUE_DEPTH = Gauge(
+    "notifications_queue_depth", "Notifications waiting in the dispatcher queue", multiprocess_mode="livesum"
+)
+NOTIFICATIONS_SEND_LATENCY = Histogram(
+    "notifications_send_duration_seconds", "Notification batch send latency", buckets=_LATENCY_BUCKETS
+)
+NOTIFICATIONS_DROPPED = Counter("notifications_dropped_total", "Notifications dropped on a full queue")
+NOTIFICATIONS_DEAD_LETTERED = Counter(
+    "notifications_dead_lettered_total", "Notification messages dead-lettered after max_attempts"
+)
+
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Extra delay of a timer on the event loop", buckets=_QUERY_BUCKETS
+)
+
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip()[:6].upper()
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _metrics_query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _metrics_query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is not None:
+        operation = _operation(statement)
+        DB_QUERIES.labels(operation).inc()
+        DB_QUERY_LATENCY.labels(operation).observe(time.perf_counter() - started)
+
+
+# --- Пулы соединений ---
+
+_engines: dict[str, Engine] = {}
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Счётчик выдач и время ожидания соединения из пула engine."""
+    if name in _engines:
+        return
+    _engines[name] = engine
+    checkouts = DB_POOL_CHECKOUTS.labels(name)
+    wait = DB_POOL_WAIT.labels(name)
+    event.listen(engine, "checkout", lambda *args: checkouts.inc())
+
+    # Событие checkout приходит уже после ожидания, поэтому меряем сам
+    # pool.connect (после engine.dispose() пул новый — метрики ожидания пропадут)
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            wait.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+def _sample_pools() -> None:
+    for name, engine in _engines.items():
+        pool = engine.pool
+        for gauge, method in ((DB_POOL_CHECKED_OUT, "checkedout"), (DB_POOL_OVERFLOW, "overflow"),
+                              (DB_POOL_SIZE, "size")):
+            value = getattr(pool, method, None)
+            if callable(value):
+                # у QueuePool overflow() отрицателен, пока не превышен pool_size
+                gauge.labels(name).set(max(0, value()))
+
+
+# --- Периодический сбор ---
+
+class MetricsSampler:
+    """Фоновая задача: пулы, bcrypt, задержка event loop."""
+
+    def __init__(self, password_pool, interval: float | None = None):
+        self.password_pool = password_pool
+        self.interval = settings.METRICS_SAMPLE_INTERVAL if interval is None else interval
+        self._task: asyncio.Task | None = None
+        self._completed = 0
+        self._rejected = 0
+
+    def sample(self) -> None:
+        _sample_pools()
+        stats = self.password_pool.stats()
+        BCRYPT_RUNNING.set(stats["running"])
+        BCRYPT_QUEUED.set(stats["queued"])
+        BCRYPT_WORKERS.set(stats["workers"])
+        # Счётчики пула — накопительные, в Prometheus добавляем прирост
+        BCRYPT_COMPLETED.inc(stats["completed"] - self._completed)
+        BCRYPT_REJECTED.inc(stats["rejected"] - self._rejected)
+        self._completed, self._rejected = stats["completed"], stats["rejected"]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, loop.time() - expected))
+            self.sample()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if MULTIPROCESS:
+            # livesum-гаугам умершего процесса не место в сумме
+            multiprocess.mark_process_dead(os.getpid())
+
+
+# --- HTTP ---
+
+class MetricsMiddleware:
+    """ASGI-middleware: латентность и число запросов по шаблону маршрута."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            route = route_template(scope)
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Текст для /metrics; в многопроцессном режиме — сумма по всем воркерам."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
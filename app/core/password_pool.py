@@ -0,0 +1,84 @@
+# app/core/password_pool.py
+# Ограниченный пул потоков для bcrypt (хеширование и проверка паролей).
+# bcrypt отпускает GIL, поэтому потоки дают настоящий параллелизм, а отдельный
+# пул не даёт шторму логинов занять общий threadpool FastAPI.
+# Допуск (admission control): не больше workers + max_queue задач одновременно,
+# остальные сразу получают PasswordPoolBusy (в API превращается в 429).
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PasswordPoolBusy(Exception):
+    """Пул переполнен — запрос нужно отклонить."""
+
+
+class PasswordHasherPool:
+    """Async-обёртка над ThreadPoolExecutor с ограничением очереди."""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                return False
+            self._pending += 1
+            return True
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def _timed(self, fn, *args):
+        with self._lock:
+            self._running += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._running -= 1
+                self.busy_seconds += elapsed
+
+    async def run(self, fn, *args):
+        """Выполняет fn(*args) в пуле; при переполнении бросает PasswordPoolBusy."""
+        if not self._acquire():
+            raise PasswordPoolBusy()
+        try:
+            future = self._executor.submit(self._timed, fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Место освобождается, когда задача действительно закончилась в пуле:
+        # отмена ожидающей корутины (клиент отключился) не останавливает уже
+        # запущенный bcrypt, и слот не должен освобождаться раньше потока
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "busy_seconds": round(self.busy_seconds, 3),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
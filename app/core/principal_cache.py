@@ -0,0 +1,178 @@
+# app/core/principal_cache.py
+# In-process кэш аутентифицированных пользователей для get_current_user.
+# Ограниченный размер (LRU) + TTL, ключ — (user_id, token).
+# Инвалидация: локально сразу после commit, в соседние воркеры — через общий
+# файл-журнал (локальный broadcast): воркер дописывает id пользователя,
+# остальные видят рост файла по os.stat и выбрасывают записи.
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+from app.core.config import settings
+
+# После этого размера журнал обнуляется; читатели видят усечение и чистят кэш целиком
+_BROADCAST_MAX_BYTES = 1024 * 1024
+
+
+class InvalidationLog:
+    """Журнал инвалидаций, общий для воркеров одной машины."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offset = self._size()
+
+    def _size(self) -> int:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def publish(self, ids) -> None:
+        """Дописывает id (целые числа) в журнал (O_APPEND — запись атомарна)."""
+        data = "".join(f"{i}\n" for i in ids).encode()
+        if not data:
+            return
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            if os.fstat(fd).st_size > _BROADCAST_MAX_BYTES:
+                os.ftruncate(fd, 0)
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def poll(self):
+        """
+        Возвращает новые id из журнала.
+        None означает, что журнал был усечён и кэш нужно очистить полностью.
+        """
+        size = self._size()
+        if size == self._offset:
+            return []
+        if size < self._offset:
+            self._offset = size
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # Неполную последнюю строку дочитаем при следующем poll
+        end = chunk.rfind(b"\n") + 1
+        self._offset += end
+        return [int(line) for line in chunk[:end].split() if line.strip().isdigit()]
+
+
+class PrincipalCache:
+    """
+    Потокобезопасный LRU-кэш с TTL.
+    Хранит словарь с полями пользователя (без hashed_password).
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, broadcast_path: str | None = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._keys_by_user: dict[int, set] = {}
+        self._lock = threading.Lock()
+        self._log = None
+        if broadcast_path:
+            try:
+                self._log = InvalidationLog(broadcast_path)
+            except OSError as e:
+                warnings.warn(f"Auth cache broadcast disabled: {e}")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _sync_broadcast(self) -> None:
+        if self._log is None:
+            return
+        try:
+            user_ids = self._log.poll()
+        except OSError:
+            return
+        if user_ids is None:
+            self.clear()
+        else:
+            for uid in user_ids:
+                self.invalidate_user(uid, broadcast=False)
+
+    def get(self, user_id: int, token: str) -> dict | None:
+        """Возвращает закэшированного пользователя или None."""
+        self._sync_broadcast()
+        key = (user_id, token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= now:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def set(self, user_id: int, token: str, principal: dict) -> None:
+        key = (user_id, token)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key) -> None:
+        # Вызывается под self._lock
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def invalidate_user(self, user_id: int, broadcast: bool = True) -> None:
+        """Удаляет все токены пользователя; при broadcast=True — и в других воркерах."""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._drop(key)
+            self.invalidations += 1
+        if broadcast and self._log is not None:
+            try:
+                self._log.publish([user_id])
+            except OSError as e:
+                warnings.warn(f"Auth cache broadcast failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self) -> dict:
+        """Счётчики для мониторинга."""
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "enabled": settings.AUTH_CACHE_ENABLED,
+            "size": size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.AUTH_CACHE_MAX_SIZE,
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    broadcast_path=settings.AUTH_CACHE_BROADCAST_FILE or None,
+)
@@ -0,0 +1,48 @@
+# app/core/rate_limit.py
+# In-process ограничение частоты по ключу (обычно user_id): token bucket.
+# Ведро на capacity единиц пополняется равномерно за period секунд; запрос
+# списывает свою «стоимость» (например, число номеров в синхронизации контактов).
+# Лимит действует в пределах воркера: при N воркерах за period пройдёт до
+# N * capacity. Число ключей ограничено (LRU), вытесненный ключ начинает с полным ведром.
+import threading
+import time
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """Token bucket на ключ; capacity <= 0 — без ограничений."""
+
+    def __init__(self, capacity: float, period: float, max_keys: int = 100000):
+        self.capacity = capacity
+        self.rate = capacity / period if period > 0 else 0.0
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets: OrderedDict = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, key, cost: float = 1.0) -> float:
+        """
+        Списывает cost с ведра ключа. Возвращает 0, если запрос разрешён, иначе —
+        через сколько секунд в ведре наберётся cost (ничего не списывается).
+        """
+        if self.capacity <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                self.rejected += 1
+                needed = min(cost, self.capacity) - tokens
+                wait = needed / self.rate if self.rate > 0 else float("inf")
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._buckets), "rejected": self.rejected}
@@ -4,13 +4,22 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.requests import HTTPConnection
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core.password_pool import PasswordHasherPool, PasswordPoolBusy
+from app.core.principal_cache import principal_cache
+from app.db.session import SessionLocal, AsyncSessionLocal, ReadSessionLocal, client_last_write, replica_router
 from app.models.user import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+password_pool = PasswordHasherPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
 def get_password_hash(password: str) -> str:
@@ -21,6 +30,31 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверяем пароль при логине."""
     return pwd_context.verify(plain_password, hashed_password)
 
+def _pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many authentication requests, retry later",
+        headers={"Retry-After": "1"},
+    )
+
+async def get_password_hash_async(password: str) -> str:
+    """Хеширует пароль в пуле bcrypt, не занимая event loop и общий threadpool."""
+    try:
+        return await password_pool.run(pwd_context.hash, password)
+    except PasswordPoolBusy:
+        raise _pool_busy()
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Проверяет пароль в пуле bcrypt.
+    Возвращает (ok, new_hash): new_hash не None, если хеш нужно пересчитать
+    под текущие настройки CryptContext (например, изменился BCRYPT_ROUNDS).
+    """
+    try:
+        return await password_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
+    except PasswordPoolBusy:
+        raise _pool_busy()
+
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     """Создаём JWT токен с полем sub = subject (обычно id пользователя)."""
     to_encode = {"sub": str(subject)}
@@ -32,14 +66,85 @@ def create_access_token(subject: str, expires_delta: timedelta | None = None) ->
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def get_db():
+def get_db(connection: HTTPConnection):
     """Зависимость для получения сессии БД в эндпоинтах."""
     db = SessionLocal()
+    # Через состояние запроса get_read_db узнаёт, что запрос уже писал в БД
+    db.info["request_state"] = connection.state
     try:
         yield db
     finally:
         db.close()
 
+def _open_read_session(connection: HTTPConnection) -> Session:
+    db = ReadSessionLocal()
+    db.info["request_state"] = connection.state
+    if replica_router is not None:
+        db.info["replica"] = replica_router.pick(client_last_write(connection))
+    return db
+
+def get_read_db(connection: HTTPConnection):
+    """
+    Зависимость для read-only эндпоинтов: SELECT идут на реплику (если настроены).
+    Если запрос уже что-то записал, чтения возвращаются на primary.
+    """
+    db = _open_read_session(connection)
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_read_query(connection: HTTPConnection):
+    """
+    Зависимость для горячих async-эндпоинтов (лента, корзина): функция
+    `await query(stmt) -> list[Row]`.
+    При DB_ASYNC_ENABLED=true запросы идут через AsyncSession на async engine и
+    не занимают поток threadpool (реплики async engine не использует — читаем
+    с primary). Иначе — read-сессия как в get_read_db, запрос выполняется в
+    threadpool.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            async def query(stmt) -> list:
+                return (await db.execute(stmt)).all()
+
+            yield query
+        return
+    # pick() раз в REPLICA_HEALTH_CHECK_INTERVAL проверяет реплику соединением —
+    # не в event loop
+    db = await run_in_threadpool(_open_read_session, connection)
+
+    async def query(stmt) -> list:
+        return await run_in_threadpool(lambda: db.execute(stmt).all())
+
+    try:
+        yield query
+    finally:
+        await run_in_threadpool(db.close)
+
+# Поля пользователя, которые держим в кэше (hashed_password не кэшируем —
+# при обращении он догрузится из БД)
+_PRINCIPAL_FIELDS = ("id", "phone", "full_name", "role", "created_at", "blacklisted")
+
+async def get_async_db():
+    """
+    Async-зависимость: AsyncSession на async engine.
+    Доступна только при DB_ASYNC_ENABLED=true.
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async DB mode is disabled, set DB_ASYNC_ENABLED=true")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _user_to_principal(user: User) -> dict:
+    return {name: getattr(user, name) for name in _PRINCIPAL_FIELDS}
+
+def _principal_to_user(db: Session, principal: dict) -> User:
+    """Восстанавливает User из кэша и привязывает к сессии без запроса в БД."""
+    user = User(**principal)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     """Возвращает текущего пользователя по JWT или бросает 401."""
     credentials_exception = HTTPException(
@@ -54,17 +159,57 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
+    user_id = int(user_id)
+    principal = principal_cache.get(user_id, token) if settings.AUTH_CACHE_ENABLED else None
+    if principal is not None:
+        user = _principal_to_user(db, principal)
+    else:
+        # Отдельная короткая сессия: соединение сразу возвращается в пул. Иначе
+        # запрос держал бы одно соединение здесь и брал второе в get_read_db —
+        # при нагрузке больше половины пула запросы ждут друг друга до таймаута
+        with SessionLocal() as lookup:
+            found = lookup.get(User, user_id)
+            principal = _user_to_principal(found) if found is not None else None
+        if principal is None:
+            raise credentials_exception
+        if settings.AUTH_CACHE_ENABLED:
+            principal_cache.set(user_id, token, principal)
+        user = _principal_to_user(db, principal)
     if getattr(user, "blacklisted", False):
         raise HTTPException(status_code=403, detail="User is blacklisted")
     return user
 
-def require_role(role: str):
-    """Фабрика зависимости: проверяет роль пользователя."""
+# Инвалидация кэша: после flush запоминаем пользователей, у которых поменялись
+# role/blacklisted (или которые удалены), после commit — сбрасываем их записи.
+# Массовые query(...).update() эти события не видят — после них вызывайте
+# principal_cache.invalidate_user() вручную.
+_INVALIDATE_KEY = "principal_cache_invalidate"
+
+@event.listens_for(Session, "after_flush")
+def _collect_principal_changes(session, flush_context):
+    changed = session.info.setdefault(_INVALIDATE_KEY, set())
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if state.attrs.role.history.has_changes() or state.attrs.blacklisted.history.has_changes():
+                changed.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals(session):
+    for user_id in session.info.pop(_INVALIDATE_KEY, ()):
+        principal_cache.invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_changes(session):
+    session.info.pop(_INVALIDATE_KEY, None)
+
+def require_role(*roles: str):
+    """Фабрика зависимости: проверяет, что роль пользователя одна из roles (leader — всегда)."""
     def _checker(current_user: User = Depends(get_current_user)):
-        if current_user.role != role and current_user.role != "leader":
+        if current_user.role not in roles and current_user.role != "leader":
             raise HTTPException(status_code=403, detail="Insufficient privileges")
         return current_user
     return _checker
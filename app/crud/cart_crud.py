@@ -0,0 +1,108 @@
+# app/crud/cart_crud.py
+# Операции с корзиной: пакетные изменения и чтение корзины с итогами.
+# Число запросов не зависит от количества позиций:
+#   apply_bulk — проверка товаров, один upsert, один delete;
+#   cart_view  — один SELECT, итоги и доставка считаются в SQL.
+from sqlalchemy import case, delete, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.cart import CartItem
+from app.models.product import ProductDraft
+
+
+def _insert_for(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def apply_bulk(db: Session, user_id: int, changes: dict[int, int], mode: str) -> list[int]:
+    """
+    Применяет изменения {draft_id: quantity}.
+    mode="set" задаёт количество (0 удаляет позицию), mode="add" прибавляет к текущему.
+    Возвращает draft_id, которых нет в опубликованном каталоге (они пропускаются).
+    """
+    known = set(db.execute(
+        select(ProductDraft.id).where(ProductDraft.id.in_(changes), ProductDraft.published.is_(True))
+    ).scalars())
+    unknown = [draft_id for draft_id, quantity in changes.items() if quantity > 0 and draft_id not in known]
+
+    upserts = [
+        {"user_id": user_id, "draft_id": draft_id, "quantity": quantity}
+        for draft_id, quantity in changes.items()
+        if draft_id in known and quantity > 0
+    ]
+    removals = [draft_id for draft_id, quantity in changes.items() if quantity == 0 and mode == "set"]
+
+    if upserts:
+        table = CartItem.__table__
+        stmt = _insert_for(db)(table).values(upserts)
+        new_quantity = stmt.excluded.quantity
+        if mode == "add":
+            new_quantity = table.c.quantity + stmt.excluded.quantity
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.draft_id],
+            set_={"quantity": new_quantity},
+        ))
+    if removals:
+        db.execute(delete(CartItem).where(CartItem.user_id == user_id, CartItem.draft_id.in_(removals)))
+    db.commit()
+    return unknown
+
+
+def cart_view_query(user_id: int):
+    """Корзина одним запросом: позиции, сумма и стоимость доставки (оконные функции)."""
+    line_total = CartItem.quantity * ProductDraft.price
+    subtotal = func.sum(line_total).over()
+    delivery_fee = case(
+        (subtotal >= settings.DELIVERY_FREE_THRESHOLD, literal(0.0)),
+        else_=literal(settings.DELIVERY_FEE),
+    )
+    return (
+        select(
+            CartItem.draft_id,
+            CartItem.quantity,
+            ProductDraft.title,
+            ProductDraft.price,
+            ProductDraft.image_path,
+            ProductDraft.quantity.label("stock"),
+            line_total.label("line_total"),
+            subtotal.label("subtotal"),
+            delivery_fee.label("delivery_fee"),
+        )
+        .join(ProductDraft, ProductDraft.id == CartItem.draft_id)
+        .where(CartItem.user_id == user_id)
+        .order_by(CartItem.added_at, CartItem.id)
+    )
+
+
+def cart_view_from_rows(rows) -> dict:
+    """Ответ CartView из строк cart_view_query."""
+    subtotal_value = float(rows[0].subtotal) if rows else 0.0
+    fee_value = float(rows[0].delivery_fee) if rows else 0.0
+    return {
+        "items": [
+            {
+                "draft_id": row.draft_id,
+                "title": row.title,
+                "price": row.price,
+                "quantity": row.quantity,
+                "stock": row.stock,
+                "image_path": row.image_path,
+                "line_total": float(row.line_total),
+            }
+            for row in rows
+        ],
+        "subtotal": subtotal_value,
+        "delivery_fee": fee_value,
+        "total": subtotal_value + fee_value,
+        "free_delivery_threshold": settings.DELIVERY_FREE_THRESHOLD,
+    }
+
+
+def cart_view(db: Session, user_id: int) -> dict:
+    """Корзина одним запросом: позиции, сумма, стоимость доставки и итог."""
+    return cart_view_from_rows(db.execute(cart_view_query(user_id)).all())
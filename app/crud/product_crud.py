@@ -0,0 +1,215 @@
+# app/crud/product_crud.py
+# Операции с черновиками товаров (ProductDraft).
+import csv
+import io
+import re
+from datetime import datetime
+
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.product import ChannelPost, ProductDraft
+
+# Колонки, которые заполняет массовый импорт
+DRAFT_IMPORT_COLUMNS = ("creator_id", "sku", "title", "description", "price", "quantity", "image_path")
+# При повторном импорте того же артикула обновляем только данные поставщика
+_UPSERT_UPDATE_COLUMNS = ("title", "description", "price", "quantity", "image_path")
+
+
+def _upsert_executemany(connection, rows: list[dict]) -> None:
+    """INSERT ... ON CONFLICT (creator_id, sku) DO UPDATE пачкой (executemany)."""
+    table = ProductDraft.__table__
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.creator_id, table.c.sku],
+        set_={name: stmt.excluded[name] for name in _UPSERT_UPDATE_COLUMNS},
+    )
+    connection.execute(stmt, rows)
+
+
+def _upsert_copy(connection, rows: list[dict]) -> None:
+    """
+    Postgres: COPY во временную таблицу и один INSERT ... SELECT ... ON CONFLICT.
+    COPY на порядок быстрее executemany на больших пачках.
+    """
+    raw = connection.connection.driver_connection
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    now = datetime.utcnow().isoformat()
+    for row in rows:
+        writer.writerow([
+            "" if row[name] is None else row[name] for name in DRAFT_IMPORT_COLUMNS
+        ] + [now])
+    buf.seek(0)
+    columns = ", ".join(DRAFT_IMPORT_COLUMNS)
+    connection.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS product_drafts_import ("
+        "creator_id integer, sku varchar, title varchar, description text, "
+        "price double precision, quantity integer, image_path varchar, created_at timestamp"
+        ") ON COMMIT DELETE ROWS"
+    ))
+    with raw.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY product_drafts_import ({columns}, created_at) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in _UPSERT_UPDATE_COLUMNS)
+    connection.execute(text(
+        f"INSERT INTO product_drafts ({columns}, created_at, published) "
+        f"SELECT {columns}, created_at, false FROM product_drafts_import "
+        f"ON CONFLICT (creator_id, sku) DO UPDATE SET {updates}"
+    ))
+
+
+def bulk_upsert_drafts(connection, rows: list[dict]) -> int:
+    """
+    Вставляет/обновляет пачку черновиков по ключу (creator_id, sku).
+    Postgres + psycopg2 — через COPY, иначе (SQLite) — executemany.
+    Внутри пачки артикулы должны быть уникальны. Возвращает число строк.
+    Запись идёт в обход ORM: после commit вызывающий код сбрасывает кэш ленты
+    (app.core.catalog_cache.feed_cache.invalidate()) и отдаёт пополненный
+    остаток листу ожидания (order_processing.promote_after_restock).
+    """
+    if not rows:
+        return 0
+    if connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2":
+        _upsert_copy(connection, rows)
+    else:
+        _upsert_executemany(connection, rows)
+    return len(rows)
+
+
+# Колонки элемента ленты каталога: выбираем только нужное, без ORM-объектов
+# и ленивых связей
+CATALOG_COLUMNS = (
+    ChannelPost.id.label("post_id"),
+    ChannelPost.posted_at,
+    ProductDraft.id.label("draft_id"),
+    ProductDraft.title,
+    ProductDraft.description,
+    ProductDraft.price,
+    ProductDraft.quantity,
+    ProductDraft.image_path,
+)
+
+
+def catalog_item(row) -> dict:
+    """Строка CATALOG_COLUMNS -> элемент ленты (JSON-совместимый словарь)."""
+    return {
+        "post_id": row.post_id,
+        "draft_id": row.draft_id,
+        "title": row.title,
+        "description": row.description,
+        "price": row.price,
+        "quantity": row.quantity,
+        "image_path": row.image_path,
+        "posted_at": row.posted_at.isoformat(),
+    }
+
+
+def catalog_page_query(after: tuple[datetime, int] | None, limit: int):
+    """
+    Страница опубликованного каталога, от новых к старым.
+    Keyset-пагинация по (posted_at, id) с индексом ix_channel_posts_posted_at_id:
+    глубокие страницы стоят столько же, сколько первая (нет OFFSET).
+    Только запрос — выполняет его вызывающий (sync или async сессия).
+    """
+    stmt = (
+        select(*CATALOG_COLUMNS)
+        .join(ProductDraft, ProductDraft.id == ChannelPost.draft_id)
+        .where(ProductDraft.published.is_(True))
+        .order_by(ChannelPost.posted_at.desc(), ChannelPost.id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(ChannelPost.posted_at, ChannelPost.id) < tuple_(*after))
+    return stmt
+
+
+def catalog_page(db: Session, after: tuple[datetime, int] | None, limit: int) -> list:
+    return db.execute(catalog_page_query(after, limit)).all()
+
+
+def channel_posts_after(db: Session, after_id: int, limit: int) -> list:
+    """Посты канала с id > after_id по возрастанию id (живая лента и догонка после переподключения)."""
+    return db.execute(
+        select(*CATALOG_COLUMNS)
+        .join(ProductDraft, ProductDraft.id == ChannelPost.draft_id)
+        .where(ChannelPost.id > after_id, ProductDraft.published.is_(True))
+        .order_by(ChannelPost.id)
+        .limit(limit)
+    ).all()
+
+
+def publish_draft(db: Session, draft: ProductDraft) -> ChannelPost:
+    """Публикует черновик в канал: published = True, новая запись ChannelPost и задача уведомлений."""
+    from app.services import job_queue
+
+    draft.published = True
+    post = ChannelPost(draft_id=draft.id)
+    db.add(post)
+    db.flush()
+    # Уведомления подписчикам — фоновой задачей в той же транзакции
+    job_queue.enqueue(db, "channel_post_published", [{"post_id": post.id, "draft_id": draft.id, "title": draft.title}])
+    db.commit()
+    db.refresh(post)
+    return post
+
+
+# Слова запроса: буквы/цифры любого алфавита; остальное (операторы tsquery/FTS5) отбрасываем
+_SEARCH_WORD_RE = re.compile(r"\w+", re.UNICODE)
+SNIPPET_START, SNIPPET_STOP = "<b>", "</b>"
+
+_SEARCH_SQL_POSTGRES = text(f"""
+    WITH q AS (SELECT to_tsquery('russian', :tsquery) AS tsq),
+    hits AS (
+        SELECT d.id,
+               ts_rank_cd(d.search_vector, q.tsq) + word_similarity(:raw, lower(d.title)) AS rank
+        FROM product_drafts d, q
+        WHERE d.published
+          AND (d.search_vector @@ q.tsq OR :raw <% lower(d.title))
+        ORDER BY rank DESC, d.id DESC
+        LIMIT :limit
+    )
+    SELECT d.id AS draft_id, d.title, d.price, d.image_path, hits.rank,
+           ts_headline('russian', d.title || ' — ' || coalesce(d.description, ''), q.tsq,
+                       'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxWords=20, MinWords=5') AS snippet
+    FROM hits JOIN product_drafts d ON d.id = hits.id, q
+    ORDER BY hits.rank DESC, d.id DESC
+""")
+
+_SEARCH_SQL_SQLITE = text(f"""
+    SELECT d.id AS draft_id, d.title, d.price, d.image_path,
+           -bm25(product_drafts_fts, 10.0, 1.0) AS rank,
+           snippet(product_drafts_fts, -1, '{SNIPPET_START}', '{SNIPPET_STOP}', '…', 12) AS snippet
+    FROM product_drafts_fts
+    JOIN product_drafts d ON d.id = product_drafts_fts.rowid
+    WHERE product_drafts_fts MATCH :match AND d.published
+    ORDER BY bm25(product_drafts_fts, 10.0, 1.0), d.id DESC
+    LIMIT :limit
+""")
+
+
+def search_drafts(db: Session, query: str, limit: int) -> list:
+    """
+    Поиск опубликованных товаров по названию и описанию.
+    Каждое слово ищется как префикс. Postgres — tsvector (russian, со стеммингом),
+    плюс pg_trgm word_similarity по названию для опечаток. SQLite — FTS5 с bm25
+    (без нечёткого поиска). Совпадения в snippet выделены <b>...</b>.
+    """
+    words = [w.lower() for w in _SEARCH_WORD_RE.findall(query)]
+    if not words:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        params = {
+            "tsquery": " & ".join(f"{w}:*" for w in words),
+            "raw": " ".join(words),
+            "limit": limit,
+        }
+        return db.execute(_SEARCH_SQL_POSTGRES, params).all()
+    match = " ".join(f'"{w}"*' for w in words)
+    return db.execute(_SEARCH_SQL_SQLITE, {"match": match, "limit": limit}).all()
@@ -0,0 +1,85 @@
+# app/crud/user_crud.py
+# Операции с пользователями: пакетный поиск по номерам телефонов (синхронизация контактов).
+# Номера книги приводятся к виду +<цифры> (E.164) — в нём же хранится users.phone
+# (регистрация и логин нормализуют номер той же функцией); поиск идёт по
+# уникальному индексу users.phone одним
+# запросом на всю адресную книгу:
+#   Postgres — phone = ANY(:phones) с массивом в одном параметре;
+#   SQLite   — phone IN (SELECT value FROM json_each(:phones)).
+# В обоих случаях текст запроса не зависит от числа номеров (кэш планов и SQL).
+import json
+import re
+
+from sqlalchemy import String, any_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+
+# ASCII-мусор (пробелы, скобки, дефисы, буквы) удаляется одним str.translate по всей
+# книге сразу; регулярное выражение нужно только номерам с не-ASCII символами
+# (неразрывный пробел, типографские тире)
+_STRIP_ASCII = {code: None for code in range(128) if not chr(code).isdigit() and chr(code) not in "+\n"}
+_NOT_DIGITS = re.compile(r"[^0-9]+")
+
+
+def normalize_phones(numbers: list[str]) -> list[str | None]:
+    """
+    Номера в формате +<цифры>, None — не похоже на телефон.
+    Номер с + берётся как есть; без + 10 цифр — национальный номер (добавляется
+    код страны), 8XXXXXXXXXX при коде 7 — +7XXXXXXXXXX.
+    """
+    cleaned = "\n".join(numbers).translate(_STRIP_ASCII).split("\n")
+    if len(cleaned) != len(numbers):  # перевод строки внутри номера
+        cleaned = [number.replace("\n", "").translate(_STRIP_ASCII) for number in numbers]
+    country = settings.PHONE_DEFAULT_COUNTRY_CODE
+    trunk = country == "7"
+    result = []
+    for value in cleaned:
+        international = value[:1] == "+"
+        if international:
+            value = value[1:]
+        if not (value.isascii() and value.isdigit()):
+            value = _NOT_DIGITS.sub("", value)
+        length = len(value)
+        if international:
+            # Код страны уже есть
+            if length < 8 or length > 15:
+                result.append(None)
+                continue
+        elif length == 10:
+            value = country + value
+        elif trunk and length == 11 and value[0] == "8":
+            value = "7" + value[1:]
+        elif length < 11 or length > 15:
+            result.append(None)
+            continue
+        result.append("+" + value)
+    return result
+
+
+def normalize_phone(number: str) -> str | None:
+    """Один номер в формате users.phone (регистрация, логин), None — не телефон."""
+    return normalize_phones([number])[0]
+
+
+def find_by_phones(db: Session, phones: list[str]) -> list:
+    """
+    Незаблокированные пользователи с phone из списка (нормализованные номера):
+    строки (id, phone, full_name). Один SELECT по индексу users.phone.
+    """
+    if not phones:
+        return []
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        condition = User.phone == any_(bindparam("phones", phones, type_=ARRAY(String)))
+    elif dialect == "sqlite":
+        each = func.json_each(json.dumps(phones)).table_valued("value")
+        condition = User.phone.in_(select(each.c.value))
+    else:
+        condition = User.phone.in_(phones)
+    return db.execute(
+        select(User.id, User.phone, User.full_name)
+        .where(condition, User.blacklisted.is_not(True))
+    ).all()
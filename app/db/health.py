@@ -0,0 +1,102 @@
+# app/db/health.py
+# Проверки БД для старта и readiness-пробы.
+# - create_tables: старое поведение (Base.metadata.create_all), для dev.
+# - check_alembic_revision: быстрый режим — один запрос к alembic_version
+#   вместо рефлексии всей схемы.
+# - DatabaseProbe: реальный SELECT 1 с кэшированием результата на короткое время,
+#   чтобы частые пробы балансировщика не нагружали пул.
+import logging
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app.db.base import Base
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def create_tables(engine) -> None:
+    """Создаёт недостающие таблицы (рефлексия всей схемы — медленно)."""
+    Base.metadata.create_all(bind=engine)
+
+
+def alembic_heads() -> set[str]:
+    """Head-ревизии из каталога миграций alembic/."""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "alembic"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def check_alembic_revision(engine) -> tuple[bool, str]:
+    """
+    Сравнивает ревизию БД (таблица alembic_version) с head миграций.
+    Возвращает (ok, описание). Недоступность БД пробрасывается наружу.
+    """
+    heads = alembic_heads()
+    with engine.connect() as conn:
+        try:
+            current = {row[0] for row in conn.execute(text("SELECT version_num FROM alembic_version"))}
+        except Exception:
+            current = set()
+    if not heads:
+        # Без миграций сравнивать не с чем: такой старт не проверяет схему вовсе
+        return False, "no migrations in alembic/versions, use DB_STARTUP_MODE=create_all"
+    if current == heads:
+        return True, f"revision {', '.join(sorted(current))}"
+    return False, (
+        f"database revision {sorted(current) or 'none'} != head {sorted(heads)}, "
+        "run `alembic upgrade head`"
+    )
+
+
+def pool_stats(engine) -> dict:
+    """Состояние пула соединений (для QueuePool; у других пулов части полей нет)."""
+    pool = engine.pool
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+class DatabaseProbe:
+    """SELECT 1 с кэшированием результата на ttl_seconds."""
+
+    def __init__(self, engine, ttl_seconds: float):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._result: dict | None = None
+
+    def _run(self) -> dict:
+        started = time.perf_counter()
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            ok, error = True, None
+        except Exception as e:
+            logger.warning(f"Database probe failed: {e}")
+            ok, error = False, str(e)
+        return {
+            "ok": ok,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "error": error,
+        }
+
+    def check(self) -> dict:
+        """Результат последней пробы, если она свежая, иначе новая проба."""
+        with self._lock:
+            now = time.monotonic()
+            if self._result is None or now - self._checked_at >= self.ttl_seconds:
+                self._result = self._run()
+                self._checked_at = now
+            return dict(self._result, age_seconds=round(now - self._checked_at, 3))
@@ -0,0 +1,208 @@
+# app/db/profiler.py
+# Профилировщик SQL и детектор N+1.
+#
+# - События SQLAlchemy before/after_cursor_execute пишут каждый запрос в
+#   активный QueryProfile: запросы группируются по «форме» (нормализованный
+#   текст без литералов и с IN (...) вместо списка), одна форма, повторённая
+#   много раз за запрос, — типичный N+1 (ленивая загрузка CartItem.draft,
+#   Order.items, OrderItem.draft, ProductDraft.creator в цикле).
+# - QueryProfilerMiddleware (QUERY_PROFILER_ENABLED) профилирует каждый HTTP-запрос
+#   и пишет предупреждение, если форма повторилась QUERY_REPEAT_THRESHOLD раз.
+# - Медленные запросы (SLOW_QUERY_MS) логируются всегда, с планом EXPLAIN
+#   (не чаще раза в минуту на форму).
+# - profile_queries() — для тестов (фикстура query_budget в app/tests/conftest.py)
+#   и ручного профилирования скриптов.
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.logging import route_template
+
+logger = logging.getLogger(__name__)
+
+_EXPLAIN_PREFIX = {"postgresql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN "}
+_EXPLAIN_INTERVAL = 60
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+|\?")
+_IN_LIST_RE = re.compile(r"\bIN \((?:\s*\?\s*,?)+\)|\bIN \(__\[POSTCOMPILE_\w+\]\)", re.IGNORECASE)
+_VALUES_RE = re.compile(r"\bVALUES (?:\((?:\s*\?\s*,?)+\)\s*,?\s*)+", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+_COLUMNS_RE = re.compile(r"^SELECT (?:DISTINCT )?.+? FROM ", re.IGNORECASE)
+
+
+def normalize(statement: str) -> str:
+    """Форма запроса: литералы и параметры -> ?, списки IN/VALUES свёрнуты."""
+    shape = _SPACE_RE.sub(" ", statement).strip()
+    shape = _STRING_RE.sub("?", shape)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _PARAM_RE.sub("?", shape)
+    shape = _IN_LIST_RE.sub("IN (...)", shape)
+    return _VALUES_RE.sub("VALUES (...) ", shape).strip()
+
+
+def abbreviate(shape: str, limit: int = 300) -> str:
+    """Форма для логов: без списка колонок SELECT, который занимает всю строку."""
+    return _COLUMNS_RE.sub("SELECT ... FROM ", shape, count=1)[:limit]
+
+
+class QueryProfile:
+    """Запросы, сгруппированные по форме: form -> [count, total_seconds]."""
+
+    def __init__(self):
+        self.shapes: dict[str, list] = {}
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float) -> None:
+        shape = normalize(statement)
+        with self._lock:
+            entry = self.shapes.get(shape)
+            if entry is None:
+                entry = self.shapes[shape] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            self.count += 1
+            self.seconds += seconds
+
+    def repeated(self, threshold: int) -> list[tuple[str, int, float]]:
+        """Формы, выполненные не меньше threshold раз — кандидаты в N+1."""
+        with self._lock:
+            items = [(shape, count, seconds) for shape, (count, seconds) in self.shapes.items()]
+        return sorted((item for item in items if item[1] >= threshold), key=lambda item: -item[1])
+
+    def report(self, limit: int = 10) -> str:
+        with self._lock:
+            items = sorted(self.shapes.items(), key=lambda item: -item[1][0])[:limit]
+        lines = [f"{self.count} queries, {self.seconds * 1000:.1f} ms:"]
+        lines += [f"  {count:4d}x {seconds * 1000:8.1f} ms  {abbreviate(shape)}" for shape, (count, seconds) in items]
+        return "\n".join(lines)
+
+
+_current_profile: ContextVar[QueryProfile | None] = ContextVar("query_profile", default=None)
+# Профиль «на весь процесс»: TestClient выполняет приложение в другом потоке,
+# куда contextvars теста не попадают
+_process_profiles: list[QueryProfile] = []
+_explained: dict[str, float] = {}
+
+
+@contextmanager
+def profile_queries(process_wide: bool = False):
+    """
+    Собирает запросы внутри блока в QueryProfile.
+    process_wide=True — запросы из всех потоков процесса (для тестов с TestClient).
+    """
+    profile = QueryProfile()
+    if process_wide:
+        _process_profiles.append(profile)
+        try:
+            yield profile
+        finally:
+            _process_profiles.remove(profile)
+    else:
+        token = _current_profile.set(profile)
+        try:
+            yield profile
+        finally:
+            _current_profile.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _profiler_query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profiler_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _profiler_query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_profiler_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+    for process_profile in _process_profiles:
+        process_profile.record(statement, elapsed)
+    if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        _log_slow_query(conn, statement, parameters, elapsed)
+
+
+def _log_slow_query(conn, statement: str, parameters, elapsed: float) -> None:
+    plan = None
+    shape = normalize(statement)
+    prefix = _EXPLAIN_PREFIX.get(conn.dialect.name)
+    now = time.monotonic()
+    if (settings.SLOW_QUERY_EXPLAIN and prefix and statement.lstrip()[:6].upper() in ("SELECT", "WITH")
+            and now - _explained.get(shape, -_EXPLAIN_INTERVAL) >= _EXPLAIN_INTERVAL):
+        if len(_explained) > 10000:
+            _explained.clear()
+        _explained[shape] = now
+        plan = _explain(conn, prefix + statement, parameters)
+    logger.warning(
+        "Slow query %.1f ms: %s%s",
+        elapsed * 1000, statement[:2000], f"\nEXPLAIN:\n{plan}" if plan else "",
+        extra={"query_ms": round(elapsed * 1000, 2), "query_shape": shape[:500]},
+    )
+
+
+def _explain(conn, statement: str, parameters) -> str | None:
+    """
+    План запроса (без ANALYZE — запрос повторно не выполняется). EXPLAIN идёт в
+    соединении запроса — видит его транзакцию и временные таблицы; на Postgres —
+    внутри SAVEPOINT: ошибка EXPLAIN иначе оборвала бы транзакцию запроса
+    (current transaction is aborted), и упали бы все его следующие запросы.
+    """
+    if isinstance(parameters, list):  # executemany — план не нужен
+        return None
+    dbapi_connection = conn.connection.dbapi_connection
+    savepoint = conn.dialect.name == "postgresql" and not getattr(dbapi_connection, "autocommit", False)
+    try:
+        cursor = dbapi_connection.cursor()
+        try:
+            if savepoint:
+                cursor.execute("SAVEPOINT query_profiler_explain")
+            try:
+                cursor.execute(statement, parameters)
+                rows = cursor.fetchall()
+            except Exception:
+                if savepoint:
+                    cursor.execute("ROLLBACK TO SAVEPOINT query_profiler_explain")
+                raise
+            if savepoint:
+                cursor.execute("RELEASE SAVEPOINT query_profiler_explain")
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f"(EXPLAIN failed: {e})"
+    return "\n".join(" | ".join(str(value) for value in row) for row in rows)
+
+
+class QueryProfilerMiddleware:
+    """ASGI-middleware: профиль запросов на каждый HTTP-запрос и предупреждение о N+1."""
+
+    def __init__(self, app, repeat_threshold: int | None = None):
+        self.app = app
+        self.repeat_threshold = repeat_threshold or settings.QUERY_REPEAT_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with profile_queries() as profile:
+            await self.app(scope, receive, send)
+        for shape, count, seconds in profile.repeated(self.repeat_threshold):
+            logger.warning(
+                "Possible N+1 in %s %s: %d x %s (%.1f ms)",
+                scope["method"], route_template(scope), count, abbreviate(shape), seconds * 1000,
+                extra={"query_shape": shape[:500], "query_count": count},
+            )
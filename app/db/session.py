@@ -1,19 +1,322 @@
 # app/db/session.py
 # Инициализация SQLAlchemy engine и фабрики сессий.
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+# Синхронный engine используется всегда (alembic, scripts/, текущие роуты).
+# Опционально (DB_ASYNC_ENABLED) создаётся async engine на asyncpg/aiosqlite:
+# он не занимает threadpool, поэтому один воркер держит много медленных клиентов.
+# Опционально (DATABASE_REPLICA_URLS) чтения read-only эндпоинтов идут на реплики.
+import itertools
+import logging
+import math
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
 DATABASE_URL = settings.DATABASE_URL
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
-# Для sqlite нужен connect_args, для Postgres — пустой dict
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 
-# pool_pre_ping полезен для долгоживущих соединений
-engine = create_engine(
-    DATABASE_URL,
-    connect_args=connect_args,
-    pool_pre_ping=True
-)
+def _pool_kwargs(url: str = DATABASE_URL) -> dict:
+    """Параметры пула из Settings (для sqlite оставляем пул по умолчанию)."""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+def _sync_connect_args(url: str = DATABASE_URL) -> dict:
+    # Для sqlite нужен check_same_thread, для Postgres — таймауты psycopg2
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False}
+    connect_args = {"connect_timeout": settings.DB_CONNECT_TIMEOUT}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    return connect_args
+
+
+def _create_sync_engine(url: str):
+    # pool_pre_ping полезен для долгоживущих соединений
+    return create_engine(
+        url,
+        connect_args=_sync_connect_args(url),
+        pool_pre_ping=True,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        **_pool_kwargs(url)
+    )
+
+
+engine = _create_sync_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+logger = logging.getLogger(__name__)
+
+
+# --- Реплики для чтения -------------------------------------------------------
+# DATABASE_REPLICA_URLS — список URL через запятую. Read-only зависимости
+# (security.get_read_db) получают RoutingSession: SELECT уходят на реплику
+# (round-robin среди здоровых), всё остальное — на primary. Реплика считается
+# нездоровой, если недоступна или отстаёт больше REPLICA_MAX_LAG_SECONDS;
+# тогда чтения идут на primary.
+#
+# Read-your-writes между запросами: ответ на запрос, который писал в БД, несёт
+# время записи (cookie last_write и заголовок X-Last-Write, мобильный клиент
+# возвращает заголовок сам). Следующие чтения этого клиента идут только на
+# реплику, которая по последнему замеру отставания уже проиграла этот момент,
+# иначе — на primary.
+
+# Отставание реплики в секундах; 0, если WAL проигран полностью или это не реплика
+_PG_REPLICA_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+
+class ReplicaRouter:
+    """Round-robin по репликам с кэшированной проверкой здоровья и отставания."""
+
+    def __init__(self, urls: list[str], max_lag_seconds: float, check_interval: float):
+        self.urls = urls
+        self.engines = [_create_sync_engine(url) for url in urls]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        # index -> (checked_at, healthy, lag, replayed_until — time.time(), до которого данные на реплике)
+        self._health: dict[int, tuple[float, bool, float | None, float]] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.primary_fallbacks = 0
+        self.sticky_primary_reads = 0
+
+    def _measure_lag(self, replica) -> float:
+        with replica.connect() as conn:
+            if replica.dialect.name == "postgresql":
+                return float(conn.execute(_PG_REPLICA_LAG_SQL).scalar() or 0)
+            conn.execute(text("SELECT 1"))
+            return 0.0
+
+    def _check(self, index: int) -> tuple[float, bool, float | None, float]:
+        now = time.monotonic()
+        cached = self._health.get(index)
+        if cached is not None and now - cached[0] < self.check_interval:
+            return cached
+        started = time.time()
+        try:
+            lag = self._measure_lag(self.engines[index])
+            healthy = lag <= self.max_lag_seconds
+            if not healthy:
+                logger.warning(f"Replica {index} lag {lag:.1f}s > {self.max_lag_seconds}s, reading from primary")
+        except Exception as e:
+            logger.warning(f"Replica {index} health check failed: {e}")
+            lag, healthy = None, False
+        # Проигрывание WAL монотонно: всё, что записано до started - lag, на реплике уже есть
+        health = (now, healthy, lag, started - (lag or 0.0))
+        with self._lock:
+            self._health[index] = health
+        return health
+
+    def _is_healthy(self, index: int) -> bool:
+        return self._check(index)[1]
+
+    def pick(self, written_at: float | None = None):
+        """
+        Следующая здоровая реплика или None (тогда читаем с primary).
+        written_at — время последней записи клиента (time.time()): подходит
+        только реплика, которая уже проиграла этот момент.
+        """
+        count = len(self.engines)
+        start = next(self._counter)
+        lagging = False
+        for offset in range(count):
+            index = (start + offset) % count
+            _, healthy, _, replayed_until = self._check(index)
+            if not healthy:
+                continue
+            if written_at is not None and replayed_until < written_at:
+                lagging = True
+                continue
+            return self.engines[index]
+        if lagging:
+            self.sticky_primary_reads += 1
+        else:
+            self.primary_fallbacks += 1
+        return None
+
+    def stats(self) -> dict:
+        replicas = []
+        for index, url in enumerate(self.urls):
+            checked_at, healthy, lag, _ = self._health.get(index, (None, None, None, None))
+            replicas.append({
+                "url": make_url(url).render_as_string(hide_password=True),
+                "healthy": healthy,
+                "lag_seconds": lag,
+            })
+        return {
+            "replicas": replicas,
+            "primary_fallbacks": self.primary_fallbacks,
+            "sticky_primary_reads": self.sticky_primary_reads,
+        }
+
+    def dispose(self) -> None:
+        for replica in self.engines:
+            replica.dispose()
+
+
+def _wrote_in_request(session: Session) -> bool:
+    state = session.info.get("request_state")
+    return bool(state is not None and getattr(state, "db_wrote", False))
+
+
+class RoutingSession(Session):
+    """
+    Сессия для read-only эндпоинтов: SELECT — на реплику, выбранную при создании
+    сессии, запись и flush — на primary. После любой записи в рамках запроса
+    (в этой или другой сессии) чтения тоже идут на primary (read-your-writes).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self._flushing or _wrote_in_request(self):
+            return engine
+        if clause is not None and not getattr(clause, "is_select", False):
+            return engine
+        return replica
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
+
+
+def _mark_request_wrote(session: Session) -> None:
+    state = session.info.get("request_state")
+    if state is not None:
+        state.db_wrote = True
+
+
+@event.listens_for(Session, "after_flush")
+def _remember_flush(session, flush_context):
+    _mark_request_wrote(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _remember_dml(orm_execute_state):
+    # update()/delete()/insert() через session.execute проходят мимо flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_request_wrote(orm_execute_state.session)
+
+
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "x-last-write"
+
+
+def client_last_write(connection) -> float | None:
+    """
+    Время последней записи клиента из заголовка X-Last-Write или cookie.
+    Значения из будущего и старше окна, в котором реплика ещё может отставать,
+    не учитываются.
+    """
+    raw = connection.headers.get(LAST_WRITE_HEADER) or connection.cookies.get(LAST_WRITE_COOKIE)
+    try:
+        written_at = float(raw) if raw else None
+    except ValueError:
+        return None
+    if written_at is None:
+        return None
+    now = time.time()
+    window = settings.REPLICA_MAX_LAG_SECONDS + settings.REPLICA_HEALTH_CHECK_INTERVAL
+    return written_at if now - window <= written_at <= now + 1 else None
+
+
+class LastWriteMiddleware:
+    """
+    ASGI-middleware: если запрос писал в БД (request.state.db_wrote), ответ
+    получает время записи в cookie last_write и заголовке X-Last-Write.
+    Время берётся на старте ответа, то есть не раньше commit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.max_age = math.ceil(settings.REPLICA_MAX_LAG_SECONDS + settings.REPLICA_HEALTH_CHECK_INTERVAL)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_last_write(message):
+            if message["type"] == "http.response.start" and scope.get("state", {}).get("db_wrote"):
+                value = f"{time.time():.3f}".encode()
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (LAST_WRITE_HEADER.encode(), value),
+                    (b"set-cookie", b"%s=%s; Max-Age=%d; Path=/; HttpOnly; SameSite=Lax"
+                     % (LAST_WRITE_COOKIE.encode(), value, self.max_age)),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_last_write)
+
+
+replica_router = None
+if settings.DATABASE_REPLICA_URLS:
+    replica_router = ReplicaRouter(
+        [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+        max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL,
+    )
+
+
+def to_async_url(url: str) -> str:
+    """postgresql[+psycopg2]:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite://"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+        # Кэш подготовленных выражений на стороне SQLAlchemy-диалекта asyncpg
+        parsed = parsed.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+        )
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def _async_connect_args() -> dict:
+    if IS_SQLITE:
+        return {}
+    connect_args = {
+        "timeout": settings.DB_CONNECT_TIMEOUT,
+        # Кэш самого asyncpg; 0 — для pgbouncer в режиме transaction
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["command_timeout"] = settings.DB_STATEMENT_TIMEOUT_MS / 1000
+    return connect_args
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DB_ASYNC_ENABLED:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        to_async_url(DATABASE_URL),
+        connect_args=_async_connect_args(),
+        pool_pre_ping=True,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        **_pool_kwargs()
+    )
+    # expire_on_commit=False: после commit атрибуты доступны без ленивой
+    # подгрузки (в async она невозможна без await)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
@@ -1,60 +1,110 @@
 # app/main.py
-# Точка входа FastAPI. Создание таблиц выполняется в событии startup с обработкой ошибок.
+# Точка входа FastAPI. Инициализация схемы выполняется в событии startup с обработкой ошибок.
 
-import logging
 import time
+
+# Отсчёт холодного старта воркера — до импорта тяжёлых модулей
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 from typing import List
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db.session import engine
-from app.db.base import Base
+from app.db.session import LastWriteMiddleware, engine, async_engine, replica_router
+from app.db.health import DatabaseProbe, check_alembic_revision, create_tables, pool_stats
+from app.db.profiler import QueryProfilerMiddleware
 from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.logging import RequestTimingMiddleware, logging_stats, route_timings, setup_logging, shutdown_logging
+from app.core.metrics import MetricsMiddleware, MetricsSampler, instrument_engine
+from app.core.principal_cache import principal_cache
+from app.core.responses import ORJSONResponse
+from app.core.security import password_pool
+from app.services.order_processing import reservation_batcher
+from app.services.job_queue import JobWorker
+from app.services.channel_hub import channel_hub
+from app.services.notifications import notification_dispatcher
+from app.services.image_variants import variant_cache
+from app.services.route_planner import route_planner
 
 # Импорт моделей, чтобы SQLAlchemy видел их определения
 import app.models.user
 import app.models.product
 import app.models.cart
 import app.models.order
+import app.models.job
+import app.models.sales
+import app.models.delivery
 
-# Настройка логирования
-logging.basicConfig(level=settings.LOG_LEVEL)
+# Настройка логирования (JSON, запись в отдельном потоке)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def try_create_tables(retries: int = 5, delay: int = 2) -> bool:
+def _init_schema() -> None:
+    """Синхронная часть инициализации схемы (выполняется в отдельном потоке)."""
+    if settings.DB_STARTUP_MODE == "check_revision":
+        ok, message = check_alembic_revision(engine)
+        if not ok:
+            raise RuntimeError(message)
+        logger.info(f"✅ Database schema is up to date: {message}")
+    else:
+        create_tables(engine)
+        logger.info("✅ Database tables created (or already exist).")
+
+
+async def init_database(retries: int = 5, delay: float = 2) -> bool:
     """
-    Пытаемся создать таблицы с повторными попытками.
-    Если БД недоступна, логируем ошибку и пробуем снова.
+    Инициализация схемы с повторными попытками, не блокируя event loop.
+    Режим задаётся DB_STARTUP_MODE: create_all (dev) или check_revision
+    (быстрый старт: один запрос к alembic_version вместо рефлексии схемы).
 
     Args:
         retries: Количество попыток подключения
         delay: Задержка между попытками в секундах
 
     Returns:
-        True если таблицы созданы/существуют, False если все попытки исчерпаны
+        True если схема готова, False если все попытки исчерпаны
     """
     for attempt in range(1, retries + 1):
         try:
-            logger.info(f"Попытка создания таблиц ({attempt}/{retries})...")
-            Base.metadata.create_all(bind=engine)
-            logger.info("✅ Database tables created (or already exist).")
+            logger.info(f"Инициализация схемы БД, режим {settings.DB_STARTUP_MODE} ({attempt}/{retries})...")
+            await asyncio.to_thread(_init_schema)
             return True
         except Exception as e:
-            logger.warning(f"❌ Attempt {attempt}/{retries} failed to create tables: {e}")
+            logger.warning(f"❌ Attempt {attempt}/{retries} failed to initialize database: {e}")
             if attempt < retries:
                 logger.info(f"⏳ Waiting {delay}s before retry...")
-                time.sleep(delay)
+                await asyncio.sleep(delay)
             else:
                 logger.error(
-                    f"❌ Could not create tables after {retries} retries. "
+                    f"❌ Could not initialize database after {retries} retries. "
                     "Database initialization failed. Startup cannot continue."
                 )
                 return False
 
 
+db_probe = DatabaseProbe(engine, ttl_seconds=settings.READINESS_CACHE_SECONDS)
+job_worker = JobWorker(
+    batch_size=settings.JOB_BATCH_SIZE,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT,
+) if settings.JOB_WORKER_IN_APP else None
+metrics_sampler = MetricsSampler(password_pool)
+instrument_engine(engine, "primary")
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine, "async")
+if replica_router is not None:
+    for index, replica in enumerate(replica_router.engines):
+        instrument_engine(replica, f"replica{index}")
+startup_info = {"ready": False, "import_ms": None, "schema_ms": None, "total_ms": None}
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -62,22 +112,57 @@ async def lifespan(app: FastAPI):
     Запускается при старте и завершении приложения.
     """
     # Startup
+    setup_logging()  # повторно после shutdown (например, несколько TestClient подряд)
     logger.info("🚀 FastAPI starting up...")
-    if not try_create_tables(retries=5, delay=2):
-        logger.error("⚠️ Failed to create database tables. Application may not work correctly.")
+    startup_info["import_ms"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+    schema_started = time.perf_counter()
+    database_ready = await init_database(retries=5, delay=2)
+    if not database_ready:
+        logger.error("⚠️ Failed to initialize database. Application may not work correctly.")
         # В production должны было бы выкинуть исключение, но для разработки продолжаем
         if settings.ENVIRONMENT in ("production", "prod"):
-            raise RuntimeError("Cannot start application: database tables creation failed")
+            raise RuntimeError("Cannot start application: database initialization failed")
+    startup_info["schema_ms"] = round((time.perf_counter() - schema_started) * 1000, 1)
+    startup_info["total_ms"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
+    # Схема не готова (нет БД, не та ревизия) — /health/ready отвечает 503
+    startup_info["ready"] = database_ready
+    metrics_sampler.start()
+    await notification_dispatcher.start()
+    if job_worker is not None:
+        job_worker.start()
+    try:
+        await channel_hub.start(engine)
+    except Exception as e:
+        logger.error(f"❌ Failed to start channel hub: {e}")
+    logger.info(
+        f"✅ Worker ready in {startup_info['total_ms']} ms "
+        f"(import {startup_info['import_ms']} ms, schema {startup_info['schema_ms']} ms)"
+    )
 
     yield
 
     # Shutdown
+    startup_info["ready"] = False
+    await channel_hub.stop()
+    if job_worker is not None:
+        await asyncio.to_thread(job_worker.stop)
+    await notification_dispatcher.stop()
+    await metrics_sampler.stop()
     logger.info("🛑 FastAPI shutting down...")
     try:
         engine.dispose()
+        if async_engine is not None:
+            await async_engine.dispose()
+        if replica_router is not None:
+            replica_router.dispose()
         logger.info("✅ Database connection closed")
     except Exception as e:
         logger.error(f"Error closing database: {e}")
+    password_pool.shutdown()
+    variant_cache.shutdown()
+    reservation_batcher.shutdown()
+    route_planner.shutdown()
+    shutdown_logging()
 
 
 # Создаём FastAPI приложение с управлением жизненным циклом
@@ -85,7 +170,9 @@ app = FastAPI(
     title="ProjectPhoenix API",
     description="API для приложения ProjectPhoenix",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Ответы с response_model сериализует pydantic-core, JSON-байты — orjson
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware для разработки (ограничить в продакшене!)
@@ -107,6 +194,19 @@ else:
         allow_headers=["*"],
     )
 
+# Сжатие больших JSON-ответов (внутри метрик — в латентность входит и сжатие)
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Метрики Prometheus, тайминги запросов и access-лог (внешние слои, видят и CORS)
+if settings.QUERY_PROFILER_ENABLED:
+    app.add_middleware(QueryProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestTimingMiddleware)
+# Время записи для read-your-writes следующих запросов клиента (только с репликами)
+if replica_router is not None:
+    app.add_middleware(LastWriteMiddleware)
+
 # Подключаем роутеры
 try:
     from app.api import auth as auth_router
@@ -116,6 +216,62 @@ try:
 except ImportError as e:
     logger.error(f"❌ Failed to import auth router: {e}")
 
+try:
+    from app.api import users as users_router
+
+    app.include_router(users_router.router, prefix="/api/users", tags=["users"])
+    logger.info("✅ Users router included")
+except ImportError as e:
+    logger.error(f"❌ Failed to import users router: {e}")
+
+try:
+    from app.api import products as products_router
+
+    app.include_router(products_router.router, prefix="/api/products", tags=["products"])
+    logger.info("✅ Products router included")
+except ImportError as e:
+    logger.error(f"❌ Failed to import products router: {e}")
+
+try:
+    from app.api import cart as cart_router
+
+    app.include_router(cart_router.router, prefix="/api/cart", tags=["cart"])
+    logger.info("✅ Cart router included")
+except ImportError as e:
+    logger.error(f"❌ Failed to import cart router: {e}")
+
+try:
+    from app.api import channel as channel_router
+
+    app.include_router(channel_router.router, prefix="/api/channel", tags=["channel"])
+    logger.info("✅ Channel router included")
+except ImportError as e:
+    logger.error(f"❌ Failed to import channel router: {e}")
+
+try:
+    from app.api import files as files_router
+
+    app.include_router(files_router.router, prefix="/api/files", tags=["files"])
+    logger.info("✅ Files router included")
+except ImportError as e:
+    logger.error(f"❌ Failed to import files router: {e}")
+
+try:
+    from app.api import admin as admin_router
+
+    app.include_router(admin_router.router, prefix="/api/admin", tags=["admin"])
+    logger.info("✅ Admin router included")
+except ImportError as e:
+    logger.error(f"❌ Failed to import admin router: {e}")
+
+try:
+    from app.api import metrics as metrics_router
+
+    app.include_router(metrics_router.router, prefix="/metrics", tags=["metrics"])
+    logger.info("✅ Metrics router included")
+except ImportError as e:
+    logger.error(f"❌ Failed to import metrics router: {e}")
+
 
 # Базовые health check endpoints
 @app.get("/", tags=["health"])
@@ -131,18 +287,54 @@ async def root():
 @app.get("/health", tags=["health"])
 async def health():
     """Детальный health check."""
+    probe = await asyncio.to_thread(db_probe.check)
     return {
-        "status": "healthy",
-        "database": "connected",
-        "version": "1.0.0"
+        "status": "healthy" if probe["ok"] else "degraded",
+        "database": "connected" if probe["ok"] else "unavailable",
+        "version": "1.0.0",
+        "auth_cache": principal_cache.stats(),
+        "password_pool": password_pool.stats(),
+        "read_replicas": replica_router.stats() if replica_router is not None else None,
+        "job_worker": job_worker.stats() if job_worker is not None else None,
+        "channel_hub": channel_hub.stats(),
+        "notifications": notification_dispatcher.stats(),
+        "image_variants": variant_cache.stats(),
+        "route_planner": route_planner.stats(),
+        "logging": logging_stats(),
+        "requests": route_timings.stats(),
     }
 
 
+@app.get("/health/live", tags=["health"])
+async def liveness():
+    """Liveness: процесс жив и event loop отвечает. БД не трогаем."""
+    return {"status": "alive", "uptime_seconds": round(time.perf_counter() - _IMPORT_STARTED, 1)}
+
+
+@app.get("/health/ready", tags=["health"])
+async def readiness():
+    """
+    Readiness: старт завершён и БД отвечает (проба кэшируется на
+    READINESS_CACHE_SECONDS). Возвращает 503, если воркер не готов.
+    """
+    probe = await asyncio.to_thread(db_probe.check)
+    ready = startup_info["ready"] and probe["ok"]
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "database": probe,
+            "pool": pool_stats(engine),
+            "startup": startup_info,
+        },
+    )
+
+
 # Глобальный обработчик исключений
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Глобальный обработчик ошибок."""
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
+    logger.error("Unhandled exception: %s", exc, exc_info=True)
     return {
         "status": "error",
         "message": "Internal server error",
@@ -1,12 +1,14 @@
 # app/models/cart.py
 # Модель CartItem — элементы корзины пользователя.
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    # Один товар — одна строка в корзине; на этом ключе работает bulk upsert
+    __table_args__ = (UniqueConstraint("user_id", "draft_id", name="uq_cart_items_user_draft"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
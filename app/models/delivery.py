@@ -0,0 +1,21 @@
+# app/models/delivery.py
+# Адрес доставки заказа: координаты (WGS84) и окно доставки (UTC) для
+# планировщика курьерских маршрутов (app.services.route_planner).
+# Заказ без координат в маршрут не попадает и возвращается в unplanned.
+from sqlalchemy import Column, Integer, ForeignKey, Float, String, DateTime, Index
+from datetime import datetime
+from app.db.base import Base
+
+class OrderDelivery(Base):
+    __tablename__ = "order_deliveries"
+    __table_args__ = (
+        Index("ix_order_deliveries_window_start", "window_start"),
+    )
+
+    order_id = Column(Integer, ForeignKey("orders.id"), primary_key=True)
+    address = Column(String, nullable=False)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    window_start = Column(DateTime, nullable=True)
+    window_end = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
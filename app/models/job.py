@@ -0,0 +1,31 @@
+# app/models/job.py
+# Модель Job — фоновая задача в локальной очереди на таблице БД
+# (обрабатывается воркерами app.services.job_queue через SKIP LOCKED).
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Index
+from datetime import datetime
+from app.db.base import Base
+import enum
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class Job(Base):
+    __tablename__ = "jobs"
+    # Выборка следующих задач: WHERE status = 'queued' AND run_after <= now ORDER BY id
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    status = Column(Enum(JobStatus), default=JobStatus.queued, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime, nullable=True)
+    locked_by = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,6 +1,7 @@
 # app/models/order.py
-# Модели Order и OrderItem для фиксации сумм и статусов заказа.
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, Enum
+# Модели Order и OrderItem для фиксации сумм и статусов заказа,
+# WaitlistEntry — очередь на товар, которого не хватило при резервировании.
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, Enum, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -38,3 +39,18 @@ class OrderItem(Base):
 
     order = relationship("Order", back_populates="items")
     draft = relationship("ProductDraft")
+
+class WaitlistEntry(Base):
+    __tablename__ = "waitlist_entries"
+    # Позиция в очереди назначается под блокировкой строки товара и уникальна в его рамках
+    __table_args__ = (UniqueConstraint("draft_id", "position", name="uq_waitlist_entries_draft_position"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    draft_id = Column(Integer, ForeignKey("product_drafts.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    quantity = Column(Integer, default=1)
+    position = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User")
+    draft = relationship("ProductDraft")
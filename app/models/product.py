@@ -1,15 +1,19 @@
 # app/models/product.py
 # Модели для черновиков товаров (ProductDraft) и записей канала (ChannelPost).
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, UniqueConstraint, Index
+from sqlalchemy import event, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
 
 class ProductDraft(Base):
     __tablename__ = "product_drafts"
+    # Естественный ключ для импорта каталогов поставщиков: артикул в рамках автора
+    __table_args__ = (UniqueConstraint("creator_id", "sku", name="uq_product_drafts_creator_sku"),)
 
     id = Column(Integer, primary_key=True, index=True)
     creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    sku = Column(String, nullable=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     price = Column(Float, nullable=False)
@@ -21,8 +25,63 @@ class ProductDraft(Base):
 
 class ChannelPost(Base):
     __tablename__ = "channel_posts"
+    # Keyset-пагинация ленты: ORDER BY posted_at DESC, id DESC
+    __table_args__ = (Index("ix_channel_posts_posted_at_id", "posted_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    draft_id = Column(Integer, ForeignKey("product_drafts.id"), nullable=False)
-    posted_at = Column(DateTime, default=datetime.utcnow)
+    draft_id = Column(Integer, ForeignKey("product_drafts.id"), nullable=False, index=True)
+    posted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     draft = relationship("ProductDraft")
+
+
+# --- Полнотекстовый поиск по title/description ------------------------------
+# Postgres: генерируемая колонка search_vector (tsvector, поддерживается самой БД)
+# с GIN-индексом + pg_trgm-индекс по lower(title) для опечаток.
+# SQLite: внешняя FTS5-таблица product_drafts_fts, синхронизируется триггерами.
+# Колонки нет в модели: поиск идёт через app.crud.product_crud.search_drafts.
+SEARCH_DDL_POSTGRES = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE product_drafts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(description, '')), 'B')"
+    ") STORED",
+    "CREATE INDEX IF NOT EXISTS ix_product_drafts_search_vector "
+    "ON product_drafts USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_product_drafts_title_trgm "
+    "ON product_drafts USING gin (lower(title) gin_trgm_ops)",
+)
+
+SEARCH_DDL_SQLITE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_drafts_fts USING fts5("
+    "title, description, content='product_drafts', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS product_drafts_fts_ai AFTER INSERT ON product_drafts BEGIN "
+    "INSERT INTO product_drafts_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_drafts_fts_ad AFTER DELETE ON product_drafts BEGIN "
+    "INSERT INTO product_drafts_fts(product_drafts_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_drafts_fts_au AFTER UPDATE OF title, description ON product_drafts BEGIN "
+    "INSERT INTO product_drafts_fts(product_drafts_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO product_drafts_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    # Индексирует строки, существовавшие до создания FTS-таблицы
+    "INSERT INTO product_drafts_fts(product_drafts_fts) VALUES ('rebuild')",
+)
+
+
+def install_search_schema(connection) -> None:
+    """Создаёт поисковые колонки/индексы (идемпотентно; годится для существующих БД)."""
+    statements = {
+        "postgresql": SEARCH_DDL_POSTGRES,
+        "sqlite": SEARCH_DDL_SQLITE,
+    }.get(connection.dialect.name, ())
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+@event.listens_for(ProductDraft.__table__, "after_create")
+def _create_search_schema(target, connection, **kw):
+    install_search_schema(connection)
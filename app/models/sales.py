@@ -0,0 +1,44 @@
+# app/models/sales.py
+# Агрегаты продаж для дашборда администратора (app.services.sales_rollups).
+# Ключ — день создания заказа (UTC) и текущий статус заказа: при смене статуса
+# заказ переносится из строки старого статуса в строку нового. Таблицы
+# обновляются инкрементально в той же транзакции, что и заказы; перестроить их
+# из orders/order_items можно командой scripts/rebuild_sales_rollups.py.
+# Выручка — Numeric(14, 2): дельты копятся годами, float накопил бы ошибку.
+from sqlalchemy import Column, Integer, Numeric, Date, Enum
+from app.db.base import Base
+from app.models.order import OrderStatus
+
+class SalesDaily(Base):
+    """Заказы за день в статусе: число, выручка (order.total, с доставкой), штуки товара."""
+
+    __tablename__ = "sales_daily"
+
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(OrderStatus), primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+
+class SalesProductDaily(Base):
+    """Продажи товара за день в статусе (выручка — price * quantity позиций)."""
+
+    __tablename__ = "sales_product_daily"
+
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(OrderStatus), primary_key=True)
+    draft_id = Column(Integer, primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+class SalesCreatorDaily(Base):
+    """Продажи товаров автора (ProductDraft.creator_id) за день в статусе."""
+
+    __tablename__ = "sales_creator_daily"
+
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(OrderStatus), primary_key=True)
+    creator_id = Column(Integer, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
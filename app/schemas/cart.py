@@ -0,0 +1,46 @@
+# app/schemas/cart.py
+# Pydantic-схемы корзины.
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class CartItemChange(BaseModel):
+    """Изменение одной позиции: quantity = 0 удаляет товар из корзины."""
+
+    draft_id: int
+    quantity: int = Field(ge=0, le=1000)
+
+
+class CartBulkRequest(BaseModel):
+    """
+    Пакетное изменение корзины.
+    mode="set" — задать количество, mode="add" — прибавить к текущему.
+    """
+
+    items: list[CartItemChange] = Field(min_length=1, max_length=200)
+    mode: str = Field("set", pattern="^(set|add)$")
+
+
+class CartLine(BaseModel):
+    """Позиция корзины; строится из строки запроса cart_crud.cart_view."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    draft_id: int
+    title: str
+    price: float
+    quantity: int
+    stock: int | None = None
+    image_path: str | None = None
+    line_total: float
+
+
+class CartView(BaseModel):
+    items: list[CartLine]
+    subtotal: float
+    delivery_fee: float
+    total: float
+    free_delivery_threshold: float
+
+
+class CartBulkResult(CartView):
+    skipped_draft_ids: list[int] = []
@@ -0,0 +1,60 @@
+# app/schemas/delivery.py
+# Pydantic-схемы адресов доставки и курьерских маршрутов (app.services.route_planner).
+from datetime import date, datetime
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class DeliveryIn(BaseModel):
+    """Адрес и окно доставки заказа; без координат заказ не планируется."""
+
+    address: str = Field(min_length=1)
+    latitude: float | None = Field(None, ge=-90, le=90)
+    longitude: float | None = Field(None, ge=-180, le=180)
+    window_start: datetime | None = None
+    window_end: datetime | None = None
+
+    @model_validator(mode="after")
+    def _check(self):
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("latitude and longitude go together")
+        if self.window_start and self.window_end and self.window_end <= self.window_start:
+            raise ValueError("window_end must be after window_start")
+        return self
+
+
+class DeliveryOut(DeliveryIn):
+    model_config = ConfigDict(from_attributes=True)
+
+    order_id: int
+
+
+class RouteStop(BaseModel):
+    order_id: int
+    address: str
+    latitude: float
+    longitude: float
+    eta: datetime
+    window_start: datetime | None = None
+    window_end: datetime | None = None
+    late_minutes: float = 0.0
+
+
+class CourierRoute(BaseModel):
+    """Маршрут одного курьера: склад -> stops по порядку -> склад."""
+
+    courier: int
+    stops: list[RouteStop]
+    distance_km: float
+    duration_minutes: float
+    late_stops: int
+
+
+class RoutePlan(BaseModel):
+    day: date
+    start_at: datetime
+    routes: list[CourierRoute]
+    unplanned: list[int] = Field(description="Заказы без координат")
+    stops: int
+    distance_km: float
+    planning_ms: float
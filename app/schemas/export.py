@@ -0,0 +1,17 @@
+# app/schemas/export.py
+# Pydantic-схемы фоновых выгрузок (app.services.exports, задачи kind="export").
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.models.job import JobStatus
+
+
+class ExportJob(BaseModel):
+    job_id: int
+    status: JobStatus
+    status_url: str
+    download_url: str | None = None
+    error: str | None = None
+    created_at: datetime | None = None
+    finished_at: datetime | None = None
@@ -0,0 +1,66 @@
+# app/schemas/order.py
+# Pydantic-схемы заказов.
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.models.order import OrderStatus
+
+
+class OrderTransitionRequest(BaseModel):
+    """Массовая смена статуса: все заказы переводятся в to_status."""
+
+    order_ids: list[int] = Field(min_length=1)
+    to_status: OrderStatus
+
+
+class OrderItemOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    draft_id: int
+    quantity: int
+    price: float
+
+
+class OrderOut(BaseModel):
+    """Заказ с позициями; items лучше загружать selectinload, иначе — запрос на каждый заказ."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    user_id: int
+    total: float
+    status: OrderStatus
+    created_at: datetime
+    items: list[OrderItemOut] = []
+
+
+class WaitlistedItem(BaseModel):
+    draft_id: int
+    quantity: int
+    position: int
+
+
+class ReservationResult(BaseModel):
+    """Итог оформления корзины (reservation_batcher.reserve)."""
+
+    order_id: int | None = None
+    status: OrderStatus | None = None
+    items: list[OrderItemOut] = []
+    total: float = 0.0
+    waitlisted: list[WaitlistedItem] = []
+    unavailable: list[int] = []
+
+
+class RejectedTransition(BaseModel):
+    order_id: int
+    reason: str
+    status: OrderStatus | None = None
+
+
+class OrderTransitionResult(BaseModel):
+    to_status: OrderStatus
+    updated: list[int]
+    rejected: list[RejectedTransition]
+    # Заказы, созданные из листа ожидания на возвращённый при отмене остаток
+    promoted: list[int] = []
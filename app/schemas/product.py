@@ -0,0 +1,49 @@
+# app/schemas/product.py
+# Pydantic-схемы каталога: элементы ленты, результаты поиска, публикация.
+# from_attributes: схемы строятся прямо из строк SELECT (CATALOG_COLUMNS) и ORM-объектов.
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class CatalogItem(BaseModel):
+    """Элемент ленты: пост канала + поля черновика."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    post_id: int
+    draft_id: int
+    title: str
+    description: str | None = None
+    price: float
+    quantity: int | None = None
+    image_path: str | None = None
+    image_url: str | None = None
+    posted_at: datetime
+
+
+class CatalogPage(BaseModel):
+    items: list[CatalogItem]
+    next_cursor: str | None = None
+
+
+class SearchItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    draft_id: int
+    title: str
+    price: float
+    image_path: str | None = None
+    image_url: str | None = None
+    snippet: str | None = None
+    rank: float
+
+
+class SearchResults(BaseModel):
+    items: list[SearchItem]
+
+
+class PublishedPost(BaseModel):
+    post_id: int
+    draft_id: int
+    posted_at: datetime
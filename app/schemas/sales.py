@@ -0,0 +1,54 @@
+# app/schemas/sales.py
+# Pydantic-схемы дашборда продаж (агрегаты app.models.sales).
+from datetime import date
+from typing import Annotated
+
+from pydantic import AfterValidator, BaseModel, ConfigDict
+
+from app.models.order import OrderStatus
+
+# Суммы хранятся Numeric (Decimal) — в JSON отдаются числом с копейками
+Money = Annotated[float, AfterValidator(lambda value: round(value, 2))]
+
+
+class SalesDay(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    day: date
+    status: OrderStatus
+    orders: int
+    revenue: Money
+    units: int
+
+
+class ProductSales(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    draft_id: int
+    title: str | None = None
+    units: int
+    revenue: Money
+
+
+class CreatorSales(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    creator_id: int
+    full_name: str | None = None
+    orders: int
+    units: int
+    revenue: Money
+
+
+class SalesDashboard(BaseModel):
+    """Продажи за период: итоги, разбивка по дням и статусам, лидеры."""
+
+    date_from: date
+    date_to: date
+    statuses: list[OrderStatus]
+    orders: int
+    revenue: Money
+    units: int
+    days: list[SalesDay]
+    top_products: list[ProductSales]
+    top_creators: list[CreatorSales]
@@ -0,0 +1,50 @@
+# app/schemas/user.py
+# Pydantic-схемы пользователей и токенов.
+from datetime import datetime
+from typing import Annotated
+
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+
+from app.core.config import settings
+from app.models.user import RoleEnum
+
+
+class UserOut(BaseModel):
+    """Публичные поля пользователя (без hashed_password)."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    phone: str
+    full_name: str | None = None
+    role: RoleEnum
+    created_at: datetime | None = None
+
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+
+
+class ContactLookupRequest(BaseModel):
+    """Номера из адресной книги в любом формате (8 (900) 123-45-67, +7 900 ...)."""
+
+    phones: list[Annotated[str, StringConstraints(max_length=32)]] = Field(
+        min_length=1, max_length=settings.CONTACT_SYNC_MAX_NUMBERS,
+    )
+
+
+class ContactMatch(BaseModel):
+    """Зарегистрированный пользователь и записи адресной книги, которые на него указывают."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    phone: str
+    full_name: str | None = None
+    numbers: list[str]
+
+
+class ContactLookupResult(BaseModel):
+    matches: list[ContactMatch]
+    invalid: int = 0
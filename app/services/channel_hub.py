@@ -0,0 +1,376 @@
+# app/services/channel_hub.py
+# Хаб живой ленты канала: один источник новых постов -> тысячи подписчиков.
+#
+# - Новые посты читаются из БД одним запросом на «пробуждение» и сериализуются
+#   один раз; подписчикам раздаются готовые SSE-байты и текст WebSocket-кадра.
+# - Пробуждение: after_commit в этом процессе, Postgres NOTIFY из соседних
+#   воркеров (NOTIFY выполняется в транзакции публикации — уходит только при
+#   commit) и, на всякий случай, периодическая проверка при наличии подписчиков.
+# - У каждого подписчика ограниченная очередь. Отставший клиент не тормозит
+#   остальных: очередь сбрасывается, соединение закрывается, а клиент
+#   переподключается с последним увиденным id (Last-Event-ID / last_id).
+# - Последние CHANNEL_HISTORY_SIZE постов хранятся в памяти для догонки;
+#   более давние дочитываются из БД.
+import asyncio
+import json
+import logging
+import re
+import select
+import threading
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+from sqlalchemy import event, func, select as sa_select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import product_crud
+from app.db.session import SessionLocal
+from app.models.product import ChannelPost
+
+logger = logging.getLogger(__name__)
+
+# Поздно закоммиченные посты с меньшим id (параллельные транзакции)
+# подбираются, если отстают от максимального не больше чем на это окно
+_REORDER_WINDOW = 50
+_FETCH_LIMIT = 500
+
+# Запущенные хабы процесса — их будят слушатели сессии после commit
+_running_hubs: "weakref.WeakSet[ChannelHub]" = weakref.WeakSet()
+
+
+class HubUnavailable(Exception):
+    """Хаб не запущен или достигнут лимит подписчиков."""
+
+
+class SlowConsumer(Exception):
+    """Подписчик не успевал читать, очередь переполнилась."""
+
+
+@dataclass(frozen=True)
+class ChannelEvent:
+    """Пост, сериализованный один раз для всех подписчиков."""
+
+    post_id: int
+    data: str
+    sse: bytes
+    ws: str
+
+    @classmethod
+    def from_row(cls, row) -> "ChannelEvent":
+        data = json.dumps(product_crud.catalog_item(row), ensure_ascii=False, separators=(",", ":"))
+        return cls(
+            post_id=row.post_id,
+            data=data,
+            sse=f"id: {row.post_id}\nevent: post\ndata: {data}\n\n".encode(),
+            ws=f'{{"event":"post","id":{row.post_id},"data":{data}}}',
+        )
+
+
+# Догонка невозможна целиком — клиенту нужно перечитать ленту через /api/products/feed
+RESET_EVENT = ChannelEvent(post_id=0, data="{}", sse=b"event: reset\ndata: {}\n\n", ws='{"event":"reset"}')
+
+
+class Subscription:
+    """Подписка одного соединения: догонка + ограниченная очередь новых постов."""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.backlog: deque = deque()
+        self._backlog_ids: set[int] = set()
+        self.overflowed = False
+
+    def offer(self, item: ChannelEvent) -> bool:
+        """Кладёт пост в очередь без ожидания; при переполнении помечает подписчика отставшим."""
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+    async def next(self, timeout: float) -> ChannelEvent | None:
+        """
+        Следующий пост. None — за timeout ничего не пришло (пора слать heartbeat).
+        SlowConsumer — подписчик отстал и должен переподключиться.
+        """
+        if self.backlog:
+            return self.backlog.popleft()
+        while True:
+            # Без wait_for (он создаёт задачу), если пост уже в очереди
+            if not self.queue.empty():
+                item = self.queue.get_nowait()
+            else:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+            if item is None:
+                raise SlowConsumer()
+            if item.post_id in self._backlog_ids:
+                continue
+            return item
+
+
+class _SubscriptionContext:
+    def __init__(self, hub: "ChannelHub", last_id: int | None):
+        self.hub = hub
+        self.last_id = last_id
+        self.subscription: Subscription | None = None
+
+    async def __aenter__(self) -> Subscription:
+        self.subscription = await self.hub._attach(self.last_id)
+        return self.subscription
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.hub._subscribers.discard(self.subscription)
+
+
+class PgNotifyListener(threading.Thread):
+    """LISTEN на отдельном (отсоединённом от пула) соединении psycopg2."""
+
+    def __init__(self, engine, channel: str, on_notify):
+        super().__init__(name="channel-listen", daemon=True)
+        self.engine = engine
+        self.channel = channel
+        self.on_notify = on_notify
+        self.connected = False
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            raw = None
+            try:
+                raw = self.engine.raw_connection()
+                raw.detach()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {self.channel}")
+                self.connected = True
+                # Всё, что могли пропустить, пока не слушали
+                self.on_notify()
+                while not self._stop_event.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self.on_notify()
+            except Exception as e:
+                logger.warning(f"Channel LISTEN connection failed: {e}")
+                self._stop_event.wait(2)
+            finally:
+                self.connected = False
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+class ChannelHub:
+    """Раздача новых постов канала подписчикам одного воркера."""
+
+    def __init__(self, session_factory=SessionLocal, queue_size: int = 256, max_subscribers: int = 10000,
+                 history_size: int = 1000, poll_interval: float = 5.0, notify_name: str = "channel_posts"):
+        if not re.fullmatch(r"[a-z_][a-z0-9_]*", notify_name):
+            raise ValueError(f"Invalid NOTIFY channel name: {notify_name!r}")
+        self.session_factory = session_factory
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.history_size = max(history_size, _REORDER_WINDOW)
+        self.poll_interval = poll_interval
+        self.notify_name = notify_name
+        self._subscribers: set[Subscription] = set()
+        self._history: OrderedDict[int, ChannelEvent] = OrderedDict()
+        self._last_id = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._listener: PgNotifyListener | None = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped_slow = 0
+
+    # --- Жизненный цикл ---
+
+    async def start(self, engine=None) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._last_id = await asyncio.to_thread(self._max_post_id)
+        # Уже опубликованные посты окна переупорядочивания не должны уйти как новые
+        for row in await asyncio.to_thread(self._fetch, max(0, self._last_id - _REORDER_WINDOW), _FETCH_LIMIT):
+            self._history[row.post_id] = ChannelEvent.from_row(row)
+        self._task = asyncio.create_task(self._run(), name="channel-hub")
+        _running_hubs.add(self)
+        if engine is not None and engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2":
+            self._listener = PgNotifyListener(engine, self.notify_name, self.notify_threadsafe)
+            self._listener.start()
+
+    async def stop(self) -> None:
+        _running_hubs.discard(self)
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscription in list(self._subscribers):
+            subscription.offer(None)
+        self._subscribers.clear()
+        self._loop = None
+
+    def notify_threadsafe(self) -> None:
+        """Разбудить хаб из любого потока: появились новые посты."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            pass
+
+    # --- Подписка ---
+
+    def subscribe(self, last_id: int | None = None) -> _SubscriptionContext:
+        """
+        async with hub.subscribe(last_id) as subscription: ...
+        last_id — последний увиденный клиентом пост (None — только новые).
+        """
+        return _SubscriptionContext(self, last_id)
+
+    def check_available(self) -> None:
+        """Бросает HubUnavailable, если новую подписку сейчас не принять."""
+        if self._task is None:
+            raise HubUnavailable("Channel hub is not running")
+        if len(self._subscribers) >= self.max_subscribers:
+            raise HubUnavailable("Too many subscribers")
+
+    async def _attach(self, last_id: int | None) -> Subscription:
+        self.check_available()
+        subscription = Subscription(self.queue_size)
+        # Сначала подписываемся, потом собираем догонку: новые посты не потеряются,
+        # а дубли отсекаются по _backlog_ids
+        self._subscribers.add(subscription)
+        if last_id is not None and last_id < self._last_id:
+            oldest = next(iter(self._history), None)
+            if oldest is not None and last_id >= oldest - 1:
+                backlog = [item for post_id, item in self._history.items() if post_id > last_id]
+            else:
+                rows = await asyncio.to_thread(self._fetch, last_id, self.history_size)
+                if len(rows) == self.history_size:
+                    backlog = [RESET_EVENT]
+                else:
+                    backlog = [self._history.get(row.post_id) or ChannelEvent.from_row(row) for row in rows]
+            subscription.backlog.extend(sorted(backlog, key=lambda item: item.post_id))
+            subscription._backlog_ids = {item.post_id for item in backlog}
+        return subscription
+
+    # --- Раздача ---
+
+    def _max_post_id(self) -> int:
+        with self.session_factory() as db:
+            return db.scalar(sa_select(func.max(ChannelPost.id))) or 0
+
+    def _fetch(self, after_id: int, limit: int) -> list:
+        with self.session_factory() as db:
+            return product_crud.channel_posts_after(db, after_id, limit)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                if not self._subscribers:
+                    continue
+            self._wake.clear()
+            try:
+                await self._pump()
+            except Exception as e:
+                logger.error(f"Channel hub fetch failed: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _pump(self) -> None:
+        while True:
+            rows = await asyncio.to_thread(self._fetch, max(0, self._last_id - _REORDER_WINDOW), _FETCH_LIMIT)
+            fresh = [row for row in rows if row.post_id not in self._history]
+            for row in fresh:
+                self.publish(ChannelEvent.from_row(row))
+            if rows:
+                self._last_id = max(self._last_id, rows[-1].post_id)
+            if len(rows) < _FETCH_LIMIT:
+                return
+
+    def publish(self, item: ChannelEvent) -> None:
+        """Раздаёт пост всем подписчикам (в потоке event loop, без ожиданий)."""
+        self._history[item.post_id] = item
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+        self._last_id = max(self._last_id, item.post_id)
+        self.published += 1
+        for subscription in list(self._subscribers):
+            if subscription.offer(item):
+                self.delivered += 1
+            elif subscription.overflowed:
+                self.dropped_slow += 1
+                self._subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "subscribers": len(self._subscribers),
+            "last_post_id": self._last_id,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_slow": self.dropped_slow,
+            "pg_listen": self._listener.connected if self._listener is not None else None,
+        }
+
+
+channel_hub = ChannelHub(
+    queue_size=settings.CHANNEL_QUEUE_SIZE,
+    max_subscribers=settings.CHANNEL_MAX_SUBSCRIBERS,
+    history_size=settings.CHANNEL_HISTORY_SIZE,
+    poll_interval=settings.CHANNEL_POLL_INTERVAL,
+    notify_name=settings.CHANNEL_NOTIFY_NAME,
+)
+
+# Новые посты: NOTIFY в транзакции публикации (Postgres), пробуждение своего хаба после commit
+_NEW_POSTS_KEY = "channel_posts_created"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_posts(session, flush_context):
+    if session.info.get(_NEW_POSTS_KEY):
+        return
+    if any(isinstance(obj, ChannelPost) for obj in session.new):
+        session.info[_NEW_POSTS_KEY] = True
+        connection = session.connection()
+        if connection.dialect.name == "postgresql":
+            for name in {hub.notify_name for hub in _running_hubs} | {channel_hub.notify_name}:
+                connection.exec_driver_sql(f"NOTIFY {name}")
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_hub(session):
+    if session.info.pop(_NEW_POSTS_KEY, False):
+        for hub in list(_running_hubs):
+            hub.notify_threadsafe()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_posts(session):
+    session.info.pop(_NEW_POSTS_KEY, None)
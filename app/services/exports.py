@@ -0,0 +1,241 @@
+# app/services/exports.py
+# Выгрузки для бухгалтерии: заказы с позициями и названиями товаров, каталог.
+#
+# Строки читаются курсором на стороне сервера (yield_per: на Postgres — именованный
+# курсор, пачками по EXPORT_BATCH_ROWS) и сразу пишутся в файл, поэтому память
+# воркера не зависит от числа строк:
+# - CSV — генератор отдаёт кусками по ~64 КиБ прямо в ответ;
+# - XLSX — openpyxl в режиме write_only (строки уходят во временный файл, модель
+#   листа в памяти не строится); готовая книга отдаётся кусками из временного файла.
+# Большие выгрузки можно поставить фоновой задачей (job_queue, kind="export"):
+# файл пишется в UPLOAD_DIR/exports и скачивается через /api/admin/exports/jobs/{id}/file.
+import csv
+import enum
+import io
+import logging
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import ReadSessionLocal, replica_router
+from app.models.order import Order, OrderItem
+from app.models.product import ProductDraft
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+_CHUNK = 64 * 1024
+
+ORDER_COLUMNS = (
+    "order_id", "created_at", "status", "user_id", "order_total",
+    "item_id", "draft_id", "sku", "title", "quantity", "price", "line_total",
+)
+CATALOG_COLUMNS = (
+    "draft_id", "sku", "title", "price", "quantity", "published", "creator_id", "created_at",
+)
+
+
+class ExportError(Exception):
+    """Выгрузку нельзя построить (неизвестный вид/формат, нет openpyxl)."""
+
+
+def _period(date_from: date | None, date_to: date | None):
+    start = datetime.combine(date_from, datetime.min.time()) if date_from else None
+    end = datetime.combine(date_to + timedelta(days=1), datetime.min.time()) if date_to else None
+    return start, end
+
+
+def _orders_query(date_from: date | None, date_to: date | None):
+    start, end = _period(date_from, date_to)
+    stmt = (
+        select(
+            Order.id, Order.created_at, Order.status, Order.user_id, Order.total,
+            OrderItem.id, OrderItem.draft_id, ProductDraft.sku, ProductDraft.title,
+            OrderItem.quantity, OrderItem.price, OrderItem.quantity * OrderItem.price,
+        )
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(ProductDraft, ProductDraft.id == OrderItem.draft_id)
+        .order_by(Order.id, OrderItem.id)
+    )
+    if start is not None:
+        stmt = stmt.where(Order.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Order.created_at < end)
+    return stmt
+
+
+def _catalog_query(date_from: date | None, date_to: date | None):
+    start, end = _period(date_from, date_to)
+    stmt = select(
+        ProductDraft.id, ProductDraft.sku, ProductDraft.title, ProductDraft.price, ProductDraft.quantity,
+        ProductDraft.published, ProductDraft.creator_id, ProductDraft.created_at,
+    ).order_by(ProductDraft.id)
+    if start is not None:
+        stmt = stmt.where(ProductDraft.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(ProductDraft.created_at < end)
+    return stmt
+
+
+EXPORTS = {
+    "orders": (ORDER_COLUMNS, _orders_query),
+    "catalog": (CATALOG_COLUMNS, _catalog_query),
+}
+
+
+def check_export(kind: str, fmt: str) -> None:
+    if kind not in EXPORTS:
+        raise ExportError(f"Unknown export, use: {', '.join(EXPORTS)}")
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format, use: {', '.join(FORMATS)}")
+    if fmt == "xlsx":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise ExportError("XLSX export requires openpyxl, use format=csv")
+
+
+def filename(kind: str, fmt: str, date_from: date | None, date_to: date | None) -> str:
+    period = f"_{date_from or 'start'}_{date_to or 'now'}" if date_from or date_to else ""
+    return f"{kind}{period}.{fmt}"
+
+
+def iter_rows(kind: str, date_from: date | None = None, date_to: date | None = None):
+    """Строки выгрузки из курсора на стороне сервера; сессия своя (живёт, пока идёт выгрузка)."""
+    _, build_query = EXPORTS[kind]
+    db = ReadSessionLocal()
+    if replica_router is not None:
+        db.info["replica"] = replica_router.pick()
+    try:
+        result = db.execute(build_query(date_from, date_to).execution_options(yield_per=settings.EXPORT_BATCH_ROWS))
+        for row in result:
+            yield row
+    finally:
+        db.close()
+
+
+# Строки с этих символов Excel/LibreOffice считают формулой (CSV/formula injection):
+# название товара «=HYPERLINK(...)» выполнилось бы у бухгалтера
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _text(value: str) -> str:
+    return "'" + value if value.startswith(_FORMULA_PREFIXES) else value
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat(" ", "seconds")
+    if isinstance(value, str):
+        return _text(value)
+    return value
+
+
+def _xlsx_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, str):
+        return _text(value)
+    return value
+
+
+def csv_chunks(columns, rows):
+    """CSV кусками по ~64 КиБ; BOM — чтобы Excel открыл UTF-8 с кириллицей."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=settings.EXPORT_CSV_DELIMITER)
+    buffer.write("﻿")
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= _CHUNK:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _write_xlsx(columns, rows, target) -> None:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("export")
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([_xlsx_value(value) for value in row])
+    workbook.save(target)
+
+
+def xlsx_chunks(columns, rows):
+    """XLSX: книга собирается во временном файле и отдаётся из него кусками."""
+    with tempfile.TemporaryFile() as target:
+        _write_xlsx(columns, rows, target)
+        target.seek(0)
+        while chunk := target.read(_CHUNK):
+            yield chunk
+
+
+def stream_export(kind: str, fmt: str, date_from: date | None = None, date_to: date | None = None):
+    """Генератор байтов файла выгрузки (для StreamingResponse)."""
+    columns, _ = EXPORTS[kind]
+    rows = iter_rows(kind, date_from, date_to)
+    return csv_chunks(columns, rows) if fmt == "csv" else xlsx_chunks(columns, rows)
+
+
+# --- Фоновые выгрузки ---
+
+def exports_dir() -> Path:
+    path = Path(settings.UPLOAD_DIR) / "exports"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _remove_expired(directory: Path) -> None:
+    deadline = time.time() - settings.EXPORT_FILE_TTL_HOURS * 3600
+    for path in directory.iterdir():
+        try:
+            if path.stat().st_mtime < deadline:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def write_export_file(payload: dict) -> Path:
+    """
+    Обработчик задачи export: пишет файл в UPLOAD_DIR/exports/<payload["file"]>
+    (через уникальный .tmp — недописанный файл не отдаётся) и удаляет выгрузки старше
+    EXPORT_FILE_TTL_HOURS.
+    """
+    kind, fmt = payload["kind"], payload["format"]
+    check_export(kind, fmt)
+    date_from = date.fromisoformat(payload["date_from"]) if payload.get("date_from") else None
+    date_to = date.fromisoformat(payload["date_to"]) if payload.get("date_to") else None
+    directory = exports_dir()
+    _remove_expired(directory)
+    path = directory / payload["file"]
+    # Уникальный временный файл: если задачу всё же выполняют два воркера,
+    # каждый пишет свой, а os.replace атомарно ставит целый файл
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=path.name + ".", suffix=".tmp")
+    started = time.perf_counter()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in stream_export(kind, fmt, date_from, date_to):
+                f.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    logger.info("Export %s written: %d bytes in %.1f s", path.name, path.stat().st_size, time.perf_counter() - started)
+    return path
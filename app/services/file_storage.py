@@ -0,0 +1,365 @@
+# app/services/file_storage.py
+# Хранилище загружаемых файлов (фото товаров), адресуемое по содержимому.
+#
+# - Тело multipart-запроса разбирается потоково (python-multipart), файл пишется
+#   на диск кусками во временный файл с одновременным подсчётом SHA-256 — в
+#   памяти держится не больше одного буфера.
+# - Ключ файла — хэш содержимого: cas/ab/<sha256>.<ext>. Повторная загрузка
+#   того же фото не создаёт копию (дедупликация), а ключ никогда не меняет
+#   содержимое — ответы можно кэшировать «навсегда».
+# - Тип файла определяется по сигнатуре (magic bytes), а не по заголовку клиента.
+# - Бэкенд подключаемый: локальная папка (UPLOAD_DIR) или S3-совместимое
+#   хранилище (MinIO и т.п., нужен boto3).
+import abc
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.core.config import settings
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+KEY_RE = re.compile(r"^cas/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]{2,5}$")
+
+# Поддерживаемые изображения: сигнатура -> (content-type, расширение)
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", ".png"),
+    (b"GIF87a", "image/gif", ".gif"),
+    (b"GIF89a", "image/gif", ".gif"),
+)
+CONTENT_TYPES = {".jpg": "image/jpeg", ".png": "image/png", ".gif": "image/gif", ".webp": "image/webp",
+                 ".heic": "image/heic"}
+
+
+class StorageError(Exception):
+    """Базовая ошибка хранилища."""
+
+
+class FileTooLarge(StorageError):
+    pass
+
+
+class UnsupportedFileType(StorageError):
+    pass
+
+
+class NoFileInRequest(StorageError):
+    pass
+
+
+def sniff_type(head: bytes) -> tuple[str, str]:
+    """По первым байтам файла возвращает (content-type, расширение)."""
+    for signature, content_type, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type, ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", ".webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "image/heic", ".heic"
+    raise UnsupportedFileType("Unsupported file type")
+
+
+def storage_key(sha256: str, ext: str) -> str:
+    return f"cas/{sha256[:2]}/{sha256}{ext}"
+
+
+@dataclass
+class StoredFile:
+    key: str
+    sha256: str
+    size: int
+    content_type: str
+    deduplicated: bool
+
+
+# --- Бэкенды ---
+
+class StorageBackend(abc.ABC):
+    """Интерфейс бэкенда. Методы синхронные — вызываются из потоков."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def save(self, staged_path: Path, key: str) -> None:
+        """Забирает готовый временный файл под ключ key (файл после вызова не нужен)."""
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    def local_path(self, key: str) -> Path | None:
+        """Путь к файлу на диске, если бэкенд локальный (для отдачи через sendfile)."""
+        return None
+
+    def url(self, key: str) -> str | None:
+        """Прямая ссылка на объект, если файл отдаёт сам бэкенд."""
+        return None
+
+    @abc.abstractmethod
+    def download_to(self, key: str, path: Path) -> None:
+        """Копирует объект в локальный файл (нужно удалённым бэкендам, например для ресайза)."""
+
+
+class LocalBackend(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    def exists(self, key: str) -> bool:
+        return self.local_path(key).is_file()
+
+    def save(self, staged_path: Path, key: str) -> None:
+        target = self.local_path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(staged_path, 0o644)
+        # Атомарно: читатель видит либо полный файл, либо никакого
+        os.replace(staged_path, target)
+
+    def delete(self, key: str) -> None:
+        self.local_path(key).unlink(missing_ok=True)
+
+    def download_to(self, key: str, path: Path) -> None:
+        shutil.copyfile(self.local_path(key), path)
+
+
+class S3Backend(StorageBackend):
+    """S3-совместимое хранилище (AWS S3, MinIO, Yandex Object Storage)."""
+
+    name = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: str | None = None, prefix: str = "",
+                 url_ttl_seconds: int = 3600):
+        try:
+            import boto3
+        except ImportError:
+            raise StorageError(
+                "FILE_STORAGE_BACKEND=s3 requires boto3: pip install boto3 (see requirements.txt)"
+            ) from None
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_ttl_seconds = url_ttl_seconds
+        # Ключи доступа берутся из стандартных AWS_* переменных окружения
+        self._client = boto3.client("s3", endpoint_url=endpoint_url or None)
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + key
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def save(self, staged_path: Path, key: str) -> None:
+        extra = {
+            "ContentType": CONTENT_TYPES.get(Path(key).suffix, "application/octet-stream"),
+            "CacheControl": "public, max-age=31536000, immutable",
+        }
+        # upload_file сам делит большие файлы на части (multipart upload)
+        self._client.upload_file(str(staged_path), self.bucket, self._object_key(key), ExtraArgs=extra)
+        staged_path.unlink(missing_ok=True)
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def download_to(self, key: str, path: Path) -> None:
+        self._client.download_file(self.bucket, self._object_key(key), str(path))
+
+    def url(self, key: str) -> str:
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=self.url_ttl_seconds,
+        )
+
+
+# --- Запись ---
+
+class _StagedWriter:
+    """Временный файл + SHA-256, считаемый по мере записи."""
+
+    def __init__(self, staging_dir: Path, max_bytes: int):
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=staging_dir, prefix="upload_", suffix=".part")
+        self.path = Path(name)
+        self._file = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.head = b""
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise FileTooLarge(f"File is larger than {self.max_bytes} bytes")
+        if len(self.head) < 16:
+            self.head += data[:16 - len(self.head)]
+        self._hash.update(data)
+        self._file.write(data)
+
+    def finish(self) -> str:
+        self._file.close()
+        return self._hash.hexdigest()
+
+    def discard(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+class FileStorage:
+    """Потоковая запись загрузок с дедупликацией по SHA-256."""
+
+    def __init__(self, backend: StorageBackend, staging_dir: str, max_bytes: int,
+                 buffer_bytes: int = 1024 * 1024):
+        self.backend = backend
+        self.staging_dir = Path(staging_dir)
+        self.max_bytes = max_bytes
+        # Запись на диск и хэширование идут в потоке, крупными порциями
+        self.buffer_bytes = buffer_bytes
+        self.uploads = 0
+        self.deduplicated = 0
+
+    async def save_stream(self, chunks) -> StoredFile:
+        """Сохраняет файл из асинхронного итератора байтов."""
+        writer = _StagedWriter(self.staging_dir, self.max_bytes)
+        try:
+            buffer = bytearray()
+            async for chunk in chunks:
+                buffer += chunk
+                if len(buffer) >= self.buffer_bytes:
+                    await asyncio.to_thread(writer.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await asyncio.to_thread(writer.write, bytes(buffer))
+            if writer.size == 0:
+                raise NoFileInRequest("Empty file")
+            content_type, ext = sniff_type(writer.head)
+            sha256 = await asyncio.to_thread(writer.finish)
+            return await self._commit(writer, sha256, content_type, ext)
+        except BaseException:
+            writer.discard()
+            raise
+
+    async def _commit(self, writer: _StagedWriter, sha256: str, content_type: str, ext: str) -> StoredFile:
+        key = storage_key(sha256, ext)
+        deduplicated = await asyncio.to_thread(self.backend.exists, key)
+        if deduplicated:
+            writer.discard()
+            self.deduplicated += 1
+        else:
+            await asyncio.to_thread(self.backend.save, writer.path, key)
+        self.uploads += 1
+        return StoredFile(key=key, sha256=sha256, size=writer.size, content_type=content_type,
+                          deduplicated=deduplicated)
+
+    async def save_multipart(self, headers, body, field: str = "file") -> StoredFile:
+        """
+        Потоково разбирает multipart/form-data и сохраняет часть field.
+        headers — заголовки запроса, body — асинхронный итератор тела (request.stream()).
+        """
+        content_type, params = parse_options_header(headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise NoFileInRequest("Expected multipart/form-data")
+
+        state = {"header_field": b"", "header_value": b"", "headers": {}, "active": False, "found": False}
+        pending: list[bytes] = []
+
+        def on_part_begin():
+            state["headers"] = {}
+
+        def on_header_field(data, start, end):
+            state["header_field"] += data[start:end]
+
+        def on_header_value(data, start, end):
+            state["header_value"] += data[start:end]
+
+        def on_header_end():
+            state["headers"][state["header_field"].lower()] = state["header_value"]
+            state["header_field"] = state["header_value"] = b""
+
+        def on_headers_finished():
+            _, options = parse_options_header(state["headers"].get(b"content-disposition", b""))
+            state["active"] = (
+                not state["found"] and options.get(b"name") == field.encode() and b"filename" in options
+            )
+            state["found"] = state["found"] or state["active"]
+
+        def on_part_data(data, start, end):
+            if state["active"]:
+                pending.append(data[start:end])
+
+        def on_part_end():
+            state["active"] = False
+
+        parser = MultipartParser(boundary, {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+
+        async def file_chunks():
+            async for chunk in body:
+                parser.write(chunk)
+                if pending:
+                    data = b"".join(pending)
+                    pending.clear()
+                    yield data
+            parser.finalize()
+            if pending:
+                yield b"".join(pending)
+                pending.clear()
+            if not state["found"]:
+                raise NoFileInRequest(f"No file in form field {field!r}")
+
+        return await self.save_stream(file_chunks())
+
+    def stats(self) -> dict:
+        return {"backend": self.backend.name, "uploads": self.uploads, "deduplicated": self.deduplicated}
+
+
+def build_backend() -> StorageBackend:
+    if settings.FILE_STORAGE_BACKEND == "s3":
+        return S3Backend(
+            bucket=settings.FILE_STORAGE_S3_BUCKET,
+            endpoint_url=settings.FILE_STORAGE_S3_ENDPOINT or None,
+            prefix=settings.FILE_STORAGE_S3_PREFIX,
+        )
+    return LocalBackend(settings.UPLOAD_DIR)
+
+
+file_storage = FileStorage(
+    backend=build_backend(),
+    staging_dir=str(Path(settings.UPLOAD_DIR) / ".staging"),
+    max_bytes=settings.UPLOAD_MAX_BYTES,
+)
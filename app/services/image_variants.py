@@ -0,0 +1,275 @@
+# app/services/image_variants.py
+# Уменьшенные копии фото товаров (миниатюры/превью) в дисковом кэше.
+#
+# - Набор размеров фиксирован (IMAGE_VARIANT_SIZES: thumb, small, medium, large),
+#   форматы — WebP и JPEG; произвольная ширина в URL не принимается, чтобы
+#   нельзя было забить кэш.
+# - Генерация — в пуле процессов (Pillow держит GIL при ресайзе): заранее при
+#   загрузке фото и лениво при первом запросе отсутствующего варианта.
+#   Одинаковые одновременные запросы ждут одну генерацию.
+# - Кэш: UPLOAD_DIR/variants/ab/<sha256>_<size>.<fmt>, общий бюджет в байтах,
+#   вытеснение давно не запрашивавшихся (LRU по mtime, который обновляется при
+#   обращении) — переживает перезапуск и общий для воркеров: каждый воркер
+#   пересканирует каталог раз в IMAGE_CACHE_RESCAN_SECONDS, и бюджет считается
+#   по реальному размеру каталога, а не по своим файлам (превышение между
+#   пересканированиями — не больше сгенерированного соседями за интервал).
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+_EXTENSIONS = {"webp": ".webp", "jpeg": ".jpg"}
+# mtime обновляется не чаще раза в час — без лишних записей метаданных на каждый hit
+_TOUCH_INTERVAL = 3600
+
+
+class VariantError(Exception):
+    """Исходное изображение не удалось прочитать или уменьшить."""
+
+
+def parse_sizes(spec: str) -> dict[str, int]:
+    """'thumb:160,small:320' -> {'thumb': 160, 'small': 320}"""
+    sizes = {}
+    for item in spec.split(","):
+        name, _, width = item.strip().partition(":")
+        if name and width.isdigit():
+            sizes[name] = int(width)
+    return sizes
+
+
+def variant_url(image_path: str | None, size: str | None, fmt: str = "webp") -> str | None:
+    """URL варианта фото для списков товаров (None — фото нет или оно не в хранилище)."""
+    from app.services.file_storage import KEY_RE
+
+    if not image_path or not KEY_RE.match(image_path):
+        return None
+    if size is None:
+        return f"/api/files/{image_path}"
+    return f"/api/files/{image_path}?size={size}&format={fmt}"
+
+
+def render_variant(source: str, target: str, width: int, fmt: str) -> int:
+    """
+    Выполняется в дочернем процессе: уменьшает source до ширины width
+    (без увеличения) и атомарно пишет в target. Возвращает размер файла.
+    """
+    from PIL import Image, ImageOps
+
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        with Image.open(source) as img:
+            # JPEG можно декодировать сразу в уменьшенном масштабе — в разы быстрее
+            img.draft("RGB", (width, width))
+            img = ImageOps.exif_transpose(img)
+            if img.width > width:
+                img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+            if fmt == "jpeg":
+                if img.mode in ("RGBA", "LA", "P"):
+                    img = img.convert("RGBA")
+                    background = Image.new("RGB", img.size, (255, 255, 255))
+                    background.paste(img, mask=img.getchannel("A"))
+                    img = background
+                elif img.mode != "RGB":
+                    img = img.convert("RGB")
+                img.save(tmp, "JPEG", quality=82, optimize=True, progressive=True)
+            else:
+                if img.mode not in ("RGB", "RGBA"):
+                    img = img.convert("RGBA" if "A" in img.getbands() or img.mode == "P" else "RGB")
+                img.save(tmp, "WEBP", quality=80, method=4)
+        os.replace(tmp, target)
+        return os.path.getsize(target)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class VariantCache:
+    """Дисковый кэш вариантов с LRU-вытеснением по суммарному размеру."""
+
+    def __init__(self, root: str, max_bytes: int, sizes: dict[str, int], workers: int = 2,
+                 rescan_seconds: float = 60):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.sizes = sizes
+        self.workers = workers
+        self.rescan_seconds = rescan_seconds
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._scanned_at: float | None = None
+        self._pool: ProcessPoolExecutor | None = None
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.evicted = 0
+        self.errors = 0
+
+    def relative_key(self, sha256: str, size: str, fmt: str) -> str:
+        return f"variants/{sha256[:2]}/{sha256}_{size}{_EXTENSIONS[fmt]}"
+
+    # --- Индекс и вытеснение ---
+
+    def _scan_due(self) -> bool:
+        return self._scanned_at is None or time.monotonic() - self._scanned_at >= self.rescan_seconds
+
+    def _load_index(self) -> None:
+        """
+        Сканирует каталог кэша (включая файлы соседних воркеров): порядок LRU —
+        по mtime. Повторяется раз в rescan_seconds; при превышении бюджета вытесняет.
+        """
+        with self._scan_lock:
+            if not self._scan_due():
+                return
+            entries = []
+            if self.root.exists():
+                for path in self.root.glob("*/*"):
+                    if path.suffix in (".webp", ".jpg"):
+                        try:
+                            stat = path.stat()
+                        except FileNotFoundError:  # вытеснен соседним воркером
+                            continue
+                        entries.append((stat.st_mtime, str(path), stat.st_size))
+            entries.sort()
+            with self._lock:
+                self._index = OrderedDict((path, size) for _, path, size in entries)
+                self._total = sum(size for _, _, size in entries)
+            self._scanned_at = time.monotonic()
+        self._evict()
+
+    def _touch(self, path: Path) -> None:
+        with self._lock:
+            if str(path) in self._index:
+                self._index.move_to_end(str(path))
+        try:
+            if time.time() - path.stat().st_mtime > _TOUCH_INTERVAL:
+                os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def _add(self, path: Path, size: int) -> None:
+        with self._lock:
+            previous = self._index.pop(str(path), 0)
+            self._index[str(path)] = size
+            self._total += size - previous
+        self._evict()
+
+    def _evict(self) -> None:
+        victims = []
+        with self._lock:
+            while self._total > self.max_bytes and len(self._index) > 1:
+                victim, victim_size = self._index.popitem(last=False)
+                self._total -= victim_size
+                victims.append(victim)
+        for victim in victims:
+            try:
+                os.unlink(victim)
+                self.evicted += 1
+            except FileNotFoundError:
+                pass
+
+    # --- Генерация ---
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Не fork: процесс сервера уже держит потоки и соединения пула БД
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._pool
+
+    async def lookup(self, sha256: str, size: str, fmt: str) -> Path | None:
+        """Путь к готовому варианту или None, если его ещё нет."""
+        if size not in self.sizes or fmt not in FORMATS:
+            raise ValueError("Unknown variant")
+        if self._scan_due():
+            await asyncio.to_thread(self._load_index)
+        target = self.root.parent / self.relative_key(sha256, size, fmt)
+        if not await asyncio.to_thread(target.is_file):
+            return None
+        self.hits += 1
+        await asyncio.to_thread(self._touch, target)
+        return target
+
+    async def get(self, source_path: Path, sha256: str, size: str, fmt: str) -> Path:
+        """Путь к варианту; при отсутствии генерирует его из source_path (ожидая генерацию)."""
+        target = await self.lookup(sha256, size, fmt)
+        if target is not None:
+            return target
+        self.misses += 1
+        target = self.root.parent / self.relative_key(sha256, size, fmt)
+        await self._generate(source_path, target, size, fmt)
+        return target
+
+    async def _generate(self, source_path: Path, target: Path, size: str, fmt: str) -> None:
+        key = str(target)
+        task = self._inflight.get(key)
+        if task is None:
+            # Отдельная задача: отключившийся клиент не отменяет генерацию для остальных
+            task = asyncio.ensure_future(self._render(source_path, target, size, fmt))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        await asyncio.shield(task)
+
+    async def _render(self, source_path: Path, target: Path, size: str, fmt: str) -> None:
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        try:
+            file_size = await loop.run_in_executor(
+                self._executor(), render_variant, str(source_path), str(target), self.sizes[size], fmt
+            )
+        except Exception as e:
+            self.errors += 1
+            raise VariantError(str(e)) from e
+        self.generated += 1
+        await asyncio.to_thread(self._add, target, file_size)
+
+    async def pregenerate(self, source_path: Path, sha256: str, formats: list[str]) -> None:
+        """Генерирует все размеры в заданных форматах (ошибки только логируются)."""
+        jobs = [self.get(source_path, sha256, size, fmt) for size in self.sizes for fmt in formats]
+        for result in await asyncio.gather(*jobs, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning(f"Variant pre-generation failed for {sha256}: {result}")
+                return
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total, files = self._total, len(self._index)
+        return {
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "files": files,
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "evicted": self.evicted,
+            "errors": self.errors,
+            "inflight": len(self._inflight),
+        }
+
+
+variant_cache = VariantCache(
+    root=str(Path(settings.UPLOAD_DIR) / "variants"),
+    max_bytes=settings.IMAGE_CACHE_MAX_BYTES,
+    sizes=parse_sizes(settings.IMAGE_VARIANT_SIZES),
+    workers=settings.IMAGE_WORKERS,
+    rescan_seconds=settings.IMAGE_CACHE_RESCAN_SECONDS,
+)
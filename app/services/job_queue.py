@@ -0,0 +1,350 @@
+# app/services/job_queue.py
+# Локальная персистентная очередь фоновых задач на таблице jobs.
+#
+# - enqueue() пишет задачи в той же транзакции, что и бизнес-изменение
+#   (задача не потеряется и не появится без самого изменения);
+# - JobWorker забирает пачку задач через
+#   UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING,
+#   поэтому несколько воркеров (потоки/процессы) не мешают друг другу;
+#   в SQLite SKIP LOCKED нет, но запись и так сериализована;
+# - ошибка -> повтор с экспоненциальной задержкой, после max_attempts — failed;
+# - задача, зависшая в running дольше visibility_timeout, забирается снова.
+#   Перед запуском каждой задачи пачки воркер продлевает аренду (locked_at),
+#   а итог пишет только под условием locked_by = свой id: задачу, которую уже
+#   забрал другой воркер, отставший не запускает и не перезаписывает.
+import json
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.job import Job, JobStatus
+from app.services.notifications import notification_dispatcher
+
+logger = logging.getLogger(__name__)
+
+# kind -> обработчик(payload: dict)
+_handlers: dict = {}
+# Типы долгих задач: пока обработчик работает, аренда продлевается в фоне
+_heartbeat_kinds: set[str] = set()
+
+
+def register(kind: str, heartbeat: bool = False):
+    """
+    Декоратор: регистрирует обработчик задач данного типа.
+    heartbeat=True — для задач, которые могут идти дольше visibility_timeout.
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        if heartbeat:
+            _heartbeat_kinds.add(kind)
+        return func
+    return decorator
+
+
+def enqueue(db: Session, kind: str, payloads: list[dict], max_attempts: int = 5, delay_seconds: float = 0) -> int:
+    """
+    Ставит задачи в очередь одним INSERT (commit делает вызывающий код).
+    Возвращает число поставленных задач.
+    """
+    if not payloads:
+        return 0
+    now = datetime.utcnow()
+    run_after = now + timedelta(seconds=delay_seconds)
+    db.execute(insert(Job), [
+        {
+            "kind": kind,
+            "payload": json.dumps(payload, ensure_ascii=False),
+            "status": JobStatus.queued,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_after": run_after,
+            "created_at": now,
+        }
+        for payload in payloads
+    ])
+    return len(payloads)
+
+
+def enqueue_one(db: Session, kind: str, payload: dict, max_attempts: int = 5, delay_seconds: float = 0) -> int:
+    """Ставит одну задачу и возвращает её id (для опроса статуса клиентом)."""
+    now = datetime.utcnow()
+    return db.execute(
+        insert(Job)
+        .values(
+            kind=kind,
+            payload=json.dumps(payload, ensure_ascii=False),
+            status=JobStatus.queued,
+            attempts=0,
+            max_attempts=max_attempts,
+            run_after=now + timedelta(seconds=delay_seconds),
+            created_at=now,
+        )
+        .returning(Job.id)
+    ).scalar_one()
+
+
+def claim_jobs(db: Session, worker_id: str, limit: int, visibility_timeout: float) -> list:
+    """Атомарно забирает до limit готовых задач и помечает их running."""
+    now = datetime.utcnow()
+    ready = or_(
+        and_(Job.status == JobStatus.queued, Job.run_after <= now),
+        and_(Job.status == JobStatus.running, Job.locked_at < now - timedelta(seconds=visibility_timeout)),
+    )
+    candidates = (
+        select(Job.id)
+        .where(ready)
+        .order_by(Job.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.execute(
+        update(Job)
+        .where(Job.id.in_(candidates.scalar_subquery()), ready)
+        .values(status=JobStatus.running, locked_at=now, locked_by=worker_id, attempts=Job.attempts + 1)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return sorted(claimed, key=lambda job: job.id)
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(300.0, 2.0 ** attempts)
+
+
+class JobWorker:
+    """Фоновый поток, выполняющий задачи из таблицы jobs."""
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = 50,
+                 poll_interval: float = 1.0, visibility_timeout: float = 300.0):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.processed = 0
+        self.failed = 0
+
+    def run_once(self) -> int:
+        """Забирает и выполняет одну пачку задач. Возвращает их число."""
+        with self.session_factory() as db:
+            jobs = claim_jobs(db, self.worker_id, self.batch_size, self.visibility_timeout)
+            for job in jobs:
+                self._run_job(db, job)
+            return len(jobs)
+
+    def _owned(self, job_id: int):
+        return and_(Job.id == job_id, Job.status == JobStatus.running, Job.locked_by == self.worker_id)
+
+    def _renew_lease(self, db: Session, job_id: int) -> bool:
+        """Продлевает аренду задачи; False — её уже забрал другой воркер."""
+        renewed = db.execute(
+            update(Job).where(self._owned(job_id))
+            .values(locked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return renewed == 1
+
+    @contextmanager
+    def _heartbeat(self, job_id: int):
+        """Продлевает аренду задачи каждые visibility_timeout / 3, пока она выполняется."""
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(self.visibility_timeout / 3):
+                try:
+                    with self.session_factory() as db:
+                        if not self._renew_lease(db, job_id):
+                            return
+                except Exception as e:
+                    logger.warning(f"Job {job_id} lease renewal failed: {e}")
+
+        thread = threading.Thread(target=beat, name=f"job-heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _run_job(self, db: Session, job) -> None:
+        # Пока выполнялись предыдущие задачи пачки, аренда этой могла истечь
+        if not self._renew_lease(db, job.id):
+            logger.warning(f"Job {job.id} ({job.kind}) was reclaimed by another worker, skipping")
+            return
+        handler = _handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for job kind {job.kind!r}")
+            if job.kind in _heartbeat_kinds:
+                with self._heartbeat(job.id):
+                    handler(json.loads(job.payload))
+            else:
+                handler(json.loads(job.payload))
+            values = {"status": JobStatus.done, "finished_at": datetime.utcnow(), "locked_at": None, "locked_by": None}
+        except Exception as e:
+            logger.warning(f"Job {job.id} ({job.kind}) failed, attempt {job.attempts}: {e}")
+            now = datetime.utcnow()
+            if job.attempts >= job.max_attempts:
+                values = {"status": JobStatus.failed, "last_error": repr(e), "finished_at": now, "locked_at": None}
+            else:
+                values = {"status": JobStatus.queued, "last_error": repr(e), "locked_at": None, "locked_by": None,
+                          "run_after": now + timedelta(seconds=_retry_delay(job.attempts))}
+        finished = db.execute(
+            update(Job).where(self._owned(job.id)).values(**values).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if not finished:
+            logger.warning(f"Job {job.id} ({job.kind}) lease was lost while running, result discarded")
+        elif values["status"] == JobStatus.done:
+            self.processed += 1
+        elif values["status"] == JobStatus.failed:
+            self.failed += 1
+
+    def run_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                handled = self.run_once()
+            except Exception as e:
+                logger.error(f"Job worker error: {e}", exc_info=True)
+                handled = 0
+            if handled < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.run_forever, name="job-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"worker_id": self.worker_id, "processed": self.processed, "failed": self.failed}
+
+
+def queue_stats(db: Session) -> dict:
+    """Число задач по статусам."""
+    rows = db.execute(select(Job.status, func.count()).group_by(Job.status)).all()
+    return {status.value: count for status, count in rows}
+
+
+# --- Обработчики ---
+
+_ORDER_STATUS_TITLES = {
+    "reserved": "зарезервирован (из листа ожидания)",
+    "processing": "принят в обработку",
+    "processed": "собран",
+    "handed_to_courier": "передан курьеру",
+    "in_delivery": "в пути",
+    "delivered": "доставлен",
+    "cancelled": "отменён",
+}
+
+
+@register("order_status_changed")
+def _order_status_changed(payload: dict) -> None:
+    logger.info(
+        f"Order {payload['order_id']}: {payload['from_status']} -> {payload['to_status']} "
+        f"(by user {payload.get('actor_id')})"
+    )
+    if payload.get("user_id") is None:
+        return
+    status_title = _ORDER_STATUS_TITLES.get(payload["to_status"], payload["to_status"])
+    sent = notification_dispatcher.notify(
+        payload["user_id"],
+        "order_status",
+        title=f"Заказ №{payload['order_id']} {status_title}",
+        data={"order_id": payload["order_id"], "status": payload["to_status"]},
+        block=True,
+        timeout=30,
+    )
+    if not sent:
+        # Очередь уведомлений полна 30 с: задача уйдёт на повтор с задержкой
+        raise RuntimeError(f"Notification queue is full, order {payload['order_id']} status not sent")
+
+
+@register("channel_post_published")
+def _channel_post_published(payload: dict) -> None:
+    """
+    Новый товар в канале: уведомление всем активным клиентам (склеивается по пользователю).
+
+    Если очередь уведомлений не освободилась за 30 с, остаток рассылки (начиная
+    с этого пользователя, after_user_id) ставится отдельной задачей с задержкой:
+    повтор всей задачи разослал бы уже уведомлённым клиентам дубли.
+    """
+    from app.models.user import RoleEnum, User
+
+    with SessionLocal() as db:
+        user_ids = db.execute(
+            select(User.id)
+            .where(User.role == RoleEnum.client, User.blacklisted.is_not(True),
+                   User.id > payload.get("after_user_id", 0))
+            .order_by(User.id)
+            .execution_options(yield_per=1000)
+        ).scalars()
+        for user_id in user_ids:
+            sent = notification_dispatcher.notify(
+                user_id,
+                "channel_post",
+                title=f"Новый товар: {payload['title']}",
+                data={"post_id": payload["post_id"], "draft_id": payload["draft_id"]},
+                block=True,
+                timeout=30,
+            )
+            if not sent:
+                break
+        else:
+            return
+    logger.warning(f"Notification queue is full, channel post {payload['post_id']} fan-out "
+                   f"resumes from user {user_id} in 60 s")
+    with SessionLocal() as db:
+        enqueue_one(db, "channel_post_published", {**payload, "after_user_id": user_id - 1}, delay_seconds=60)
+        db.commit()
+
+
+@register("order_receipt")
+def _write_receipt(payload: dict) -> None:
+    """Квитанция о доставке: текстовый файл в UPLOAD_DIR/receipts (идемпотентно)."""
+    from app.models.order import Order, OrderItem
+    from app.models.product import ProductDraft
+
+    receipts_dir = Path(settings.UPLOAD_DIR) / "receipts"
+    receipts_dir.mkdir(parents=True, exist_ok=True)
+    with SessionLocal() as db:
+        order = db.get(Order, payload["order_id"])
+        if order is None:
+            return
+        lines = db.execute(
+            select(ProductDraft.title, OrderItem.quantity, OrderItem.price)
+            .join(ProductDraft, ProductDraft.id == OrderItem.draft_id)
+            .where(OrderItem.order_id == order.id)
+            .order_by(OrderItem.id)
+        ).all()
+    text = [f"Заказ №{order.id} от {order.created_at:%d.%m.%Y}", ""]
+    text += [f"{title} x{quantity} — {price * quantity:.2f}" for title, quantity, price in lines]
+    text += ["", f"Итого: {order.total:.2f}"]
+    tmp = receipts_dir / f"order_{order.id}.txt.tmp"
+    tmp.write_text("\n".join(text) + "\n", encoding="utf-8")
+    tmp.replace(receipts_dir / f"order_{order.id}.txt")
+
+
+@register("export", heartbeat=True)
+def _write_export(payload: dict) -> None:
+    """Фоновая выгрузка: файл в UPLOAD_DIR/exports (перезаписывается при повторе)."""
+    from app.services.exports import write_export_file
+
+    write_export_file(payload)
@@ -0,0 +1,373 @@
+# app/services/notifications.py
+# Диспетчер уведомлений: очередь -> склейка по пользователю -> пачки в транспорт.
+#
+# - notify() только кладёт событие в ограниченную очередь и сразу возвращает
+#   управление (из любого потока); запрос, вызвавший уведомление, не ждёт
+#   отправки. При переполнении событие отбрасывается и учитывается в dropped.
+# - События одного пользователя, пришедшие в пределах окна coalesce, склеиваются
+#   в одно сообщение («3 новых уведомления»), сообщения уходят пачками.
+# - Ошибка транспорта -> повтор с экспоненциальной задержкой и случайным
+#   разбросом (full jitter); после max_attempts пачка пишется в dead-letter файл.
+# - Транспорт подключаемый: log, file (JSON Lines, для разработки и тестов), http.
+import abc
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.metrics import (
+    NOTIFICATIONS_DEAD_LETTERED,
+    NOTIFICATIONS_DROPPED,
+    NOTIFICATIONS_QUEUE_DEPTH,
+    NOTIFICATIONS_SEND_LATENCY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationTransport(abc.ABC):
+    """Транспорт: отправляет пачку сообщений, при ошибке бросает исключение."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    async def send_batch(self, messages: list[dict]) -> None:
+        """Отправляет messages; при ошибке бросает исключение (пачка уйдёт на повтор)."""
+
+    async def close(self) -> None:
+        pass
+
+
+class LogTransport(NotificationTransport):
+    name = "log"
+
+    async def send_batch(self, messages: list[dict]) -> None:
+        for message in messages:
+            logger.info(f"Notification to user {message['user_id']}: {message['title']}")
+
+
+class FileTransport(NotificationTransport):
+    """Пишет сообщения в файл JSON Lines — заглушка push-сервиса для разработки и тестов."""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _append(self, messages: list[dict]) -> None:
+        data = "".join(json.dumps(message, ensure_ascii=False) + "\n" for message in messages)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+
+    async def send_batch(self, messages: list[dict]) -> None:
+        await asyncio.to_thread(self._append, messages)
+
+
+class HttpTransport(NotificationTransport):
+    """POST {"messages": [...]} на url (шлюз push-уведомлений/SMS)."""
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        import httpx
+
+        self.url = url
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def send_batch(self, messages: list[dict]) -> None:
+        response = await self._client.post(self.url, json={"messages": messages})
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def build_transport(name: str) -> NotificationTransport:
+    if name == "file":
+        return FileTransport(settings.NOTIFICATIONS_FILE)
+    if name == "http":
+        if not settings.NOTIFICATIONS_HTTP_URL:
+            raise ValueError("NOTIFICATIONS_HTTP_URL is not set")
+        return HttpTransport(settings.NOTIFICATIONS_HTTP_URL)
+    return LogTransport()
+
+
+def _percentile(samples, q: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1)
+
+
+class NotificationDispatcher:
+    """Асинхронная отправка уведомлений пачками со склейкой по пользователю."""
+
+    def __init__(self, transport: NotificationTransport | None = None, max_queue: int = 10000,
+                 coalesce_seconds: float = 0.5, batch_size: int = 100, max_attempts: int = 5,
+                 max_concurrent_batches: int = 4, dead_letter_path: str | None = None,
+                 retry_base_seconds: float = 0.5, retry_max_seconds: float = 30.0):
+        self.transport = transport or LogTransport()
+        self.max_queue = max_queue
+        self.coalesce_seconds = coalesce_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.max_concurrent_batches = max_concurrent_batches
+        self.dead_letter_path = dead_letter_path
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._pending: deque = deque()
+        self._space = threading.Condition()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+        self._slots: asyncio.Semaphore | None = None
+        self._thread: threading.Thread | None = None
+        self._send_seconds: deque = deque(maxlen=1000)
+        self._delivery_seconds: deque = deque(maxlen=1000)
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent_events = 0
+        self.sent_messages = 0
+        self.batches = 0
+        self.retries = 0
+        self.dead_lettered = 0
+
+    # --- Постановка в очередь (любой поток) ---
+
+    def notify(self, user_id: int, kind: str, title: str, body: str = "", data: dict | None = None,
+               block: bool = False, timeout: float | None = None) -> bool:
+        """
+        Ставит уведомление в очередь. Не ждёт отправки.
+        block=True (только для фоновых задач, не в event loop) ждёт место в очереди
+        до timeout; иначе при переполнении уведомление отбрасывается.
+        Возвращает False, если уведомление отброшено.
+        """
+        item = {
+            "user_id": user_id,
+            "kind": kind,
+            "title": title,
+            "body": body,
+            "data": data or {},
+            "created_at": datetime.utcnow().isoformat(),
+            "_queued": time.monotonic(),
+        }
+        with self._space:
+            if len(self._pending) >= self.max_queue:
+                if not block or not self._space.wait_for(lambda: len(self._pending) < self.max_queue, timeout):
+                    self.dropped += 1
+                    NOTIFICATIONS_DROPPED.inc()
+                    return False
+            was_empty = not self._pending
+            self._pending.append(item)
+            self.enqueued += 1
+            NOTIFICATIONS_QUEUE_DEPTH.inc()
+        if was_empty:
+            self._wake_loop()
+        return True
+
+    def _wake_loop(self) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            pass
+
+    def _drain(self) -> list[dict]:
+        with self._space:
+            items = list(self._pending)
+            self._pending.clear()
+            self._space.notify_all()
+        NOTIFICATIONS_QUEUE_DEPTH.dec(len(items))
+        return items
+
+    # --- Жизненный цикл ---
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._task = asyncio.create_task(self._run(), name="notification-dispatcher")
+        if self._pending:
+            self._wake.set()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Останавливает приём из очереди, досылает накопленное и закрывает транспорт."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await asyncio.wait_for(self._flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Notification dispatcher stopped with undelivered batches")
+        await self.transport.close()
+        self._loop = None
+
+    def start_in_thread(self) -> None:
+        """Запуск в собственном event loop — для процессов без asyncio (воркер очереди задач)."""
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name="notification-loop", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop_thread(self, timeout: float = 10.0) -> None:
+        loop = self._loop
+        if self._thread is None or loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(timeout), loop).result(timeout + 5)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # --- Обработка ---
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            # Окно склейки: даём накопиться событиям того же пользователя
+            await asyncio.sleep(self.coalesce_seconds)
+            self._wake.clear()
+            await self._dispatch(self._drain())
+
+    async def _flush(self) -> None:
+        await self._dispatch(self._drain())
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    @staticmethod
+    def coalesce(items: list[dict]) -> list[dict]:
+        """События одного пользователя -> одно сообщение (в порядке первого события)."""
+        by_user: dict[int, list[dict]] = {}
+        for item in items:
+            by_user.setdefault(item["user_id"], []).append(item)
+        messages = []
+        for user_id, events in by_user.items():
+            if len(events) == 1:
+                title, body = events[0]["title"], events[0]["body"]
+            else:
+                title, body = f"Новых уведомлений: {len(events)}", events[-1]["title"]
+            messages.append({
+                "user_id": user_id,
+                "title": title,
+                "body": body,
+                "events": [{key: value for key, value in event.items() if key != "_queued"} for event in events],
+                "_queued": events[0]["_queued"],
+            })
+        return messages
+
+    async def _dispatch(self, items: list[dict]) -> None:
+        if not items:
+            return
+        messages = self.coalesce(items)
+        for i in range(0, len(messages), self.batch_size):
+            # Ограничение параллельных пачек — естественный backpressure на транспорт
+            await self._slots.acquire()
+            task = asyncio.create_task(self._send(messages[i:i + self.batch_size]))
+            self._inflight.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task) -> None:
+        self._inflight.discard(task)
+        self._slots.release()
+
+    async def _send(self, messages: list[dict]) -> None:
+        payload = [{key: value for key, value in message.items() if key != "_queued"} for message in messages]
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.monotonic()
+            try:
+                await self.transport.send_batch(payload)
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    logger.error(f"Notification batch failed after {attempt} attempts: {e}")
+                    await self._dead_letter(payload, repr(e))
+                    return
+                self.retries += 1
+                delay = random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+                logger.warning(f"Notification batch failed ({e}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            finished = time.monotonic()
+            self._send_seconds.append(finished - started)
+            NOTIFICATIONS_SEND_LATENCY.observe(finished - started)
+            for message in messages:
+                self._delivery_seconds.append(finished - message["_queued"])
+            self.batches += 1
+            self.sent_messages += len(messages)
+            self.sent_events += sum(len(message["events"]) for message in messages)
+            return
+
+    async def _dead_letter(self, payload: list[dict], error: str) -> None:
+        self.dead_lettered += len(payload)
+        NOTIFICATIONS_DEAD_LETTERED.inc(len(payload))
+        if not self.dead_letter_path:
+            return
+        record = json.dumps(
+            {"failed_at": datetime.utcnow().isoformat(), "error": error, "messages": payload},
+            ensure_ascii=False,
+        )
+
+        def append():
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(record + "\n")
+
+        try:
+            await asyncio.to_thread(append)
+        except OSError as e:
+            logger.error(f"Cannot write notification dead letter: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "transport": self.transport.name,
+            "running": self._task is not None,
+            "queue_depth": len(self._pending),
+            "max_queue": self.max_queue,
+            "inflight_batches": len(self._inflight),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "sent_events": self.sent_events,
+            "sent_messages": self.sent_messages,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "send_latency_ms": {
+                "p50": _percentile(self._send_seconds, 0.5),
+                "p95": _percentile(self._send_seconds, 0.95),
+            },
+            "delivery_latency_ms": {
+                "p50": _percentile(self._delivery_seconds, 0.5),
+                "p95": _percentile(self._delivery_seconds, 0.95),
+            },
+        }
+
+
+notification_dispatcher = NotificationDispatcher(
+    transport=build_transport(settings.NOTIFICATIONS_TRANSPORT),
+    max_queue=settings.NOTIFICATIONS_QUEUE_SIZE,
+    coalesce_seconds=settings.NOTIFICATIONS_COALESCE_MS / 1000,
+    batch_size=settings.NOTIFICATIONS_BATCH_SIZE,
+    max_attempts=settings.NOTIFICATIONS_MAX_ATTEMPTS,
+    dead_letter_path=settings.NOTIFICATIONS_DEAD_LETTER_FILE or None,
+)
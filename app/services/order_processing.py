@@ -0,0 +1,473 @@
+# app/services/order_processing.py
+# Резервирование товаров: корзина -> Order/OrderItem со статусом reserved.
+#
+# Когда популярный пост выходит в канал, сотни клиентов одновременно резервируют
+# один и тот же ProductDraft.quantity. Чтобы не было перепродажи и очередей на
+# блокировках строки:
+# - запросы одного воркера собираются ReservationBatcher в пачки и
+#   обрабатываются в одной транзакции;
+# - строки товаров пачки блокируются один раз (SELECT ... FOR UPDATE, по
+#   возрастанию id — без дедлоков между воркерами), остаток распределяется в
+#   памяти в порядке поступления запросов;
+# - списание — условный UPDATE (quantity >= списываемого) по одному на товар,
+#   остаток не может уйти в минус даже при гонке с другим процессом;
+# - кому не хватило, попадает в waitlist с детерминированной позицией;
+# - UPDATE остатков идут в обход ORM, поэтому кэш ленты (в ней виден остаток)
+#   помечается к сбросу явно — mark_catalog_changed.
+#
+# Массовая смена статусов (transition_orders) — условный UPDATE на пачку (по одному
+# на исходный статус), агрегаты продаж обновляются в той же транзакции,
+# последующая работа (квитанции, уведомления) уходит в очередь jobs. Отмена
+# возвращает позиции на склад и резервирует освободившийся остаток для листа
+# ожидания (строго по позициям).
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.catalog_cache import mark_catalog_changed
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.cart import CartItem
+from app.models.order import Order, OrderItem, OrderStatus, WaitlistEntry
+from app.models.product import ProductDraft
+from app.services import job_queue, sales_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class StockConflict(Exception):
+    """Условное списание не прошло — остаток изменили в обход блокировки."""
+
+
+def _empty_result() -> dict:
+    return {"order_id": None, "status": None, "items": [], "total": 0.0, "waitlisted": [], "unavailable": []}
+
+
+def reserve_carts(db: Session, user_ids: list[int]) -> dict[int, dict]:
+    """
+    Резервирует корзины пользователей в одной транзакции (в порядке user_ids).
+    Позиция корзины резервируется целиком или уходит в waitlist (всегда, если
+    у товара уже есть очередь).
+    Зарезервированные и поставленные в очередь позиции удаляются из корзины.
+    Возвращает {user_id: результат}.
+    """
+    results = {user_id: _empty_result() for user_id in user_ids}
+    lines = db.execute(
+        select(CartItem.user_id, CartItem.draft_id, CartItem.quantity)
+        .where(CartItem.user_id.in_(user_ids))
+        .order_by(CartItem.id)
+    ).all()
+    if not lines:
+        return results
+    lines_by_user = defaultdict(list)
+    for line in lines:
+        lines_by_user[line.user_id].append(line)
+    draft_ids = sorted({line.draft_id for line in lines})
+
+    # Одна блокировка на товар на всю пачку, в порядке id
+    stock = {
+        row.id: row
+        for row in db.execute(
+            select(ProductDraft.id, ProductDraft.quantity, ProductDraft.price)
+            .where(ProductDraft.id.in_(draft_ids), ProductDraft.published.is_(True))
+            .order_by(ProductDraft.id)
+            .with_for_update()
+        )
+    }
+    next_position = dict(db.execute(
+        select(WaitlistEntry.draft_id, func.max(WaitlistEntry.position))
+        .where(WaitlistEntry.draft_id.in_(draft_ids))
+        .group_by(WaitlistEntry.draft_id)
+    ).all())
+
+    taken: dict[int, int] = defaultdict(int)
+    orders: dict[int, Order] = {}
+    waitlist_rows = []
+    for user_id in user_ids:
+        result = results[user_id]
+        for line in lines_by_user.get(user_id, ()):
+            quantity = line.quantity or 1
+            row = stock.get(line.draft_id)
+            if row is None:
+                result["unavailable"].append(line.draft_id)
+                continue
+            # Пока у товара есть лист ожидания, новые покупатели встают в его конец:
+            # освободившийся остаток сначала получает очередь (promote_waitlist)
+            if line.draft_id not in next_position and (row.quantity or 0) - taken[line.draft_id] >= quantity:
+                taken[line.draft_id] += quantity
+                order = orders.get(user_id)
+                if order is None:
+                    order = orders[user_id] = Order(user_id=user_id, status=OrderStatus.reserved, total=0.0)
+                order.items.append(OrderItem(draft_id=line.draft_id, quantity=quantity, price=row.price))
+                result["items"].append({"draft_id": line.draft_id, "quantity": quantity, "price": row.price})
+            else:
+                position = (next_position.get(line.draft_id) or 0) + 1
+                next_position[line.draft_id] = position
+                waitlist_rows.append(
+                    {"draft_id": line.draft_id, "user_id": user_id, "quantity": quantity, "position": position}
+                )
+                result["waitlisted"].append({"draft_id": line.draft_id, "quantity": quantity, "position": position})
+
+    for draft_id in sorted(taken):
+        updated = db.execute(
+            update(ProductDraft)
+            .where(ProductDraft.id == draft_id, ProductDraft.quantity >= taken[draft_id])
+            .values(quantity=ProductDraft.quantity - taken[draft_id])
+            .execution_options(synchronize_session=False)
+        )
+        if updated.rowcount != 1:
+            raise StockConflict(draft_id)
+    if taken:
+        mark_catalog_changed(db)
+
+    for user_id, order in orders.items():
+        subtotal = sum(item.price * item.quantity for item in order.items)
+        fee = 0.0 if subtotal >= settings.DELIVERY_FREE_THRESHOLD else settings.DELIVERY_FEE
+        order.total = subtotal + fee
+    db.add_all(orders.values())
+    if waitlist_rows:
+        db.execute(insert(WaitlistEntry), waitlist_rows)
+    db.execute(
+        delete(CartItem)
+        .where(CartItem.user_id.in_(user_ids), CartItem.draft_id.in_(list(stock)))
+        .execution_options(synchronize_session=False)
+    )
+    db.flush()
+    for user_id, order in orders.items():
+        results[user_id].update(order_id=order.id, status=order.status.value, total=order.total)
+    return results
+
+
+def run_reservation(session_factory, user_ids: list[int], attempts: int = 3, on_conflict=None) -> dict[int, dict]:
+    """
+    reserve_carts в отдельной сессии с commit; при StockConflict или гонке за
+    позицию в листе ожидания (без FOR UPDATE, например в SQLite) пачка
+    повторяется с заново прочитанными остатками.
+    """
+    for attempt in range(1, attempts + 1):
+        db = session_factory()
+        try:
+            results = reserve_carts(db, user_ids)
+            db.commit()
+            return results
+        except (StockConflict, IntegrityError) as e:
+            db.rollback()
+            if on_conflict is not None:
+                on_conflict()
+            logger.warning(f"Reservation conflict ({type(e).__name__}), retrying ({attempt}/{attempts})")
+            if attempt == attempts:
+                raise
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class ReservationBatcher:
+    """
+    Собирает запросы резервирования из потоков воркера и выполняет их пачками.
+    Пока идёт одна пачка, следующие запросы копятся в очереди (естественный
+    батчинг); window_seconds добавляет короткое ожидание добора пачки.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_batch: int = 100, window_seconds: float = 0.002):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.window_seconds = window_seconds
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.conflicts = 0
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="reservation-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, user_id: int) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((user_id, future))
+        return future
+
+    def reserve(self, user_id: int, timeout: float | None = None) -> dict:
+        """Синхронно резервирует корзину пользователя (ждёт свою пачку)."""
+        return self.submit(user_id).result(timeout=timeout)
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            self._execute(self._collect(first))
+
+    def _execute(self, batch: list) -> None:
+        # Повторный запрос того же пользователя в пачке получает тот же результат
+        user_ids = list(dict.fromkeys(user_id for user_id, _ in batch))
+        try:
+            results = run_reservation(self.session_factory, user_ids, on_conflict=self._count_conflict)
+        except Exception as e:
+            logger.error(f"Reservation batch failed: {e}", exc_info=True)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self.batches += 1
+            self.requests += len(batch)
+        for user_id, future in batch:
+            future.set_result(results[user_id])
+
+    def _count_conflict(self) -> None:
+        self.conflicts += 1
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "conflicts": self.conflicts,
+            "queued": self._queue.qsize(),
+        }
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+
+
+reservation_batcher = ReservationBatcher(
+    max_batch=settings.RESERVATION_BATCH_SIZE,
+    window_seconds=settings.RESERVATION_BATCH_WINDOW_MS / 1000,
+)
+
+
+def _lock_drafts(db: Session, draft_ids) -> dict:
+    """Блокирует строки товаров в порядке id (как reserve_carts) и возвращает их остаток и цену."""
+    return {
+        row.id: row
+        for row in db.execute(
+            select(ProductDraft.id, ProductDraft.quantity, ProductDraft.price)
+            .where(ProductDraft.id.in_(draft_ids))
+            .order_by(ProductDraft.id)
+            .with_for_update()
+        )
+    }
+
+
+def release_stock(db: Session, order_ids: list[int]) -> list[int]:
+    """
+    Возвращает на склад позиции заказов order_ids одним
+    UPDATE ... FROM (SELECT draft_id, SUM(quantity) ... GROUP BY draft_id).
+    Возвращает id товаров, остаток которых вырос.
+    """
+    if not order_ids:
+        return []
+    returned = (
+        select(OrderItem.draft_id, func.sum(OrderItem.quantity).label("quantity"))
+        .where(OrderItem.order_id.in_(order_ids))
+        .group_by(OrderItem.draft_id)
+        .subquery()
+    )
+    _lock_drafts(db, select(returned.c.draft_id))
+    mark_catalog_changed(db)
+    return sorted(db.execute(
+        update(ProductDraft)
+        .where(ProductDraft.id == returned.c.draft_id)
+        .values(quantity=func.coalesce(ProductDraft.quantity, 0) + returned.c.quantity)
+        .returning(ProductDraft.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+
+
+def promote_waitlist(db: Session, draft_ids: list[int]) -> list[dict]:
+    """
+    Резервирует освободившийся остаток для листа ожидания товаров draft_ids:
+    записи идут строго по позиции, первая не поместившаяся останавливает очередь
+    товара. Поднятые записи становятся заказами reserved (по одному на
+    пользователя) и удаляются из листа. Возвращает [{order_id, user_id}].
+    """
+    if not draft_ids:
+        return []
+    stock = _lock_drafts(db, sorted(draft_ids))
+    entries = db.execute(
+        select(WaitlistEntry.id, WaitlistEntry.draft_id, WaitlistEntry.user_id, WaitlistEntry.quantity)
+        .where(WaitlistEntry.draft_id.in_(list(stock)))
+        .order_by(WaitlistEntry.draft_id, WaitlistEntry.position)
+    ).all()
+    taken: dict[int, int] = defaultdict(int)
+    blocked = set()
+    promoted = []
+    orders: dict[int, Order] = {}
+    for entry in entries:
+        quantity = entry.quantity or 1
+        row = stock[entry.draft_id]
+        if entry.draft_id in blocked or (row.quantity or 0) - taken[entry.draft_id] < quantity:
+            blocked.add(entry.draft_id)
+            continue
+        taken[entry.draft_id] += quantity
+        order = orders.get(entry.user_id)
+        if order is None:
+            order = orders[entry.user_id] = Order(user_id=entry.user_id, status=OrderStatus.reserved, total=0.0)
+        order.items.append(OrderItem(draft_id=entry.draft_id, quantity=quantity, price=row.price))
+        promoted.append(entry.id)
+    if not promoted:
+        return []
+
+    for draft_id in sorted(taken):
+        updated = db.execute(
+            update(ProductDraft)
+            .where(ProductDraft.id == draft_id, ProductDraft.quantity >= taken[draft_id])
+            .values(quantity=ProductDraft.quantity - taken[draft_id])
+            .execution_options(synchronize_session=False)
+        )
+        if updated.rowcount != 1:
+            raise StockConflict(draft_id)
+    mark_catalog_changed(db)
+    for order in orders.values():
+        subtotal = sum(item.price * item.quantity for item in order.items)
+        order.total = subtotal + (0.0 if subtotal >= settings.DELIVERY_FREE_THRESHOLD else settings.DELIVERY_FEE)
+    db.add_all(orders.values())
+    db.execute(
+        delete(WaitlistEntry)
+        .where(WaitlistEntry.id.in_(promoted))
+        .execution_options(synchronize_session=False)
+    )
+    db.flush()
+    return [{"order_id": order.id, "user_id": user_id} for user_id, order in orders.items()]
+
+
+def _promoted_events(promoted: list[dict], actor_id: int | None = None) -> list[dict]:
+    return [
+        {
+            "order_id": order["order_id"],
+            "user_id": order["user_id"],
+            "from_status": "waitlisted",
+            "to_status": OrderStatus.reserved.value,
+            "actor_id": actor_id,
+        }
+        for order in promoted
+    ]
+
+
+def promote_after_restock(db: Session, creator_id: int, skus: list[str]) -> list[dict]:
+    """
+    Остаток товаров (creator_id, sku) пополнен в обход заказов (импорт
+    поставщика, product_crud.bulk_upsert_drafts): лист ожидания этих товаров
+    получает его первым. Уведомления — задачами, как при отмене. Commit делает
+    вызывающий код. Возвращает [{order_id, user_id}].
+    """
+    if not skus:
+        return []
+    waiting = db.execute(
+        select(WaitlistEntry.draft_id)
+        .join(ProductDraft, ProductDraft.id == WaitlistEntry.draft_id)
+        .where(ProductDraft.creator_id == creator_id, ProductDraft.sku.in_(skus))
+        .distinct()
+    ).scalars().all()
+    promoted = promote_waitlist(db, list(waiting))
+    job_queue.enqueue(db, "order_status_changed", _promoted_events(promoted))
+    return promoted
+
+
+# Допустимые переходы: целевой статус -> из каких статусов в него можно перейти
+ALLOWED_TRANSITIONS: dict[OrderStatus, tuple[OrderStatus, ...]] = {
+    OrderStatus.processing: (OrderStatus.reserved,),
+    OrderStatus.processed: (OrderStatus.processing,),
+    OrderStatus.handed_to_courier: (OrderStatus.processed,),
+    OrderStatus.in_delivery: (OrderStatus.handed_to_courier,),
+    OrderStatus.delivered: (OrderStatus.in_delivery,),
+    OrderStatus.cancelled: (OrderStatus.reserved, OrderStatus.processing, OrderStatus.processed),
+}
+
+
+def transition_orders(db: Session, order_ids: list[int], to_status: OrderStatus, actor_id: int | None = None) -> dict:
+    """
+    Переводит заказы в to_status условным UPDATE ... WHERE status = исходный RETURNING.
+    Гонка с другим воркером безопасна: заказ, статус которого уже сменили,
+    просто не попадёт под условие. Для отклонённых заказов одним SELECT
+    выясняется причина. Задачи-последствия ставятся в очередь в той же
+    транзакции. Commit делает вызывающий код.
+    """
+    to_status = OrderStatus(to_status)
+    allowed_from = ALLOWED_TRANSITIONS.get(to_status, ())
+    order_ids = list(dict.fromkeys(order_ids))
+    updated = {}
+    # RETURNING отдаёт уже новый статус, поэтому UPDATE — по одному на исходный
+    # статус (больше одного только у cancelled): прежний статус нужен агрегатам
+    # продаж и уведомлениям
+    for from_status in allowed_from:
+        pending = [order_id for order_id in order_ids if order_id not in updated]
+        if not pending:
+            break
+        for row in db.execute(
+            update(Order)
+            .where(Order.id.in_(pending), Order.status == from_status)
+            .values(status=to_status)
+            .returning(Order.id, Order.user_id, Order.created_at, Order.total)
+            .execution_options(synchronize_session=False)
+        ):
+            updated[row.id] = (row, from_status)
+    sales_rollups.queue_changes(db, [
+        (order_id, row.created_at.date(), row.total, from_status, to_status)
+        for order_id, (row, from_status) in updated.items()
+    ])
+
+    rejected_ids = [order_id for order_id in order_ids if order_id not in updated]
+    current = {}
+    if rejected_ids:
+        current = dict(db.execute(select(Order.id, Order.status).where(Order.id.in_(rejected_ids))).all())
+    rejected = [
+        {
+            "order_id": order_id,
+            "reason": "not_found" if order_id not in current else "invalid_transition",
+            "status": current[order_id].value if order_id in current else None,
+        }
+        for order_id in rejected_ids
+    ]
+
+    transitioned = sorted(updated)
+    promoted = []
+    if to_status == OrderStatus.cancelled:
+        promoted = promote_waitlist(db, release_stock(db, transitioned))
+    job_queue.enqueue(db, "order_status_changed", [
+        {
+            "order_id": order_id,
+            "user_id": updated[order_id][0].user_id,
+            "from_status": updated[order_id][1].value,
+            "to_status": to_status.value,
+            "actor_id": actor_id,
+        }
+        for order_id in transitioned
+    ] + _promoted_events(promoted, actor_id))
+    if to_status == OrderStatus.delivered:
+        job_queue.enqueue(db, "order_receipt", [{"order_id": order_id} for order_id in transitioned])
+    return {
+        "to_status": to_status.value,
+        "updated": transitioned,
+        "rejected": rejected,
+        "promoted": [order["order_id"] for order in promoted],
+    }
@@ -0,0 +1,336 @@
+# app/services/route_planner.py
+# Планирование курьерских маршрутов для заказов в статусе handed_to_courier.
+#
+# - Стопы (заказы с координатами из order_deliveries) делятся на пачки не больше
+#   COURIER_MAX_STOPS методом заметания (sweep): сортировка по азимуту от склада,
+#   начало — после самого большого углового разрыва, пачки равного размера.
+# - Порядок внутри пачки: жадный «ближайший сосед» (с учётом ожидания открытия
+#   окна и штрафа за опоздание) и улучшение 2-opt; выигрыш всех разворотов
+#   считается одним векторным выражением NumPy. Если у стопов есть окна,
+#   опаздывающие стопы сначала переносятся раньше (пока падает путь + штраф),
+#   а ход 2-opt принимается, только если суммарное опоздание не растёт;
+#   расписания кандидатов проверяются пачкой (_simulate).
+# - Расстояния — гаверсинус по матрице NumPy, умноженный на COURIER_ROAD_FACTOR.
+# - Пачки независимы: при большом числе стопов решаются в пуле процессов
+#   (forkserver/spawn — дочерние процессы не наследуют потоки и сокеты сервера).
+import logging
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.delivery import OrderDelivery
+from app.models.order import Order, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+# Минута опоздания весит как LATE_PENALTY минут пути (жадный выбор, перенос опаздывающих)
+LATE_PENALTY = 10.0
+_MAX_PASSES = 50
+_MAX_MOVES = 5000
+# Сколько лучших по пути разворотов 2-opt проверяется на опоздание за шаг
+_TIMED_CANDIDATES = 64
+
+
+def distance_matrix(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Попарные расстояния по дуге большого круга, км (координаты в градусах)."""
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+    a = (
+        np.sin((phi[:, None] - phi[None, :]) / 2) ** 2
+        + np.cos(phi)[:, None] * np.cos(phi)[None, :] * np.sin((lam[:, None] - lam[None, :]) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def sweep_clusters(lat: np.ndarray, lon: np.ndarray, depot: tuple[float, float], max_stops: int) -> list[np.ndarray]:
+    """Индексы стопов по пачкам: сектора вокруг склада, не больше max_stops в пачке."""
+    count = len(lat)
+    if count == 0:
+        return []
+    x = (lon - depot[1]) * math.cos(math.radians(depot[0]))
+    angle = np.arctan2(lat - depot[0], x)
+    order = np.argsort(angle, kind="stable")
+    sorted_angle = angle[order]
+    gaps = np.diff(np.append(sorted_angle, sorted_angle[0] + 2 * np.pi))
+    order = np.roll(order, -((int(np.argmax(gaps)) + 1) % count))
+    return np.array_split(order, math.ceil(count / max_stops))
+
+
+def _simulate(tours, minutes, window_start, window_end, service):
+    """
+    Расписание сразу для пачки маршрутов (m x n узлов): прибытие к каждому узлу
+    (минуты от старта, с ожиданием открытия окна) и суммарное опоздание каждого.
+    """
+    count, size = tours.shape
+    eta = np.zeros((count, size))
+    now = np.zeros(count)
+    late = np.zeros(count)
+    for position in range(1, size):
+        node = tours[:, position]
+        now = np.maximum(now + minutes[tours[:, position - 1], node], window_start[node])
+        eta[:, position] = now
+        late += np.maximum(0.0, now - window_end[node])
+        now += service
+    return eta, late
+
+
+def _nearest_neighbour(minutes, window_start, window_end, service) -> np.ndarray:
+    """Жадный маршрут 0 -> ... -> 0: следующий — с ранним началом вручения и без опоздания."""
+    count = len(minutes)
+    tour = [0]
+    left = np.ones(count, dtype=bool)
+    left[0] = False
+    now = 0.0
+    for _ in range(count - 1):
+        current = tour[-1]
+        arrival = now + minutes[current]
+        start = np.maximum(arrival, window_start)
+        score = start - now + LATE_PENALTY * np.maximum(0.0, start - window_end)
+        score[~left] = np.inf
+        node = int(np.argmin(score))
+        tour.append(node)
+        left[node] = False
+        now = start[node] + service
+    tour.append(0)
+    return np.array(tour)
+
+
+def _relocate_late(tour, minutes, window_start, window_end, service) -> np.ndarray:
+    """Переносит опаздывающие стопы раньше по маршруту, пока падает путь + штраф за опоздание."""
+    best_cost = None
+    for _ in range(_MAX_PASSES):
+        eta, late = _simulate(tour[None], minutes, window_start, window_end, service)
+        if late[0] <= 0:
+            break
+        if best_cost is None:
+            best_cost = minutes[tour[:-1], tour[1:]].sum() + LATE_PENALTY * late[0]
+        nodes = tour.tolist()
+        candidates = []
+        for position in np.nonzero(eta[0, 1:-1] > window_end[tour[1:-1]])[0] + 1:
+            rest = nodes[:position] + nodes[position + 1:]
+            candidates += [rest[:target] + [nodes[position]] + rest[target:] for target in range(1, position)]
+        if not candidates:
+            break
+        candidates = np.array(candidates)
+        cost = (
+            minutes[candidates[:, :-1], candidates[:, 1:]].sum(axis=1)
+            + LATE_PENALTY * _simulate(candidates, minutes, window_start, window_end, service)[1]
+        )
+        best = int(np.argmin(cost))
+        if cost[best] >= best_cost - 1e-9:
+            break
+        best_cost, tour = cost[best], candidates[best]
+    return tour
+
+
+def _two_opt(tour, dist, minutes, window_start, window_end, service, timed: bool) -> np.ndarray:
+    """
+    2-opt для замкнутого маршрута (склад на концах не двигается), лучший ход за шаг:
+    выигрыш всех разворотов tour[i..j] — одно векторное выражение. С окнами ход
+    выбирается из _TIMED_CANDIDATES лучших по пути, не увеличивающих опоздание.
+    """
+    size = len(tour)
+    first, last = np.triu_indices(size - 1, k=1)
+    keep = first >= 1
+    first, last = first[keep], last[keep]
+    positions = np.arange(size)
+    late = _simulate(tour[None], minutes, window_start, window_end, service)[1][0] if timed else 0.0
+    for _ in range(_MAX_MOVES):
+        # Разворот tour[i..j]: рёбра (a,b),(c,d) -> (a,c),(b,d)
+        a, b, c, d = tour[first - 1], tour[first], tour[last], tour[last + 1]
+        delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+        better = np.nonzero(delta < -1e-9)[0]
+        if not len(better):
+            break
+        better = better[np.argsort(delta[better])[:_TIMED_CANDIDATES if timed else 1]]
+        i, j = first[better][:, None], last[better][:, None]
+        inside = (positions >= i) & (positions <= j)
+        candidates = tour[np.where(inside, i + j - positions, positions)]
+        if timed:
+            candidate_late = _simulate(candidates, minutes, window_start, window_end, service)[1]
+            allowed = np.nonzero(candidate_late <= late + 1e-9)[0]
+            if not len(allowed):
+                break
+            tour, late = candidates[allowed[0]], candidate_late[allowed[0]]
+        else:
+            tour = candidates[0]
+    return tour
+
+
+def solve_route(task: dict) -> dict:
+    """
+    Порядок объезда одной пачки (выполняется и в дочернем процессе).
+    task: lat, lon, window_start, window_end (минуты от старта, nan — без окна), depot,
+    speed_kmh, road_factor, service_minutes.
+    Возвращает order (индексы стопов пачки по порядку), eta (минуты), distance_km, duration_minutes.
+    """
+    lat = np.concatenate(([task["depot"][0]], task["lat"]))
+    lon = np.concatenate(([task["depot"][1]], task["lon"]))
+    dist = distance_matrix(lat, lon) * task["road_factor"]
+    minutes = dist / task["speed_kmh"] * 60
+    window_start = np.concatenate(([np.nan], task["window_start"]))
+    window_end = np.concatenate(([np.nan], task["window_end"]))
+    timed = not (np.isnan(window_start).all() and np.isnan(window_end).all())
+    window_start = np.nan_to_num(window_start, nan=-np.inf)
+    window_end = np.nan_to_num(window_end, nan=np.inf)
+    service = task["service_minutes"]
+
+    tour = _nearest_neighbour(minutes, window_start, window_end, service)
+    if timed:
+        tour = _relocate_late(tour, minutes, window_start, window_end, service)
+    if len(tour) > 4:
+        tour = _two_opt(tour, dist, minutes, window_start, window_end, service, timed)
+    eta = _simulate(tour[None], minutes, window_start, window_end, service)[0][0]
+    return {
+        "order": (tour[1:-1] - 1).tolist(),
+        "eta": eta[1:-1].tolist(),
+        "distance_km": float(dist[tour[:-1], tour[1:]].sum()),
+        "duration_minutes": float(eta[-1]),
+    }
+
+
+def deliverable_stops(db: Session, day: date) -> list[dict]:
+    """Заказы handed_to_courier с окном доставки в этот день (UTC) или без окна."""
+    start = datetime.combine(day, datetime.min.time())
+    rows = db.execute(
+        select(
+            Order.id, OrderDelivery.address, OrderDelivery.latitude, OrderDelivery.longitude,
+            OrderDelivery.window_start, OrderDelivery.window_end,
+        )
+        .outerjoin(OrderDelivery, OrderDelivery.order_id == Order.id)
+        .where(
+            Order.status == OrderStatus.handed_to_courier,
+            or_(
+                OrderDelivery.window_start.is_(None),
+                and_(OrderDelivery.window_start >= start, OrderDelivery.window_start < start + timedelta(days=1)),
+            ),
+        )
+        .order_by(Order.id)
+    ).all()
+    return [
+        {
+            "order_id": order_id, "address": address, "latitude": latitude, "longitude": longitude,
+            "window_start": window_start, "window_end": window_end,
+        }
+        for order_id, address, latitude, longitude, window_start, window_end in rows
+    ]
+
+
+def shift_start(day: date) -> datetime:
+    hours, minutes = settings.COURIER_SHIFT_START.split(":")
+    return datetime.combine(day, datetime.min.time()) + timedelta(hours=int(hours), minutes=int(minutes))
+
+
+class RoutePlanner:
+    """Планировщик с ленивым пулом процессов для независимых пачек."""
+
+    def __init__(self, workers: int, parallel_min_stops: int):
+        self.workers = workers
+        self.parallel_min_stops = parallel_min_stops
+        self._pool: ProcessPoolExecutor | None = None
+        self.plans = 0
+        self.stops = 0
+        self.busy_seconds = 0.0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Не fork: процесс сервера уже держит потоки (логирование, батчер,
+            # уведомления) и соединения пула БД
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._pool
+
+    def _solve(self, tasks: list[dict], stops: int) -> list[dict]:
+        if len(tasks) > 1 and self.workers > 1 and stops >= self.parallel_min_stops:
+            try:
+                chunksize = max(1, len(tasks) // (self.workers * 4))
+                return list(self._executor().map(solve_route, tasks, chunksize=chunksize))
+            except BrokenProcessPool:
+                logger.warning("Route planner pool is broken, solving in-process")
+                self._pool = None
+        return [solve_route(task) for task in tasks]
+
+    def plan(self, stops: list[dict], start_at: datetime, max_stops: int | None = None,
+             depot: tuple[float, float] | None = None) -> dict:
+        """
+        Маршруты курьеров для stops (как из deliverable_stops). Стопы без координат
+        возвращаются в unplanned; eta и опоздания считаются от start_at.
+        """
+        started = time.perf_counter()
+        depot = depot or (settings.COURIER_DEPOT_LAT, settings.COURIER_DEPOT_LON)
+        located = [stop for stop in stops if stop["latitude"] is not None and stop["longitude"] is not None]
+        unplanned = [stop["order_id"] for stop in stops if stop["latitude"] is None or stop["longitude"] is None]
+
+        def offsets(key):
+            return np.array([
+                (stop[key] - start_at).total_seconds() / 60 if stop[key] is not None else np.nan for stop in located
+            ], dtype=float)
+
+        lat = np.array([stop["latitude"] for stop in located], dtype=float)
+        lon = np.array([stop["longitude"] for stop in located], dtype=float)
+        window_start, window_end = offsets("window_start"), offsets("window_end")
+        clusters = sweep_clusters(lat, lon, depot, max_stops or settings.COURIER_MAX_STOPS)
+        tasks = [
+            {
+                "lat": lat[indexes], "lon": lon[indexes], "depot": depot,
+                "window_start": window_start[indexes], "window_end": window_end[indexes],
+                "speed_kmh": settings.COURIER_SPEED_KMH, "road_factor": settings.COURIER_ROAD_FACTOR,
+                "service_minutes": settings.COURIER_SERVICE_MINUTES,
+            }
+            for indexes in clusters
+        ]
+        routes = []
+        for courier, (indexes, result) in enumerate(zip(clusters, self._solve(tasks, len(located))), start=1):
+            route_stops = []
+            for position, eta_minutes in zip(result["order"], result["eta"]):
+                stop = located[indexes[position]]
+                eta = start_at + timedelta(minutes=eta_minutes)
+                late = (eta - stop["window_end"]).total_seconds() / 60 if stop["window_end"] else 0.0
+                route_stops.append({**stop, "eta": eta, "late_minutes": round(max(0.0, late), 1)})
+            routes.append({
+                "courier": courier,
+                "stops": route_stops,
+                "distance_km": round(result["distance_km"], 2),
+                "duration_minutes": round(result["duration_minutes"], 1),
+                "late_stops": sum(stop["late_minutes"] > 0 for stop in route_stops),
+            })
+        elapsed = time.perf_counter() - started
+        self.plans += 1
+        self.stops += len(located)
+        self.busy_seconds += elapsed
+        return {
+            "start_at": start_at,
+            "routes": routes,
+            "unplanned": unplanned,
+            "stops": len(located),
+            "distance_km": round(sum(route["distance_km"] for route in routes), 2),
+            "planning_ms": round(elapsed * 1000, 1),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "plans": self.plans,
+            "stops": self.stops,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+route_planner = RoutePlanner(
+    workers=settings.ROUTE_PLANNER_WORKERS,
+    parallel_min_stops=settings.ROUTE_PLANNER_PARALLEL_MIN_STOPS,
+)
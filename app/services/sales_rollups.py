@@ -0,0 +1,283 @@
+# app/services/sales_rollups.py
+# Инкрементальные агрегаты продаж (app.models.sales) для дашборда администратора.
+#
+# Каждый заказ лежит в агрегатах дня своего создания и текущего статуса. Смена
+# статуса — перенос: дельта «минус» в строку старого статуса и «плюс» в строку
+# нового, одним upsert на таблицу (x = x + excluded.x) в транзакции заказа.
+# Строка (сегодня, reserved) общая для всех резервирований, поэтому upsert
+# выполняется последним, в before_commit: её блокировка держится только на время
+# commit, а не всю транзакцию (FOR UPDATE товаров, вставка заказов, задачи).
+# - Заказы, созданные или изменённые через ORM (reserve_carts, order.status = ...),
+#   подхватывает событие after_flush.
+# - Массовый UPDATE (transition_orders) событий не порождает — там изменения
+#   передаются явно через queue_changes. Другие массовые UPDATE/INSERT заказов
+#   должны делать так же, иначе расхождение исправит только rebuild
+#   (scripts/rebuild_sales_rollups.py).
+# Деньги — Numeric, дельты считаются в Decimal: во float копейки расходились бы
+# после миллионов инкрементов.
+# Позиции заказа после создания не меняются, удалений нет — заказы отменяются.
+# Чтение дашборда — выборка по диапазону дней из агрегатов: её стоимость зависит
+# от длины окна, а не от того, сколько лет истории хранится в orders.
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, distinct, event, func, inspect, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import ProductDraft
+from app.models.sales import SalesCreatorDaily, SalesDaily, SalesProductDaily
+from app.models.user import User
+
+# Статусы, которые дашборд по умолчанию считает продажами
+SOLD_STATUSES = tuple(status for status in OrderStatus if status != OrderStatus.cancelled)
+
+
+def _money(value) -> Decimal:
+    # Через str: Decimal(0.1) дал бы двоичный хвост float
+    return Decimal(str(value or 0))
+
+
+def _insert_for(conn):
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+
+def _upsert(conn, table, keys: tuple[str, ...], columns: tuple[str, ...], deltas: dict) -> None:
+    # Строки в порядке ключа: параллельные транзакции блокируют их в одном порядке
+    rows = [
+        {**dict(zip(keys, key)), **dict(zip(columns, values))}
+        for key, values in sorted(deltas.items(), key=lambda item: (item[0][0], item[0][1].value, *item[0][2:]))
+        if any(values)
+    ]
+    if not rows:
+        return
+    stmt = _insert_for(conn)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: table.c[name] + stmt.excluded[name] for name in columns},
+    )
+    conn.execute(stmt, rows)
+
+
+def apply_changes(conn, changes: list[tuple]) -> None:
+    """
+    Применяет к агрегатам изменения заказов в текущей транзакции conn.
+    changes — (order_id, day, total, from_status, to_status); from_status=None —
+    новый заказ, to_status=None — заказ убирается из агрегатов.
+    Позиции заказов читаются одним SELECT.
+    """
+    changes = [change for change in changes if change[3] != change[4]]
+    if not changes:
+        return
+    items = defaultdict(list)
+    for row in conn.execute(
+        select(OrderItem.order_id, OrderItem.draft_id, OrderItem.quantity, OrderItem.price, ProductDraft.creator_id)
+        .join(ProductDraft, ProductDraft.id == OrderItem.draft_id)
+        .where(OrderItem.order_id.in_([change[0] for change in changes]))
+    ):
+        items[row.order_id].append(row)
+
+    daily = defaultdict(lambda: [0, Decimal(0), 0])
+    products = defaultdict(lambda: [0, Decimal(0)])
+    creators = defaultdict(lambda: [0, 0, Decimal(0)])
+    for order_id, day, total, from_status, to_status in changes:
+        lines = items.get(order_id, ())
+        units = sum(line.quantity or 0 for line in lines)
+        for sign, status in ((-1, from_status), (1, to_status)):
+            if status is None:
+                continue
+            status = OrderStatus(status)
+            entry = daily[(day, status)]
+            entry[0] += sign
+            entry[1] += sign * _money(total)
+            entry[2] += sign * units
+            for line in lines:
+                quantity = line.quantity or 0
+                revenue = sign * quantity * _money(line.price)
+                entry = products[(day, status, line.draft_id)]
+                entry[0] += sign * quantity
+                entry[1] += revenue
+                entry = creators[(day, status, line.creator_id)]
+                entry[1] += sign * quantity
+                entry[2] += revenue
+            for creator_id in {line.creator_id for line in lines}:
+                creators[(day, status, creator_id)][0] += sign
+
+    _upsert(conn, SalesDaily.__table__, ("day", "status"), ("orders", "revenue", "units"), daily)
+    _upsert(conn, SalesProductDaily.__table__, ("day", "status", "draft_id"), ("units", "revenue"), products)
+    _upsert(conn, SalesCreatorDaily.__table__, ("day", "status", "creator_id"), ("orders", "units", "revenue"),
+            creators)
+
+
+_PENDING_KEY = "sales_rollup_changes"
+
+
+def queue_changes(session: Session, changes: list[tuple]) -> None:
+    """
+    Откладывает apply_changes до commit session (формат changes — как у apply_changes).
+    Откат транзакции отбрасывает их; откат SAVEPOINT — нет, begin_nested вокруг
+    изменений заказов не используется.
+    """
+    if changes:
+        session.info.setdefault(_PENDING_KEY, []).extend(changes)
+
+
+@event.listens_for(Session, "after_flush")
+def _rollup_order_changes(session, flush_context):
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Order):
+            changes.append((obj.id, obj.created_at.date(), obj.total, None, obj.status))
+    for obj in session.dirty:
+        if isinstance(obj, Order):
+            history = inspect(obj).attrs.status.history
+            if history.deleted and history.added:
+                changes.append((obj.id, obj.created_at.date(), obj.total, history.deleted[0], history.added[0]))
+    queue_changes(session, changes)
+
+
+@event.listens_for(Session, "before_commit")
+def _apply_pending_changes(session):
+    if not session.info.get(_PENDING_KEY) and not session.new and not session.dirty:
+        return
+    # before_commit идёт до финального flush: сначала flush, чтобы его заказы тоже попали
+    session.flush()
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        apply_changes(session.connection(), changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# --- Пересчёт ---
+
+def rebuild(db: Session, date_from: date, date_to: date) -> dict:
+    """
+    Пересчитывает агрегаты за дни [date_from, date_to] из orders/order_items.
+    На Postgres до commit блокирует запись в orders (SHARE): иначе изменения
+    заказов, сделанные во время пересчёта, потерялись бы или посчитались дважды.
+    Commit делает вызывающий код.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE orders IN SHARE MODE"))
+    for model in (SalesDaily, SalesProductDaily, SalesCreatorDaily):
+        db.execute(delete(model).where(model.day >= date_from, model.day <= date_to))
+
+    day = func.date(Order.created_at)
+    in_range = (
+        Order.created_at >= datetime.combine(date_from, time.min),
+        Order.created_at < datetime.combine(date_to + timedelta(days=1), time.min),
+    )
+    order_units = (
+        select(OrderItem.order_id, func.sum(OrderItem.quantity).label("units"))
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(*in_range)
+        .group_by(OrderItem.order_id)
+        .subquery()
+    )
+    line_revenue = OrderItem.quantity * OrderItem.price
+    statements = (
+        insert(SalesDaily).from_select(
+            ["day", "status", "orders", "revenue", "units"],
+            select(day, Order.status, func.count(), func.coalesce(func.sum(Order.total), 0.0),
+                   func.coalesce(func.sum(order_units.c.units), 0))
+            .outerjoin(order_units, order_units.c.order_id == Order.id)
+            .where(*in_range)
+            .group_by(day, Order.status),
+        ),
+        insert(SalesProductDaily).from_select(
+            ["day", "status", "draft_id", "units", "revenue"],
+            select(day, Order.status, OrderItem.draft_id, func.sum(OrderItem.quantity), func.sum(line_revenue))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(*in_range)
+            .group_by(day, Order.status, OrderItem.draft_id),
+        ),
+        insert(SalesCreatorDaily).from_select(
+            ["day", "status", "creator_id", "orders", "units", "revenue"],
+            select(day, Order.status, ProductDraft.creator_id, func.count(distinct(Order.id)),
+                   func.sum(OrderItem.quantity), func.sum(line_revenue))
+            .join(Order, Order.id == OrderItem.order_id)
+            .join(ProductDraft, ProductDraft.id == OrderItem.draft_id)
+            .where(*in_range)
+            .group_by(day, Order.status, ProductDraft.creator_id),
+        ),
+    )
+    counts = {}
+    for model, stmt in zip((SalesDaily, SalesProductDaily, SalesCreatorDaily), statements):
+        counts[model.__tablename__] = db.execute(stmt).rowcount
+    return counts
+
+
+def order_days(db: Session) -> tuple[date, date] | None:
+    """Первый и последний день, за которые есть заказы."""
+    first, last = db.execute(select(func.min(Order.created_at), func.max(Order.created_at))).one()
+    if first is None:
+        return None
+    return first.date(), last.date()
+
+
+# --- Чтение для дашборда ---
+
+def dashboard(db: Session, date_from: date, date_to: date, statuses: tuple[OrderStatus, ...], limit: int) -> dict:
+    """Продажи по дням и статусам, итоги, лидеры среди товаров и авторов — только из агрегатов."""
+    days = db.execute(
+        select(SalesDaily.day, SalesDaily.status, SalesDaily.orders, SalesDaily.revenue, SalesDaily.units)
+        .where(SalesDaily.day >= date_from, SalesDaily.day <= date_to, SalesDaily.status.in_(statuses),
+               SalesDaily.orders != 0)
+        .order_by(SalesDaily.day, SalesDaily.status)
+    ).all()
+
+    product_totals = (
+        select(SalesProductDaily.draft_id, func.sum(SalesProductDaily.units).label("units"),
+               func.sum(SalesProductDaily.revenue).label("revenue"))
+        .where(SalesProductDaily.day >= date_from, SalesProductDaily.day <= date_to,
+               SalesProductDaily.status.in_(statuses))
+        .group_by(SalesProductDaily.draft_id)
+        .having(func.sum(SalesProductDaily.units) > 0)
+        .order_by(func.sum(SalesProductDaily.revenue).desc(), SalesProductDaily.draft_id)
+        .limit(limit)
+        .subquery()
+    )
+    top_products = db.execute(
+        select(product_totals.c.draft_id, ProductDraft.title, product_totals.c.units, product_totals.c.revenue)
+        .outerjoin(ProductDraft, ProductDraft.id == product_totals.c.draft_id)
+        .order_by(product_totals.c.revenue.desc(), product_totals.c.draft_id)
+    ).all()
+
+    creator_totals = (
+        select(SalesCreatorDaily.creator_id, func.sum(SalesCreatorDaily.orders).label("orders"),
+               func.sum(SalesCreatorDaily.units).label("units"), func.sum(SalesCreatorDaily.revenue).label("revenue"))
+        .where(SalesCreatorDaily.day >= date_from, SalesCreatorDaily.day <= date_to,
+               SalesCreatorDaily.status.in_(statuses))
+        .group_by(SalesCreatorDaily.creator_id)
+        .having(func.sum(SalesCreatorDaily.units) > 0)
+        .order_by(func.sum(SalesCreatorDaily.revenue).desc(), SalesCreatorDaily.creator_id)
+        .limit(limit)
+        .subquery()
+    )
+    top_creators = db.execute(
+        select(creator_totals.c.creator_id, User.full_name, creator_totals.c.orders, creator_totals.c.units,
+               creator_totals.c.revenue)
+        .outerjoin(User, User.id == creator_totals.c.creator_id)
+        .order_by(creator_totals.c.revenue.desc(), creator_totals.c.creator_id)
+    ).all()
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "statuses": list(statuses),
+        "orders": sum(row.orders for row in days),
+        "revenue": sum(row.revenue for row in days),
+        "units": sum(row.units for row in days),
+        "days": days,
+        "top_products": top_products,
+        "top_creators": top_creators,
+    }
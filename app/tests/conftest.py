@@ -0,0 +1,120 @@
+# app/tests/conftest.py
+# Общие фикстуры тестов.
+#
+# База — временная SQLite (TEST_DATABASE_URL, чтобы проверить на Postgres);
+# окружение задаётся до импорта app: Settings читаются при импорте.
+# Рабочий DATABASE_URL тесты никогда не используют — таблицы очищаются перед
+# каждым тестом.
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="phoenix_tests_")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite:///{_TMP}/test.db")
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["UPLOAD_DIR"] = os.path.join(_TMP, "uploads")
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["LOG_LEVEL"] = "WARNING"
+os.environ["JOB_WORKER_IN_APP"] = "false"
+os.environ["AUTH_CACHE_BROADCAST_FILE"] = ""
+os.environ["CATALOG_CACHE_BROADCAST_FILE"] = ""
+
+from contextlib import contextmanager
+from itertools import count
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from app.core.catalog_cache import feed_cache
+from app.core.principal_cache import principal_cache
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.profiler import profile_queries
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.models.product import ProductDraft
+from app.models.user import RoleEnum, User
+from app.services.channel_hub import channel_hub
+
+_phones = count(1)
+
+
+@pytest.fixture(scope="session")
+def _app_client():
+    with TestClient(app) as client:
+        yield client
+
+
+def _clear_tables() -> None:
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(delete(table))
+    principal_cache.clear()
+    feed_cache.invalidate(broadcast=False)
+    # SQLite после очистки снова выдаёт id постов с 1 — хаб живой ленты
+    # начинает с нуля, иначе он считает новые посты уже разосланными
+    channel_hub._last_id = 0
+    channel_hub._history.clear()
+
+
+@pytest.fixture
+def client(_app_client):
+    """TestClient с запущенным lifespan и пустой базой."""
+    _clear_tables()
+    yield _app_client
+
+
+@pytest.fixture
+def db(client):
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def make_user(db):
+    """make_user(role="client", phone=None) -> (user, headers с Bearer-токеном)."""
+    def factory(role: str = "client", phone: str | None = None, **fields):
+        user = User(phone=phone or f"+7900{next(_phones):07d}", role=RoleEnum(role), **fields)
+        db.add(user)
+        db.commit()
+        return user, {"Authorization": f"Bearer {create_access_token(subject=str(user.id))}"}
+
+    return factory
+
+
+@pytest.fixture
+def make_draft(db):
+    """make_draft(creator, quantity=..., price=...) -> опубликованный ProductDraft."""
+    def factory(creator: User, quantity: int = 10, price: float = 100.0, **fields):
+        fields.setdefault("title", f"Товар {next(_phones)}")
+        draft = ProductDraft(creator_id=creator.id, quantity=quantity, price=price, published=True, **fields)
+        db.add(draft)
+        db.commit()
+        return draft
+
+    return factory
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Бюджет SQL-запросов для эндпоинта:
+
+        def test_feed(client, query_budget):
+            with query_budget(3):
+                client.get("/api/products/feed")
+
+    Тест падает, если внутри блока выполнено больше max_queries запросов или
+    одна форма запроса повторилась max_repeats раз (N+1). Считаются запросы
+    из всех потоков: TestClient выполняет приложение в отдельном потоке.
+    """
+    @contextmanager
+    def budget(max_queries: int, max_repeats: int | None = None):
+        with profile_queries(process_wide=True) as profile:
+            yield profile
+        if profile.count > max_queries:
+            pytest.fail(f"Query budget exceeded: {profile.count} > {max_queries}\n{profile.report()}")
+        if max_repeats is not None and profile.repeated(max_repeats):
+            pytest.fail(f"Possible N+1: a query shape repeated {max_repeats}+ times\n{profile.report()}")
+
+    return budget
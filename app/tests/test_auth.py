@@ -0,0 +1,111 @@
+# app/tests/test_auth.py
+# Регистрация и логин: номер хранится и ищется в нормализованном виде;
+# переполненный пул bcrypt отвечает 429.
+import asyncio
+import threading
+
+import pytest
+
+from app.core import security
+from app.core.config import settings
+from app.core.password_pool import PasswordHasherPool, PasswordPoolBusy
+
+
+def test_register_stores_normalized_phone(client):
+    response = client.post("/api/auth/register", params={"phone": "8 (900) 123-45-67", "password": "secret"})
+    assert response.status_code == 200, response.text
+    assert response.json()["phone"] == "+79001234567"
+
+    # Тот же номер в другом написании — уже зарегистрирован
+    response = client.post("/api/auth/register", params={"phone": "+7 900 123 45 67", "password": "secret"})
+    assert response.status_code == 400
+
+
+def test_register_rejects_invalid_phone(client):
+    response = client.post("/api/auth/register", params={"phone": "12-34", "password": "secret"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid phone number"
+
+
+def test_login_normalizes_phone(client):
+    client.post("/api/auth/register", params={"phone": "+79001234567", "password": "secret"})
+    for username in ("8 900 123-45-67", "+79001234567", "9001234567"):
+        response = client.post("/api/auth/token", data={"username": username, "password": "secret"})
+        assert response.status_code == 200, username
+        assert response.json()["access_token"]
+
+    response = client.post("/api/auth/token", data={"username": "89001234567", "password": "wrong"})
+    assert response.status_code == 400
+
+
+def test_contact_lookup_finds_registered_users(client, make_user):
+    friend, _ = make_user(phone="+79001112233", full_name="Друг")
+    _, headers = make_user(phone="+79004445566")
+    response = client.post(
+        "/api/users/contacts/lookup",
+        json={"phones": ["8 (900) 111-22-33", "+7 900 111 22 33", "+79004445566", "555", "+79009999999"]},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["matches"] == [{
+        "id": friend.id, "phone": "+79001112233", "full_name": "Друг",
+        "numbers": ["8 (900) 111-22-33", "+7 900 111 22 33"],
+    }]
+    assert body["invalid"] == 1
+
+
+def test_contact_lookup_rejects_oversized_book(client, make_user):
+    _, headers = make_user()
+    phones = [f"+7900{i:07d}" for i in range(settings.CONTACT_SYNC_MAX_NUMBERS + 1)]
+    response = client.post("/api/users/contacts/lookup", json={"phones": phones}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_login_returns_429_when_password_pool_is_full(client, monkeypatch):
+    client.post("/api/auth/register", params={"phone": "+79001234567", "password": "secret"})
+    pool = PasswordHasherPool(workers=1, max_queue=0)
+    monkeypatch.setattr(security, "password_pool", pool)
+    assert pool._acquire()  # единственное место занято
+
+    response = client.post("/api/auth/token", data={"username": "+79001234567", "password": "secret"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    response = client.post("/api/auth/register", params={"phone": "+79007654321", "password": "secret"})
+    assert response.status_code == 429
+    assert pool.stats()["rejected"] == 2
+
+    pool._release()
+    response = client.post("/api/auth/token", data={"username": "+79001234567", "password": "secret"})
+    assert response.status_code == 200
+    pool.shutdown()
+
+
+def test_cancelled_request_keeps_slot_until_bcrypt_finishes():
+    pool = PasswordHasherPool(workers=1, max_queue=0)
+    started, finish = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        finish.wait(5)
+
+    async def scenario():
+        task = asyncio.create_task(pool.run(slow_hash))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Клиент ушёл, но поток ещё считает bcrypt — место не освобождено
+        with pytest.raises(PasswordPoolBusy):
+            await pool.run(lambda: None)
+        finish.set()
+        for _ in range(100):
+            if pool.stats()["completed"] == 1:
+                break
+            await asyncio.sleep(0.01)
+        await pool.run(lambda: None)
+
+    asyncio.run(scenario())
+    assert pool.stats()["completed"] == 2
+    assert pool.stats()["rejected"] == 1
+    pool.shutdown()
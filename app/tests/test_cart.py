@@ -0,0 +1,88 @@
+# app/tests/test_cart.py
+# Корзина: пакетный upsert, бюджет запросов, оформление без перепродажи.
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app.models.order import OrderItem, WaitlistEntry
+from app.models.product import ProductDraft
+from app.services.order_processing import reservation_batcher
+
+
+def _bulk(client, headers, items, mode="set"):
+    response = client.post("/api/cart/bulk", json={"items": items, "mode": mode}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_bulk_upsert(client, db, make_user, make_draft):
+    creator, _ = make_user("worker")
+    _, headers = make_user()
+    first, second, hidden = make_draft(creator, price=10.0), make_draft(creator, price=20.0), make_draft(creator)
+    hidden.published = False
+    db.commit()
+
+    cart = _bulk(client, headers, [{"draft_id": first.id, "quantity": 1}, {"draft_id": hidden.id, "quantity": 1}])
+    assert cart["skipped_draft_ids"] == [hidden.id]
+    # add: повтор в запросе суммируется и прибавляется к позиции в корзине
+    _bulk(client, headers, [{"draft_id": first.id, "quantity": 2}, {"draft_id": first.id, "quantity": 3},
+                            {"draft_id": second.id, "quantity": 1}], mode="add")
+    cart = client.get("/api/cart", headers=headers).json()
+    assert [(line["draft_id"], line["quantity"]) for line in cart["items"]] == [(first.id, 6), (second.id, 1)]
+    assert cart["subtotal"] == 80.0
+
+    cart = _bulk(client, headers, [{"draft_id": first.id, "quantity": 0}, {"draft_id": second.id, "quantity": 4}])
+    assert [(line["draft_id"], line["quantity"]) for line in cart["items"]] == [(second.id, 4)]
+
+
+def test_cart_query_budget(client, make_user, make_draft, query_budget):
+    creator, _ = make_user("worker")
+    _, headers = make_user()
+    items = [{"draft_id": make_draft(creator).id, "quantity": 1} for _ in range(20)]
+    client.get("/api/cart", headers=headers)  # пользователь попадает в кэш принципалов
+
+    # Проверка товаров, upsert, cart_view — независимо от числа позиций
+    with query_budget(3, max_repeats=2):
+        _bulk(client, headers, items)
+    with query_budget(1):
+        assert len(client.get("/api/cart", headers=headers).json()["items"]) == 20
+
+
+def test_concurrent_checkout_never_oversells(client, db, make_user, make_draft):
+    creator, _ = make_user("worker")
+    draft = make_draft(creator, quantity=5)
+    buyers = [make_user()[1] for _ in range(12)]
+    for headers in buyers:
+        _bulk(client, headers, [{"draft_id": draft.id, "quantity": 1}])
+
+    with ThreadPoolExecutor(len(buyers)) as pool:
+        responses = list(pool.map(lambda headers: client.post("/api/cart/checkout", headers=headers), buyers))
+
+    assert all(response.status_code == 200 for response in responses)
+    results = [response.json() for response in responses]
+    assert sum(result["order_id"] is not None for result in results) == 5
+    assert sum(len(result["waitlisted"]) for result in results) == 7
+    db.expire_all()
+    assert db.get(ProductDraft, draft.id).quantity == 0
+    assert db.scalar(select(func.sum(OrderItem.quantity)).where(OrderItem.draft_id == draft.id)) == 5
+    positions = db.execute(select(WaitlistEntry.position).order_by(WaitlistEntry.position)).scalars().all()
+    assert positions == list(range(1, 8))
+
+
+def test_checkout_maps_batch_errors(client, make_user, monkeypatch):
+    _, headers = make_user()
+
+    def unavailable(user_id, timeout=None):
+        raise OperationalError("SELECT 1", {}, Exception("server closed the connection"))
+
+    monkeypatch.setattr(reservation_batcher, "reserve", unavailable)
+    response = client.post("/api/cart/checkout", headers=headers)
+    assert response.status_code == 503 and response.headers["retry-after"] == "1"
+
+    def broken(user_id, timeout=None):
+        raise KeyError(user_id)
+
+    monkeypatch.setattr(reservation_batcher, "reserve", broken)
+    response = client.post("/api/cart/checkout", headers=headers)
+    assert response.status_code == 500 and response.json() == {"detail": "Reservation failed"}
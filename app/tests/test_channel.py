@@ -0,0 +1,21 @@
+# app/tests/test_channel.py
+# SSE-лента канала: подписка живёт ровно столько, сколько итерируется поток.
+from app.api.channel import stream
+from app.services.channel_hub import channel_hub
+
+
+def test_sse_subscription_opens_inside_stream(client):
+    subscribers = channel_hub.stats()["subscribers"]
+
+    async def scenario():
+        # Клиент ушёл до начала ответа: поток не итерировался, подписки нет
+        await stream(last_id=None, last_event_id=None)
+        assert channel_hub.stats()["subscribers"] == subscribers
+
+        response = await stream(last_id=None, last_event_id=None)
+        assert await response.body_iterator.__anext__() == b"retry: 3000\n\n"
+        assert channel_hub.stats()["subscribers"] == subscribers + 1
+        await response.body_iterator.aclose()
+        assert channel_hub.stats()["subscribers"] == subscribers
+
+    client.portal.call(scenario)
@@ -0,0 +1,92 @@
+# app/tests/test_compression.py
+# CompressionMiddleware: gzip от RESPONSE_COMPRESSION_MIN_BYTES, слабый ETag и 304
+# у сжатой ленты, Vary: Accept-Encoding; потоковые ответы, SSE и 206 — как есть.
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.models.product import ChannelPost
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def _large_feed(db, make_user, make_draft, count: int = 40) -> None:
+    creator, _ = make_user("worker")
+    posted_at = datetime(2026, 1, 1, 12, 0)
+    for i in range(count):
+        draft = make_draft(creator, title=f"Товар с длинным названием для ленты №{i}")
+        db.add(ChannelPost(draft_id=draft.id, posted_at=posted_at + timedelta(minutes=i)))
+    db.commit()
+
+
+def test_feed_is_gzipped_with_weak_etag(client, db, make_user, make_draft):
+    _large_feed(db, make_user, make_draft)
+
+    plain = client.get("/api/products/feed", params={"limit": 100}, headers={"Accept-Encoding": "identity"})
+    assert len(plain.content) >= settings.RESPONSE_COMPRESSION_MIN_BYTES
+    assert "content-encoding" not in plain.headers
+    strong = plain.headers["etag"]
+    assert not strong.startswith("W/")
+
+    response = client.get("/api/products/feed", params={"limit": 100}, headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.headers["etag"] == f"W/{strong}"
+    assert int(response.headers["content-length"]) < len(plain.content)
+    assert response.content == plain.content  # httpx распаковал тело
+
+    # Клиент возвращает слабый ETag сжатого ответа — лента его узнаёт
+    for etag in (response.headers["etag"], strong):
+        cached = client.get("/api/products/feed", params={"limit": 100}, headers={**GZIP, "If-None-Match": etag})
+        assert cached.status_code == 304
+        assert "content-encoding" not in cached.headers
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/health/live", headers=GZIP)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def _passthrough_client() -> TestClient:
+    app = FastAPI()
+    body = "x" * 2048
+
+    @app.get("/text")
+    def text():
+        return PlainTextResponse(body)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([body, body]), media_type="text/plain")
+
+    @app.get("/events")
+    def events():
+        return Response(f"data: {body}\n\n", media_type="text/event-stream")
+
+    @app.get("/partial")
+    def partial():
+        return PlainTextResponse(body, status_code=206, headers={"Content-Range": "bytes 0-2047/4096"})
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_streaming_sse_and_partial_pass_through():
+    client = _passthrough_client()
+    compressed = client.get("/text", headers=GZIP)
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.text == "x" * 2048
+
+    for path in ("/stream", "/events", "/partial"):
+        response = client.get(path, headers=GZIP)
+        assert "content-encoding" not in response.headers, path
+        assert "x" * 2048 in response.text
+
+    # Без Accept-Encoding — тело как есть
+    raw = client.get("/text", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
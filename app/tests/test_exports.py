@@ -0,0 +1,45 @@
+# app/tests/test_exports.py
+# Выгрузки для бухгалтерии: значения, похожие на формулу, экранируются;
+# фоновая выгрузка пишет файл через уникальный временный.
+import csv
+import io
+from datetime import datetime
+
+from app.core.config import settings
+from app.models.order import OrderStatus
+from app.services.exports import csv_chunks, exports_dir, write_export_file, xlsx_chunks
+
+COLUMNS = ("order_id", "status", "title", "price", "created_at")
+ROWS = [
+    (1, OrderStatus.reserved, '=HYPERLINK("http://evil")', -5.0, datetime(2026, 1, 1, 10, 0)),
+    (2, OrderStatus.cancelled, "+7 900", 10.0, None),
+    (3, OrderStatus.delivered, "@SUM(A1)", 0, None),
+    (4, OrderStatus.delivered, "\tcmd", 1, None),
+    (5, OrderStatus.delivered, "Чайник -20%", 1, None),
+]
+ESCAPED = ["'=HYPERLINK(\"http://evil\")", "'+7 900", "'@SUM(A1)", "'\tcmd", "Чайник -20%"]
+
+
+def test_csv_escapes_formulas():
+    text = b"".join(csv_chunks(COLUMNS, ROWS)).decode("utf-8-sig")
+    rows = list(csv.reader(io.StringIO(text), delimiter=settings.EXPORT_CSV_DELIMITER))
+    assert [row[2] for row in rows[1:]] == ESCAPED
+    assert rows[1][3] == "-5.0"  # числа не трогаем
+    assert rows[1][1] == "reserved"
+
+
+def test_xlsx_escapes_formulas():
+    from openpyxl import load_workbook
+
+    sheet = load_workbook(io.BytesIO(b"".join(xlsx_chunks(COLUMNS, ROWS)))).active
+    assert [row[2] for row in sheet.iter_rows(min_row=2, values_only=True)] == ESCAPED
+    assert sheet.cell(row=2, column=2).value == "reserved"
+    assert sheet.cell(row=2, column=4).value == -5.0
+
+
+def test_export_file_written_atomically(client):
+    payload = {"kind": "orders", "format": "csv", "file": "orders_test.csv"}
+    path = write_export_file(payload)
+    write_export_file(payload)
+    assert path.read_bytes().startswith(b"\xef\xbb\xbforder_id")
+    assert [item.name for item in exports_dir().iterdir() if item.name.startswith("orders_test")] == [path.name]
@@ -0,0 +1,144 @@
+# app/tests/test_file_storage.py
+# Загрузка и отдача файлов через API (локальный бэкенд): дедупликация, 415,
+# Range-запросы; S3-бэкенд против moto (без moto/boto3 тест пропускается).
+import asyncio
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services.file_storage import FileStorage, S3Backend, StorageBackend, file_storage, storage_key
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def _unique_png() -> bytes:
+    # Хранилище адресуется содержимым и не очищается между тестами
+    return PNG + os.urandom(16)
+
+
+def _stored_files() -> set:
+    return {path for path in file_storage.backend.root.rglob("*") if path.is_file()}
+
+
+def _upload(client, headers, content: bytes, **params):
+    return client.post("/api/files", params=params, files={"file": ("photo.png", content, "image/png")},
+                       headers=headers)
+
+
+@pytest.fixture
+def uploader(client, make_user, monkeypatch):
+    # Без фоновой генерации вариантов: заглушка PNG не картинка
+    monkeypatch.setattr(settings, "IMAGE_PREGENERATE_FORMATS", "")
+    return make_user("worker")
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    for name, value in (("AWS_ACCESS_KEY_ID", "test"), ("AWS_SECRET_ACCESS_KEY", "test"),
+                        ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        boto3.client("s3").create_bucket(Bucket="uploads")
+        yield boto3.client("s3")
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_s3_backend_roundtrip(s3, tmp_path):
+    backend = S3Backend("uploads", prefix="media/")
+    storage = FileStorage(backend, staging_dir=str(tmp_path / "staging"), max_bytes=1024)
+
+    async def chunks():
+        yield PNG[:10]
+        yield PNG[10:]
+
+    stored = asyncio.run(storage.save_stream(chunks()))
+    assert stored.key.startswith("cas/") and stored.content_type == "image/png"
+    assert not list((tmp_path / "staging").iterdir())
+    head = s3.head_object(Bucket="uploads", Key="media/" + stored.key)
+    assert head["ContentType"] == "image/png"
+    assert "immutable" in head["CacheControl"]
+
+    assert asyncio.run(storage.save_stream(chunks())).deduplicated
+    assert backend.local_path(stored.key) is None
+    assert "media/" + stored.key in backend.url(stored.key)
+    backend.download_to(stored.key, tmp_path / "copy.png")
+    assert (tmp_path / "copy.png").read_bytes() == PNG
+
+    backend.delete(stored.key)
+    assert not backend.exists(stored.key)
+    assert not backend.exists(storage_key("0" * 64, ".png"))
+
+
+def test_upload_and_deduplicate(client, db, uploader, make_draft):
+    user, headers = uploader
+    draft = make_draft(user)
+    content = _unique_png()
+
+    response = _upload(client, headers, content, draft_id=draft.id)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["content_type"] == "image/png" and body["size"] == len(content)
+    assert not body["deduplicated"]
+    assert (file_storage.backend.root / body["key"]).read_bytes() == content
+    db.refresh(draft)
+    assert draft.image_path == body["key"]
+
+    again = _upload(client, headers, content).json()
+    assert again["key"] == body["key"] and again["deduplicated"]
+
+
+def test_upload_rejects_unsupported_type(client, uploader):
+    _, headers = uploader
+    before = _stored_files()
+    response = client.post("/api/files", files={"file": ("notes.txt", b"just text", "text/plain")}, headers=headers)
+    assert response.status_code == 415
+    assert _stored_files() == before
+
+
+def test_upload_checks_draft_before_storing(client, uploader, make_user, make_draft):
+    _, headers = uploader
+    other, _ = make_user("worker")
+    foreign = make_draft(other)
+    before = _stored_files()
+
+    assert _upload(client, headers, _unique_png(), draft_id=foreign.id + 1000).status_code == 404
+    assert _upload(client, headers, _unique_png(), draft_id=foreign.id).status_code == 403
+    assert _stored_files() == before
+
+
+def test_download_ranges(client, uploader):
+    _, headers = uploader
+    content = _unique_png()
+    key = _upload(client, headers, content).json()["key"]
+    url = f"/api/files/{key}"
+
+    full = client.get(url)
+    assert full.status_code == 200 and full.content == content
+    etag = full.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    part = client.get(url, headers={"Range": "bytes=2-9"})
+    assert part.status_code == 206
+    assert part.content == content[2:10]
+    assert part.headers["content-range"] == f"bytes 2-9/{len(content)}"
+
+    tail = client.get(url, headers={"Range": "bytes=-5"})
+    assert tail.status_code == 206 and tail.content == content[-5:]
+
+    beyond = client.get(url, headers={"Range": f"bytes={len(content)}-"})
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == f"bytes */{len(content)}"
+
+    # If-Range с другим ETag — файл изменился, отдаём его целиком
+    stale = client.get(url, headers={"Range": "bytes=2-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200 and stale.content == content
+    fresh = client.get(url, headers={"Range": "bytes=2-9", "If-Range": etag})
+    assert fresh.status_code == 206
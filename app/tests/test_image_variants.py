@@ -0,0 +1,31 @@
+# app/tests/test_image_variants.py
+# Кэш вариантов изображений: бюджет по реальному размеру каталога.
+import os
+
+from app.services.image_variants import VariantCache
+
+
+def _write(root, name, size):
+    path = root / name[:2] / f"{name}_thumb.webp"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_budget_counts_files_of_other_workers(tmp_path):
+    first = VariantCache(str(tmp_path), max_bytes=250, sizes={"thumb": 64}, rescan_seconds=0)
+    second = VariantCache(str(tmp_path), max_bytes=250, sizes={"thumb": 64}, rescan_seconds=0)
+    first._load_index()
+    second._load_index()
+    for i, name in enumerate(("aa01", "aa02")):
+        path = _write(tmp_path, name, 100)
+        os.utime(path, (1000 + i, 1000 + i))
+        first._add(path, 100)
+    newest = _write(tmp_path, "bb03", 100)
+    second._add(newest, 100)
+    assert len(list(tmp_path.glob("*/*"))) == 3  # каждый воркер видит только свои 100–200 байт
+
+    # После пересканирования второй воркер видит общий размер и вытесняет самый старый
+    second._load_index()
+    assert sorted(path.name for path in tmp_path.glob("*/*")) == ["aa02_thumb.webp", "bb03_thumb.webp"]
+    assert second._total == 200
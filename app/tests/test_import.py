@@ -0,0 +1,95 @@
+# app/tests/test_import.py
+# Импорт каталога: upsert по (creator_id, sku), отклонение невалидных строк
+# (в том числе дробного количества) и продолжение с checkpoint без повторов.
+import importlib.util
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select
+
+from app.crud.product_crud import bulk_upsert_drafts
+from app.db.session import engine
+from app.models.product import ProductDraft
+
+_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "import_from_excel.py"
+_spec = importlib.util.spec_from_file_location("import_from_excel", _SCRIPT)
+importer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(importer)
+
+
+def _row(creator_id: int, sku: str, price: float = 100.0, quantity: int = 1, **fields) -> dict:
+    return {"creator_id": creator_id, "sku": sku, "title": f"Товар {sku}", "description": None,
+            "price": price, "quantity": quantity, "image_path": None, **fields}
+
+
+def _drafts(db, creator_id: int) -> dict:
+    db.expire_all()
+    return {
+        draft.sku: draft
+        for draft in db.execute(select(ProductDraft).where(ProductDraft.creator_id == creator_id)).scalars()
+    }
+
+
+def test_bulk_upsert_inserts_new_and_updates_existing_sku(db, make_user):
+    creator, _ = make_user("worker")
+    with engine.begin() as connection:
+        assert bulk_upsert_drafts(connection, [_row(creator.id, "A"), _row(creator.id, "B")]) == 2
+    first = _drafts(db, creator.id)
+
+    with engine.begin() as connection:
+        bulk_upsert_drafts(connection, [_row(creator.id, "A", price=150.0, quantity=7), _row(creator.id, "C")])
+    drafts = _drafts(db, creator.id)
+    assert sorted(drafts) == ["A", "B", "C"]
+    assert drafts["A"].id == first["A"].id
+    assert (drafts["A"].price, drafts["A"].quantity) == (150.0, 7)
+    assert drafts["B"].price == 100.0
+
+
+def test_fractional_quantity_is_rejected():
+    positions = {"sku": 0, "title": 1, "price": 2, "quantity": 3}
+    with pytest.raises(importer.RowError):
+        importer.validate_row(["A", "Чайник", "100", "2.7"], positions, creator_id=1)
+    assert importer.validate_row(["A", "Чайник", "100", "3,0"], positions, creator_id=1)["quantity"] == 3
+    assert importer.validate_row(["A", "Чайник", 100, 5.0], positions, creator_id=1)["quantity"] == 5
+    assert importer.validate_row(["A", "Чайник", 100, None], positions, creator_id=1)["quantity"] == 1
+
+
+def test_import_resumes_from_checkpoint(db, make_user, tmp_path, monkeypatch):
+    creator, _ = make_user("worker")
+    source = tmp_path / "catalog.csv"
+    source.write_text(
+        "Артикул;Название;Цена;Остаток\n"
+        "A;Чайник;100;1\n"
+        "B;Кружка;50;2.7\n"      # дробное количество
+        "C;Ложка;10;5\n"
+        "D;Вилка;10;5\n"
+        ";Без артикула;10;1\n"
+        "E;Нож;abc;1\n"          # цена не число
+        "F;Тарелка;30;2\n",
+        encoding="utf-8",
+    )
+    args = Namespace(file=str(source), creator_id=creator.id, sheet=None, batch_size=2, checkpoint=None,
+                     resume=False, max_reported_errors=50)
+
+    write_batch, calls = importer.write_batch, []
+
+    def crash_on_second_batch(*batch_args):
+        calls.append(batch_args)
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        write_batch(*batch_args)
+
+    monkeypatch.setattr(importer, "write_batch", crash_on_second_batch)
+    with pytest.raises(RuntimeError):
+        importer.run(args)
+    monkeypatch.setattr(importer, "write_batch", write_batch)
+    assert sorted(_drafts(db, creator.id)) == ["A", "C"]
+
+    args.resume = True
+    state = importer.run(args)
+    assert state["imported"] == 4
+    # Строка B отклонена до checkpoint и при продолжении не считается повторно
+    assert state["invalid"] == 3
+    assert state["rows_done"] == 7
+    assert sorted(_drafts(db, creator.id)) == ["A", "C", "D", "F"]
@@ -0,0 +1,77 @@
+# app/tests/test_job_queue.py
+# Очередь задач: аренда продлевается перед каждой задачей пачки, итог пишет
+# только воркер, который держит задачу; долгие задачи продлевают её в фоне.
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.db.session import SessionLocal
+from app.models.job import Job, JobStatus
+from app.services import job_queue
+from app.services.job_queue import JobWorker, claim_jobs
+
+calls = []
+
+
+@job_queue.register("test_record")
+def _record(payload: dict) -> None:
+    calls.append(payload["n"])
+
+
+def _expire_leases(db):
+    db.execute(update(Job).values(locked_at=datetime.utcnow() - timedelta(hours=1)))
+    db.commit()
+
+
+def test_reclaimed_job_is_not_run_twice(db):
+    calls.clear()
+    job_queue.enqueue(db, "test_record", [{"n": 1}, {"n": 2}])
+    db.commit()
+    stale, fresh = JobWorker(visibility_timeout=60), JobWorker(visibility_timeout=60)
+    jobs = claim_jobs(db, stale.worker_id, 10, stale.visibility_timeout)
+    stale._run_job(db, jobs[0])
+
+    # Пачка отставшего воркера шла дольше visibility_timeout: вторую задачу забрал другой
+    _expire_leases(db)
+    assert [job.id for job in claim_jobs(db, fresh.worker_id, 10, 60)] == [jobs[1].id]
+    stale._run_job(db, jobs[1])
+    assert calls == [1]
+    assert fresh.run_once() == 0  # задача у fresh, ещё не истекла
+    db.expire_all()
+    assert db.get(Job, jobs[1].id).locked_by == fresh.worker_id
+
+
+def test_lost_lease_does_not_overwrite_new_owner(db, monkeypatch):
+    job_queue.enqueue(db, "test_record", [{"n": 3}])
+    db.commit()
+    stale, fresh = JobWorker(visibility_timeout=60), JobWorker(visibility_timeout=60)
+    [job] = claim_jobs(db, stale.worker_id, 10, 60)
+
+    def reclaimed_while_running(payload):
+        _expire_leases(db)
+        claim_jobs(db, fresh.worker_id, 10, 60)
+
+    monkeypatch.setitem(job_queue._handlers, "test_record", reclaimed_while_running)
+    stale._run_job(db, job)
+    db.expire_all()
+    row = db.get(Job, job.id)
+    assert (row.status, row.locked_by) == (JobStatus.running, fresh.worker_id)
+    assert stale.processed == 0
+
+
+def test_heartbeat_keeps_long_job_leased(db, monkeypatch):
+    worker = JobWorker(visibility_timeout=0.3)
+    reclaimed = []
+
+    def long_job(payload):
+        time.sleep(0.6)
+        with SessionLocal() as other:
+            reclaimed.extend(claim_jobs(other, "other-worker", 10, worker.visibility_timeout))
+
+    monkeypatch.setitem(job_queue._handlers, "test_long", long_job)
+    monkeypatch.setattr(job_queue, "_heartbeat_kinds", {"test_long"})
+    job_queue.enqueue(db, "test_long", [{}])
+    db.commit()
+    assert worker.run_once() == 1
+    assert reclaimed == [] and worker.processed == 1
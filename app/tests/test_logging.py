@@ -0,0 +1,105 @@
+# app/tests/test_logging.py
+# DeferredQueueHandler: сообщение фиксируется в потоке вызова, traceback — строкой;
+# RequestTimingMiddleware: X-Request-ID, ключи по шаблонам маршрутов, сэмплирование.
+import logging
+import queue
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.core import logging as app_logging
+from app.core.logging import DeferredQueueHandler, RequestTimingMiddleware
+
+
+def test_record_is_rendered_before_enqueue():
+    handler = DeferredQueueHandler(queue.Queue())
+    logger = logging.getLogger("test_deferred_queue_handler")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        cart = {"items": 1}
+        logger.warning("cart %s", cart)
+        cart["items"] = 2
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("failed")
+    finally:
+        logger.removeHandler(handler)
+
+    first, second = handler.queue.get_nowait(), handler.queue.get_nowait()
+    assert first.msg == "cart {'items': 1}" and first.args is None
+    assert second.exc_info is None and "ValueError: boom" in second.exc_text
+    assert "ValueError: boom" in logging.Formatter("%(message)s").format(second)
+
+
+def test_json_format_without_python_json_logger_warns(monkeypatch):
+    monkeypatch.setattr(app_logging, "jsonlogger", None)
+    with pytest.warns(UserWarning, match="python-json-logger"):
+        formatter = app_logging._build_formatter("json")
+    assert type(formatter) is logging.Formatter
+
+
+def _timing_client(**options) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/timing-test/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/timing-test-error")
+    def error():
+        return JSONResponse({"detail": "boom"}, status_code=500)
+
+    app.add_middleware(RequestTimingMiddleware, **options)
+    return TestClient(app)
+
+
+@pytest.fixture
+def access_records():
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    app_logging.access_logger.addHandler(handler)
+    level = app_logging.access_logger.level
+    app_logging.access_logger.setLevel(logging.INFO)
+    yield records
+    app_logging.access_logger.removeHandler(handler)
+    app_logging.access_logger.setLevel(level)
+
+
+def test_request_id_passthrough_and_validation():
+    client = _timing_client()
+    assert client.get("/timing-test/1", headers={"X-Request-ID": "abc-123.x_y"}).headers["x-request-id"] == "abc-123.x_y"
+    for bad in ("has space", "x" * 65, "a/b<script>"):
+        generated = client.get("/timing-test/1", headers={"X-Request-ID": bad}).headers["x-request-id"]
+        assert generated != bad and len(generated) == 16
+    assert len(client.get("/timing-test/1").headers["x-request-id"]) == 16
+
+
+def test_timings_are_keyed_by_route_template():
+    client = _timing_client()
+    for item_id in (1, 2, 3):
+        client.get(f"/timing-test/{item_id}")
+    client.get("/timing-test-missing")
+    stats = {(entry["method"], entry["route"]): entry for entry in app_logging.route_timings.stats()}
+    assert stats[("GET", "/timing-test/{item_id}")]["count"] >= 3
+    assert not any(route.startswith("/timing-test/1") for _, route in stats)
+    assert ("GET", "<unmatched>") in stats
+
+
+def test_sampling_keeps_errors_and_slow_requests(access_records):
+    client = _timing_client(sample_rate=0.0, slow_ms=60_000)
+    client.get("/timing-test/1")
+    client.get("/timing-test-error")
+    assert [record.status for record in access_records] == [500]
+    assert access_records[0].levelno == logging.WARNING and not access_records[0].sampled
+
+    access_records.clear()
+    client = _timing_client(sample_rate=0.0, slow_ms=0)
+    client.get("/timing-test/1")
+    assert [(record.status, record.route, record.sampled) for record in access_records] == [
+        (200, "/timing-test/{item_id}", False)
+    ]
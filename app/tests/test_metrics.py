@@ -0,0 +1,77 @@
+# app/tests/test_metrics.py
+# /metrics: HTTP-латентность по шаблону маршрута, гауги пула БД и bcrypt,
+# счётчики SQL; сумма по воркерам в режиме PROMETHEUS_MULTIPROC_DIR.
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from app import main
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _samples(text: str) -> dict:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+def test_metrics_endpoint(client, make_user, make_draft):
+    creator, _ = make_user("worker")
+    make_draft(creator)
+    for _ in range(2):
+        assert client.get("/api/products/search", params={"q": "товар"}).status_code == 200
+    main.metrics_sampler.sample()
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    samples = _samples(response.text)
+
+    route = (("method", "GET"), ("route", "/api/products/search"))
+    assert samples[("http_request_duration_seconds_count", route)] >= 2
+    assert samples[("http_requests_total", (*route, ("status", "200")))] >= 2
+    # Конкретные пути в метки не попадают — только шаблоны
+    assert not any(dict(labels).get("route", "").startswith("/api/products/search?") for _, labels in samples)
+    assert samples[("db_queries_total", (("operation", "SELECT"),))] > 0
+    assert samples[("db_pool_checkouts_total", (("pool", "primary"),))] > 0
+    assert ("db_pool_checked_out", (("pool", "primary"),)) in samples
+    assert samples[("bcrypt_pool_workers", ())] == main.password_pool.workers
+    assert ("bcrypt_pool_running", ()) in samples and ("bcrypt_pool_queued", ()) in samples
+
+
+_WORKER = """
+from app.core.metrics import DB_QUERIES, BCRYPT_WORKERS
+DB_QUERIES.labels("SELECT").inc({count})
+BCRYPT_WORKERS.set(2)
+"""
+
+_RENDER = """
+import sys
+from app.core.metrics import MULTIPROCESS, render_metrics
+assert MULTIPROCESS
+sys.stdout.write(render_metrics()[0].decode())
+"""
+
+
+def test_render_metrics_sums_worker_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    def run(code: str) -> str:
+        result = subprocess.run([sys.executable, "-c", code], cwd=_PROJECT_ROOT, env=env,
+                                capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    # Два «воркера» пишут свои значения в mmap-файлы, третий процесс их суммирует
+    run(_WORKER.format(count=3))
+    run(_WORKER.format(count=4))
+    samples = _samples(run(_RENDER))
+    assert samples[("db_queries_total", (("operation", "SELECT"),))] == 7
+    # livesum: гауги процессов складываются
+    assert samples[("bcrypt_pool_workers", ())] == 4
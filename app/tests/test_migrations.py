@@ -0,0 +1,56 @@
+# app/tests/test_migrations.py
+# Миграции alembic: цепочка доходит до схемы моделей, проверка ревизии на старте.
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+
+from app.core.config import settings
+from app.db.base import Base
+from app.db.health import PROJECT_ROOT, alembic_heads, check_alembic_revision
+
+
+def _upgrade(monkeypatch, url: str) -> None:
+    # Без alembic.ini: его fileConfig перенастроил бы логирование тестов
+    config = Config()
+    config.set_main_option("script_location", str(PROJECT_ROOT / "alembic"))
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    command.upgrade(config, "head")
+
+
+def _model_object(obj, name, type_, reflected, compare_to):
+    # FTS5-таблицы поиска создаются DDL и в моделях не описаны
+    return not (type_ == "table" and name.startswith("product_drafts_fts"))
+
+
+def test_upgrade_head_matches_models(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path}/migrated.db"
+    _upgrade(monkeypatch, url)
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            context = MigrationContext.configure(conn, opts={"include_object": _model_object})
+            assert compare_metadata(context, Base.metadata) == []
+        assert check_alembic_revision(engine) == (True, f"revision {', '.join(sorted(alembic_heads()))}")
+    finally:
+        engine.dispose()
+
+
+def test_revision_check_fails_on_unmigrated_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/empty.db")
+    try:
+        ok, message = check_alembic_revision(engine)
+    finally:
+        engine.dispose()
+    assert not ok and "alembic upgrade head" in message
+
+
+def test_readiness_is_503_until_schema_is_ready(client, monkeypatch):
+    from app import main
+
+    assert client.get("/health/ready").status_code == 200
+    # Так lifespan оставляет воркер, если init_database() вернул False (не production)
+    monkeypatch.setitem(main.startup_info, "ready", False)
+    response = client.get("/health/ready")
+    assert response.status_code == 503 and response.json()["status"] == "not_ready"
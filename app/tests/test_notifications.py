@@ -0,0 +1,51 @@
+# app/tests/test_notifications.py
+# Переполнение очереди уведомлений: метрики и продолжение рассылки без дублей.
+import json
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import select
+
+from app.models.job import Job
+from app.services import job_queue
+from app.services.notifications import NotificationDispatcher, NotificationTransport
+
+
+def _metric(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+def test_transport_is_abstract():
+    with pytest.raises(TypeError):
+        NotificationTransport()
+
+
+def test_dropped_notifications_are_counted():
+    dispatcher = NotificationDispatcher(max_queue=1)
+    dropped, depth = _metric("notifications_dropped_total"), _metric("notifications_queue_depth")
+    assert dispatcher.notify(1, "test", "first")
+    assert not dispatcher.notify(2, "test", "second")
+    assert not dispatcher.notify(3, "test", "third", block=True, timeout=0.01)
+    assert dispatcher.stats()["dropped"] == 2
+    assert _metric("notifications_dropped_total") - dropped == 2
+    assert _metric("notifications_queue_depth") - depth == 1
+    dispatcher._drain()
+    assert _metric("notifications_queue_depth") == depth
+
+
+def test_channel_fan_out_resumes_after_drop(db, make_user, monkeypatch):
+    users = [make_user()[0] for _ in range(3)]
+    dispatcher = NotificationDispatcher(max_queue=2)
+    monkeypatch.setattr(job_queue, "notification_dispatcher", dispatcher)
+    monkeypatch.setattr(dispatcher._space, "wait_for", lambda predicate, timeout: predicate())
+    payload = {"post_id": 7, "draft_id": 1, "title": "Чайник"}
+
+    job_queue._handlers["channel_post_published"](payload)
+
+    assert [item["user_id"] for item in dispatcher._drain()] == [users[0].id, users[1].id]
+    job = db.execute(select(Job).where(Job.kind == "channel_post_published")).scalar_one()
+    resumed = json.loads(job.payload)
+    assert resumed["after_user_id"] == users[2].id - 1
+
+    job_queue._handlers["channel_post_published"](resumed)
+    assert [item["user_id"] for item in dispatcher._drain()] == [users[2].id]
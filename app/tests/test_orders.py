@@ -0,0 +1,119 @@
+# app/tests/test_orders.py
+# Смена статусов заказов: допустимые переходы, возврат остатка при отмене и лист ожидания.
+from sqlalchemy import select
+
+from app.models.order import Order, OrderStatus, WaitlistEntry
+from app.models.product import ProductDraft
+from app.services.order_processing import promote_after_restock
+
+
+def _checkout(client, headers, draft_id, quantity):
+    client.post("/api/cart/bulk", json={"items": [{"draft_id": draft_id, "quantity": quantity}]}, headers=headers)
+    response = client.post("/api/cart/checkout", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _stock(db, draft_id):
+    db.expire_all()
+    return db.get(ProductDraft, draft_id).quantity
+
+
+def test_cancel_returns_stock(client, db, make_user, make_draft):
+    admin, admin_headers = make_user("admin")
+    _, headers = make_user()
+    draft = make_draft(admin, quantity=5)
+    order_id = _checkout(client, headers, draft.id, 2)["order_id"]
+    assert _stock(db, draft.id) == 3
+
+    response = client.post(
+        "/api/admin/orders/transition",
+        json={"order_ids": [order_id], "to_status": "cancelled"},
+        headers=admin_headers,
+    )
+    assert response.json()["updated"] == [order_id]
+    assert _stock(db, draft.id) == 5
+
+    # Повторная отмена не проходит условие по статусу и второй раз не возвращает
+    response = client.post(
+        "/api/admin/orders/transition",
+        json={"order_ids": [order_id], "to_status": "cancelled"},
+        headers=admin_headers,
+    )
+    assert response.json()["rejected"][0]["reason"] == "invalid_transition"
+    assert _stock(db, draft.id) == 5
+
+
+def test_cancel_promotes_waitlist_in_order(client, db, make_user, make_draft):
+    admin, admin_headers = make_user("admin")
+    buyer, buyer_headers = make_user()
+    first, first_headers = make_user()
+    second, second_headers = make_user()
+    draft = make_draft(admin, quantity=3)
+    order_id = _checkout(client, buyer_headers, draft.id, 3)["order_id"]
+    assert _checkout(client, first_headers, draft.id, 2)["waitlisted"][0]["position"] == 1
+    assert _checkout(client, second_headers, draft.id, 2)["waitlisted"][0]["position"] == 2
+
+    response = client.post(
+        "/api/admin/orders/transition",
+        json={"order_ids": [order_id], "to_status": "cancelled"},
+        headers=admin_headers,
+    )
+    promoted = response.json()["promoted"]
+    assert len(promoted) == 1
+    # Первый в очереди получил заказ, второму остатка (1 шт.) не хватило — ждёт дальше
+    order = db.get(Order, promoted[0])
+    assert order.user_id == first.id and order.status == OrderStatus.reserved
+    assert [(item.draft_id, item.quantity) for item in order.items] == [(draft.id, 2)]
+    assert _stock(db, draft.id) == 1
+    assert db.execute(select(WaitlistEntry.user_id)).scalars().all() == [second.id]
+
+
+def test_transition_guards(client, db, make_user, make_draft):
+    admin, admin_headers = make_user("admin")
+    _, worker_headers = make_user("worker")
+    _, headers = make_user()
+    draft = make_draft(admin, quantity=5)
+    order_id = _checkout(client, headers, draft.id, 1)["order_id"]
+
+    def transition(order_ids, to_status, as_headers=worker_headers):
+        return client.post(
+            "/api/admin/orders/transition", json={"order_ids": order_ids, "to_status": to_status}, headers=as_headers,
+        )
+
+    assert transition([order_id], "processing", headers).status_code == 403
+    # Шаг через статус не проходит, несуществующий заказ — not_found
+    result = transition([order_id, 999999], "delivered").json()
+    assert result["updated"] == []
+    assert {(item["order_id"], item["reason"], item["status"]) for item in result["rejected"]} == {
+        (order_id, "invalid_transition", "reserved"), (999999, "not_found", None),
+    }
+    for status in ("processing", "processed", "handed_to_courier"):
+        assert transition([order_id], status).json()["updated"] == [order_id]
+    # Переданный курьеру заказ уже не отменить: остаток не возвращается
+    assert transition([order_id], "cancelled").json()["rejected"][0]["reason"] == "invalid_transition"
+    db.expire_all()
+    assert db.get(Order, order_id).status == OrderStatus.handed_to_courier
+    assert _stock(db, draft.id) == 4
+
+
+def test_restock_goes_to_waitlist_first(client, db, make_user, make_draft):
+    admin, _ = make_user("admin")
+    _, buyer_headers = make_user()
+    first, first_headers = make_user()
+    _, late_headers = make_user()
+    draft = make_draft(admin, quantity=1, sku="KETTLE-1")
+    _checkout(client, buyer_headers, draft.id, 1)
+    assert _checkout(client, first_headers, draft.id, 1)["waitlisted"][0]["position"] == 1
+
+    # Остаток пополнен в обход заказов: новый покупатель не обгоняет очередь
+    assert _stock(db, draft.id) == 0
+    draft.quantity = 1
+    db.commit()
+    assert _checkout(client, late_headers, draft.id, 1)["waitlisted"][0]["position"] == 2
+
+    promoted = promote_after_restock(db, admin.id, ["KETTLE-1"])
+    db.commit()
+    assert [order["user_id"] for order in promoted] == [first.id]
+    assert _stock(db, draft.id) == 0
+    assert len(db.execute(select(WaitlistEntry)).scalars().all()) == 1
@@ -0,0 +1,89 @@
+# app/tests/test_principal_cache.py
+# Кэш пользователей get_current_user: сброс после commit смены роли/блокировки,
+# TTL, LRU-ограничение и инвалидация соседних воркеров через журнал.
+import time
+
+from app.core.principal_cache import PrincipalCache, principal_cache
+from app.models.user import RoleEnum
+
+
+def _principal(user_id: int) -> dict:
+    return {"id": user_id, "role": "client"}
+
+
+def test_role_change_applies_after_commit(client, db, make_user):
+    user, headers = make_user()
+    assert client.get("/api/admin/jobs/stats", headers=headers).status_code == 403
+    token = headers["Authorization"].removeprefix("Bearer ")
+    assert principal_cache.get(user.id, token)["role"] == RoleEnum.client
+
+    user.role = RoleEnum.admin
+    db.flush()
+    # До commit изменения не видны другим запросам — кэш ещё не сброшен
+    assert principal_cache.get(user.id, token) is not None
+    db.commit()
+    assert principal_cache.get(user.id, token) is None
+    assert client.get("/api/admin/jobs/stats", headers=headers).status_code == 200
+
+
+def test_blacklist_applies_after_commit(client, db, make_user):
+    user, headers = make_user("admin")
+    assert client.get("/api/admin/jobs/stats", headers=headers).status_code == 200
+
+    user.blacklisted = True
+    db.commit()
+    response = client.get("/api/admin/jobs/stats", headers=headers)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "User is blacklisted"
+
+
+def test_rollback_keeps_cached_principal(client, db, make_user):
+    user, headers = make_user()
+    client.get("/api/admin/jobs/stats", headers=headers)
+    token = headers["Authorization"].removeprefix("Bearer ")
+
+    user.role = RoleEnum.admin
+    db.flush()
+    db.rollback()
+    assert principal_cache.get(user.id, token) is not None
+
+
+def test_entries_expire_after_ttl():
+    cache = PrincipalCache(max_size=10, ttl_seconds=0.05)
+    cache.set(1, "token", _principal(1))
+    assert cache.get(1, "token") == _principal(1)
+    time.sleep(0.1)
+    assert cache.get(1, "token") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PrincipalCache(max_size=2, ttl_seconds=30)
+    cache.set(1, "a", _principal(1))
+    cache.set(2, "b", _principal(2))
+    assert cache.get(1, "a") is not None  # 1 теперь свежее 2
+    cache.set(3, "c", _principal(3))
+
+    assert cache.get(2, "b") is None
+    assert cache.get(1, "a") is not None and cache.get(3, "c") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_invalidation_reaches_other_worker(tmp_path):
+    path = str(tmp_path / "auth-cache.log")
+    first = PrincipalCache(max_size=10, ttl_seconds=30, broadcast_path=path)
+    second = PrincipalCache(max_size=10, ttl_seconds=30, broadcast_path=path)
+    for cache in (first, second):
+        cache.set(1, "a", _principal(1))
+        cache.set(2, "b", _principal(2))
+
+    first.invalidate_user(1)
+    assert second.get(1, "a") is None
+    assert second.get(2, "b") is not None
+    # Своя запись из журнала лишь повторно сбрасывает того же пользователя
+    assert first.get(2, "b") is not None
+
+    # Усечённый журнал — соседний воркер очищает кэш целиком
+    open(path, "w").close()
+    assert second.get(2, "b") is None
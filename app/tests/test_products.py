@@ -0,0 +1,152 @@
+# app/tests/test_products.py
+# Лента каталога: keyset-пагинация, ETag/304, кэш первой страницы и его сброс;
+# лента и корзина через AsyncSession (DB_ASYNC_ENABLED); поиск по каталогу.
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core import security
+from app.core.catalog_cache import FeedPageCache, feed_cache
+from app.db.session import DATABASE_URL, to_async_url
+from app.models.product import ChannelPost
+from app.services.channel_hub import channel_hub
+
+
+def _publish(db, drafts, posted_at=None):
+    posted_at = posted_at or datetime(2026, 1, 1, 12, 0)
+    posts = []
+    for i, draft in enumerate(drafts):
+        post = ChannelPost(draft_id=draft.id, posted_at=posted_at + timedelta(minutes=i // 2))
+        db.add(post)
+        posts.append(post)
+    db.commit()
+    # Хаб живой ленты после commit сам дочитывает новые посты; ждём его, чтобы
+    # его запросы не попали в бюджет запросов теста
+    deadline = time.monotonic() + 2
+    while channel_hub.stats()["last_post_id"] < posts[-1].id and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return posts
+
+
+def test_feed_keyset_pages(client, db, make_user, make_draft):
+    creator, _ = make_user("worker")
+    # Пары постов с одинаковым posted_at: порядок внутри пары решает id
+    posts = _publish(db, [make_draft(creator) for _ in range(5)])
+    expected = [post.id for post in sorted(posts, key=lambda post: (post.posted_at, post.id), reverse=True)]
+
+    seen, cursor = [], None
+    for _ in range(3):
+        response = client.get("/api/products/feed", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.json()
+        seen += [item["post_id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+    assert seen == expected
+    assert cursor is None
+
+    assert client.get("/api/products/feed", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_feed_etag_and_invalidation_on_checkout(client, db, make_user, make_draft):
+    creator, _ = make_user("worker")
+    _, headers = make_user()
+    draft = make_draft(creator, quantity=5)
+    _publish(db, [draft])
+
+    first = client.get("/api/products/feed")
+    etag = first.headers["etag"]
+    assert first.json()["items"][0]["quantity"] == 5
+    assert client.get("/api/products/feed", headers={"If-None-Match": etag}).status_code == 304
+
+    # Резервирование списывает остаток массовым UPDATE — кэш первой страницы сбрасывается явно
+    client.post("/api/cart/bulk", json={"items": [{"draft_id": draft.id, "quantity": 2}]}, headers=headers)
+    assert client.post("/api/cart/checkout", headers=headers).status_code == 200
+    response = client.get("/api/products/feed", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["items"][0]["quantity"] == 3
+    assert response.headers["etag"] != etag
+
+
+def test_feed_cache_drops_page_read_before_invalidation():
+    cache = FeedPageCache(ttl_seconds=60)
+    assert cache.get((20, None)) is None
+    generation = cache.generation
+    cache.invalidate(broadcast=False)  # commit между чтением страницы из БД и set
+    cache.set((20, None), b"stale", '"stale"', generation)
+    assert cache.get((20, None)) is None
+    assert cache.stats()["stale_sets"] == 1
+
+    cache.set((20, None), b"fresh", '"fresh"', cache.generation)
+    assert cache.get((20, None)) == (b"fresh", '"fresh"')
+
+
+def test_feed_query_budget(client, db, make_user, make_draft, query_budget):
+    creator, _ = make_user("worker")
+    _publish(db, [make_draft(creator) for _ in range(30)])
+    with query_budget(1):
+        page = client.get("/api/products/feed", params={"limit": 20}).json()
+    with query_budget(1):
+        client.get("/api/products/feed", params={"limit": 20, "cursor": page["next_cursor"]})
+    # Первая страница — из кэша
+    with query_budget(0):
+        client.get("/api/products/feed", params={"limit": 20})
+
+
+def test_feed_and_cart_on_async_session(client, db, make_user, make_draft, monkeypatch):
+    creator, _ = make_user("worker")
+    _, headers = make_user()
+    drafts = [make_draft(creator, price=600.0) for _ in range(3)]
+    _publish(db, drafts)
+    client.post("/api/cart/bulk", json={"items": [{"draft_id": drafts[0].id, "quantity": 2}]}, headers=headers)
+    sync_feed = client.get("/api/products/feed").json()
+    sync_cart = client.get("/api/cart", headers=headers).json()
+
+    async_engine = create_async_engine(to_async_url(DATABASE_URL))
+    monkeypatch.setattr(security, "AsyncSessionLocal", async_sessionmaker(bind=async_engine, expire_on_commit=False))
+    feed_cache.invalidate(broadcast=False)
+    try:
+        assert client.get("/api/products/feed").json() == sync_feed
+        assert client.get("/api/cart", headers=headers).json() == sync_cart
+    finally:
+        client.portal.call(async_engine.dispose)
+    assert sync_cart["subtotal"] == 1200.0 and len(sync_feed["items"]) == 3
+
+
+def test_search_ranks_title_matches_first(client, db, make_user, make_draft):
+    creator, _ = make_user("worker")
+    # Без посторонних товаров у bm25 нулевой idf и ранги неразличимы
+    for title in ("Ложка", "Вилка", "Тарелка", "Сковорода", "Кастрюля"):
+        make_draft(creator, title=title)
+    in_description = make_draft(creator, title="Кружка", description="Подходит к чайнику и заварнику")
+    in_title = make_draft(creator, title="Чайник электрический", description="Стальной корпус")
+    hidden = make_draft(creator, title="Чайник заварочный")
+    hidden.published = False
+    db.commit()
+
+    response = client.get("/api/products/search", params={"q": "чайн"})
+    assert response.status_code == 200, response.text
+    items = response.json()["items"]
+    assert [item["draft_id"] for item in items] == [in_title.id, in_description.id]
+    assert items[0]["rank"] > items[1]["rank"]
+    assert "<b>Чайник</b>" in items[0]["snippet"]
+    assert "<b>чайнику</b>" in items[1]["snippet"]
+
+
+def test_search_requires_every_word(client, make_user, make_draft):
+    creator, _ = make_user("worker")
+    make_draft(creator, title="Чайник электрический")
+    steel = make_draft(creator, title="Чайник стальной")
+
+    items = client.get("/api/products/search", params={"q": "стал чайник"}).json()["items"]
+    assert [item["draft_id"] for item in items] == [steel.id]
+
+
+def test_search_without_words_is_empty(client, make_user, make_draft):
+    creator, _ = make_user("worker")
+    make_draft(creator, title="Чайник")
+
+    response = client.get("/api/products/search", params={"q": "?!"})
+    assert response.status_code == 200
+    assert response.json() == {"items": []}
+    assert client.get("/api/products/search", params={"q": "ч"}).status_code == 422
@@ -0,0 +1,44 @@
+# app/tests/test_profiler.py
+# EXPLAIN медленных запросов не должен ломать транзакцию запроса.
+from types import SimpleNamespace
+
+from app.db.profiler import _explain
+
+
+class _Cursor:
+    def __init__(self, log, fail):
+        self.log, self.fail = log, fail
+
+    def execute(self, statement, parameters=None):
+        self.log.append(statement)
+        if statement.startswith("EXPLAIN") and self.fail:
+            raise RuntimeError("syntax error")
+
+    def fetchall(self):
+        return [("Seq Scan on orders",)]
+
+    def close(self):
+        pass
+
+
+def _connection(dialect, fail=False, autocommit=False):
+    log = []
+    dbapi = SimpleNamespace(autocommit=autocommit, cursor=lambda: _Cursor(log, fail))
+    conn = SimpleNamespace(dialect=SimpleNamespace(name=dialect), connection=SimpleNamespace(dbapi_connection=dbapi))
+    return conn, log
+
+
+def test_explain_failure_rolls_back_to_savepoint_on_postgres():
+    conn, log = _connection("postgresql", fail=True)
+    assert _explain(conn, "EXPLAIN SELECT 1", {}).startswith("(EXPLAIN failed")
+    assert log == ["SAVEPOINT query_profiler_explain", "EXPLAIN SELECT 1", "ROLLBACK TO SAVEPOINT query_profiler_explain"]
+
+    conn, log = _connection("postgresql")
+    assert _explain(conn, "EXPLAIN SELECT 1", {}) == "Seq Scan on orders"
+    assert log[-1] == "RELEASE SAVEPOINT query_profiler_explain"
+
+
+def test_explain_without_transaction_skips_savepoint():
+    for conn, log in (_connection("postgresql", autocommit=True), _connection("sqlite")):
+        assert _explain(conn, "EXPLAIN SELECT 1", {}) == "Seq Scan on orders"
+        assert log == ["EXPLAIN SELECT 1"]
@@ -0,0 +1,110 @@
+# app/tests/test_replicas.py
+# Чтения с реплик на двух базах SQLite: маршрутизация RoutingSession и
+# read-your-writes между запросами клиента (X-Last-Write).
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import select
+
+from app.core import security
+from app.db.base import Base
+from app.db.session import LAST_WRITE_HEADER, LastWriteMiddleware, ReadSessionLocal, ReplicaRouter, client_last_write
+from app.main import app
+from app.models.product import ProductDraft
+
+
+@pytest.fixture
+def replica_router(client, tmp_path, monkeypatch):
+    """Роутер с одной репликой — отдельной пустой базой (отставшая копия primary)."""
+    router = ReplicaRouter([f"sqlite:///{tmp_path}/replica.db"], max_lag_seconds=5, check_interval=60)
+    Base.metadata.create_all(router.engines[0])
+    monkeypatch.setattr(security, "replica_router", router)
+    yield router
+    router.dispose()
+
+
+def test_routing_session_reads_replica_until_write(db, make_user, make_draft, replica_router):
+    creator, _ = make_user("worker")
+    draft = make_draft(creator)
+    with ReadSessionLocal() as session:
+        session.info["replica"] = replica_router.pick()
+        assert session.get(ProductDraft, draft.id) is None  # SELECT ушёл на реплику
+        session.add(ProductDraft(creator_id=creator.id, title="Новый", price=1.0, quantity=1))
+        session.flush()  # запись — на primary
+        session.commit()
+    assert db.scalar(select(ProductDraft.id).where(ProductDraft.title == "Новый")) is not None
+    assert replica_router.stats()["replicas"][0]["healthy"] is True
+
+
+def test_replica_lag_vs_client_last_write(replica_router, monkeypatch):
+    monkeypatch.setattr(replica_router, "_measure_lag", lambda replica: 3.0)
+    now = time.time()
+    assert replica_router.pick(written_at=now - 1) is None
+    assert replica_router.stats()["sticky_primary_reads"] == 1
+    assert replica_router.pick(written_at=now - 10) is replica_router.engines[0]
+    assert replica_router.pick() is replica_router.engines[0]
+
+
+def test_cart_after_write_reads_primary(client, make_user, make_draft, replica_router, monkeypatch):
+    monkeypatch.setattr(replica_router, "_measure_lag", lambda replica: 3.0)
+    creator, _ = make_user("worker")
+    _, headers = make_user()
+    draft = make_draft(creator)
+    client.post("/api/cart/bulk", json={"items": [{"draft_id": draft.id, "quantity": 1}]}, headers=headers)
+
+    # Без времени записи корзина читается с отстающей реплики и пуста
+    assert client.get("/api/cart", headers=headers).json()["items"] == []
+    fresh = {**headers, LAST_WRITE_HEADER: f"{time.time():.3f}"}
+    assert [line["draft_id"] for line in client.get("/api/cart", headers=fresh).json()["items"]] == [draft.id]
+    # Значение из будущего не принимается
+    assert client.get("/api/cart", headers={**headers, LAST_WRITE_HEADER: "9999999999"}).json()["items"] == []
+
+
+def test_last_write_middleware_marks_writing_responses():
+    async def endpoint(scope, receive, send):
+        scope.setdefault("state", {})["db_wrote"] = scope["path"] == "/write"
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    def call(path):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(LastWriteMiddleware(endpoint)({"type": "http", "path": path}, None, send))
+        return dict(sent[0]["headers"])
+
+    headers = call("/write")
+    written_at = float(headers[LAST_WRITE_HEADER.encode()])
+    assert abs(written_at - time.time()) < 5
+    assert headers[b"set-cookie"].startswith(b"last_write=")
+    assert LAST_WRITE_HEADER.encode() not in call("/read")
+
+
+def test_writing_endpoints_return_last_write(client, make_user, make_draft, monkeypatch):
+    # В тестах реплик нет и middleware не подключено — оборачиваем стек приложения
+    monkeypatch.setattr(app, "middleware_stack", LastWriteMiddleware(app.middleware_stack))
+    creator, _ = make_user("worker")
+    _, headers = make_user()
+    draft = make_draft(creator)
+    response = client.post("/api/cart/bulk", json={"items": [{"draft_id": draft.id, "quantity": 1}]}, headers=headers)
+    assert LAST_WRITE_HEADER in response.headers
+    # Резерв пишет сессия пачки, запись всё равно отмечена
+    assert LAST_WRITE_HEADER in client.post("/api/cart/checkout", headers=headers).headers
+    assert LAST_WRITE_HEADER not in client.get("/api/cart", headers=headers).headers
+
+
+class _Connection:
+    def __init__(self, headers=None, cookies=None):
+        self.headers = headers or {}
+        self.cookies = cookies or {}
+
+
+def test_client_last_write_parsing():
+    now = time.time()
+    assert client_last_write(_Connection(cookies={"last_write": str(now)})) == now
+    assert client_last_write(_Connection({LAST_WRITE_HEADER: "junk"})) is None
+    assert client_last_write(_Connection({LAST_WRITE_HEADER: str(now - 3600)})) is None
+    assert client_last_write(_Connection()) is None
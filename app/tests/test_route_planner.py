@@ -0,0 +1,108 @@
+# app/tests/test_route_planner.py
+# Планировщик маршрутов: каждый стоп ровно один раз, 2-opt не удлиняет путь,
+# пачки не больше max_stops, стопы без координат — в unplanned; права эндпоинтов.
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models.order import Order, OrderStatus
+from app.services import route_planner as planner
+from app.services.route_planner import RoutePlanner, solve_route, sweep_clusters
+
+DEPOT = (55.75, 37.62)
+
+
+def _points(count: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    return DEPOT[0] + rng.uniform(-0.1, 0.1, count), DEPOT[1] + rng.uniform(-0.15, 0.15, count)
+
+
+def _task(lat, lon, window_start=None, window_end=None) -> dict:
+    empty = np.full(len(lat), np.nan)
+    return {
+        "lat": lat, "lon": lon, "depot": DEPOT,
+        "window_start": empty if window_start is None else window_start,
+        "window_end": empty if window_end is None else window_end,
+        "speed_kmh": 25.0, "road_factor": 1.3, "service_minutes": 5.0,
+    }
+
+
+def test_solve_route_visits_every_stop_once_and_two_opt_does_not_lengthen():
+    for seed in range(5):
+        lat, lon = _points(30, seed)
+        task = _task(lat, lon)
+        result = solve_route(task)
+        assert sorted(result["order"]) == list(range(30))
+        assert len(result["eta"]) == 30 and all(np.diff(result["eta"]) > 0)
+
+        # Жадный маршрут до 2-opt — верхняя граница длины
+        dist = planner.distance_matrix(np.append(DEPOT[0], lat), np.append(DEPOT[1], lon)) * task["road_factor"]
+        minutes = dist / task["speed_kmh"] * 60
+        greedy = planner._nearest_neighbour(minutes, np.full(31, -np.inf), np.full(31, np.inf), 5.0)
+        assert result["distance_km"] <= dist[greedy[:-1], greedy[1:]].sum() + 1e-9
+
+
+def test_solve_route_with_windows_keeps_every_stop():
+    lat, lon = _points(12)
+    window_start = np.array([np.nan] * 6 + [120.0] * 6)
+    window_end = np.array([np.nan] * 6 + [180.0] * 6)
+    result = solve_route(_task(lat, lon, window_start, window_end))
+    assert sorted(result["order"]) == list(range(12))
+    eta = dict(zip(result["order"], result["eta"]))
+    # Окно ещё не открылось — курьер ждёт
+    assert all(eta[stop] >= 120.0 for stop in range(6, 12))
+
+
+def test_sweep_clusters_respects_max_stops():
+    lat, lon = _points(23)
+    clusters = sweep_clusters(lat, lon, DEPOT, max_stops=5)
+    assert len(clusters) == 5
+    assert all(len(cluster) <= 5 for cluster in clusters)
+    assert sorted(np.concatenate(clusters).tolist()) == list(range(23))
+    assert sweep_clusters(np.array([]), np.array([]), DEPOT, max_stops=5) == []
+
+
+def test_plan_puts_stops_without_coordinates_into_unplanned():
+    lat, lon = _points(4)
+    stops = [
+        {"order_id": i + 1, "address": f"Адрес {i}", "latitude": float(lat[i]), "longitude": float(lon[i]),
+         "window_start": None, "window_end": None}
+        for i in range(4)
+    ] + [{"order_id": 99, "address": "Без координат", "latitude": None, "longitude": None,
+          "window_start": None, "window_end": None}]
+    plan = RoutePlanner(workers=1, parallel_min_stops=1000).plan(
+        stops, datetime(2026, 3, 1, 9, 0), max_stops=3, depot=DEPOT,
+    )
+    assert plan["unplanned"] == [99]
+    assert plan["stops"] == 4
+    assert all(len(route["stops"]) <= 3 for route in plan["routes"])
+    assert sorted(stop["order_id"] for route in plan["routes"] for stop in route["stops"]) == [1, 2, 3, 4]
+
+
+def test_delivery_endpoints_require_staff(client, db, make_user):
+    buyer, client_headers = make_user()
+    _, worker_headers = make_user("worker")
+    order = Order(user_id=buyer.id, status=OrderStatus.handed_to_courier, total=100.0)
+    db.add(order)
+    db.commit()
+    url = f"/api/admin/orders/{order.id}/delivery"
+    delivery = {"address": "ул. Тверская, 1", "latitude": 55.76, "longitude": 37.61}
+    day = datetime.utcnow().date()
+
+    assert client.put(url, json=delivery, headers=client_headers).status_code == 403
+    assert client.get("/api/admin/courier-routes", params={"day": day.isoformat()},
+                      headers=client_headers).status_code == 403
+
+    response = client.put(url, json=delivery, headers=worker_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["order_id"] == order.id
+    assert client.put("/api/admin/orders/0/delivery", json=delivery, headers=worker_headers).status_code == 404
+
+    start_at = datetime.combine(day, datetime.min.time()) + timedelta(hours=9)
+    response = client.get("/api/admin/courier-routes",
+                          params={"day": day.isoformat(), "start_at": start_at.isoformat()},
+                          headers=worker_headers)
+    assert response.status_code == 200, response.text
+    plan = response.json()
+    assert [stop["order_id"] for route in plan["routes"] for stop in route["stops"]] == [order.id]
+    assert plan["unplanned"] == []
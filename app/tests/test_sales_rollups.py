@@ -0,0 +1,59 @@
+# app/tests/test_sales_rollups.py
+# Инкрементальные агрегаты продаж совпадают с пересчётом из orders/order_items.
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.models.order import Order
+from app.models.sales import SalesCreatorDaily, SalesDaily, SalesProductDaily
+from app.services import sales_rollups
+
+
+def _snapshot(db):
+    db.expire_all()
+    return {
+        model.__tablename__: sorted(
+            tuple(row) for row in db.execute(select(*model.__table__.c)).all()
+            if any(value for name, value in row._mapping.items() if name in ("orders", "units", "revenue"))
+        )
+        for model in (SalesDaily, SalesProductDaily, SalesCreatorDaily)
+    }
+
+
+def _transition(client, headers, order_ids, to_status):
+    response = client.post(
+        "/api/admin/orders/transition", json={"order_ids": order_ids, "to_status": to_status}, headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_rollups_follow_transitions(client, db, make_user, make_draft):
+    admin, admin_headers = make_user("admin")
+    creator, _ = make_user("worker")
+    cheap = make_draft(creator, quantity=10, price=0.1)
+    expensive = make_draft(admin, quantity=10, price=1999.99)
+    order_ids = []
+    for quantity in (1, 2, 3):
+        _, headers = make_user()
+        client.post("/api/cart/bulk", headers=headers, json={"items": [
+            {"draft_id": cheap.id, "quantity": quantity}, {"draft_id": expensive.id, "quantity": 1},
+        ]})
+        order_ids.append(client.post("/api/cart/checkout", headers=headers).json()["order_id"])
+
+    _transition(client, admin_headers, order_ids[:2], "processing")
+    _transition(client, admin_headers, order_ids[:1], "processed")
+    _transition(client, admin_headers, order_ids[1:2], "cancelled")
+    incremental = _snapshot(db)
+
+    today = datetime.utcnow().date()  # день заказа — по UTC
+    daily = {row[1].value: row for row in incremental["sales_daily"]}
+    assert set(daily) == {"reserved", "processed", "cancelled"}
+    reserved_total = db.get(Order, order_ids[2]).total
+    assert daily["reserved"][2:] == (1, Decimal(str(reserved_total)), 4)
+    assert sum(row[4] for row in incremental["sales_product_daily"] if row[2] == cheap.id) == Decimal("0.60")
+
+    sales_rollups.rebuild(db, today, today)
+    db.commit()
+    assert _snapshot(db) == incremental
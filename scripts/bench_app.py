@@ -0,0 +1,401 @@
+# scripts/bench_app.py
+# Нагрузочный бенчмарк API: регистрация, логин, каталог, корзина, оформление.
+#
+# run — заполняет БД (пользователи, товары в канале, корзины, история заказов),
+#   гоняет сценарии конкурентными httpx-клиентами и печатает запросов в секунду
+#   и p50/p95/p99 по каждому сценарию; --output сохраняет результат в JSON.
+#   --mode asgi — приложение в этом же процессе (httpx.ASGITransport, без сети),
+#   --mode uvicorn — настоящий сервер (uvicorn в дочернем процессе, --workers N).
+# compare — сравнивает два JSON (базовый и новый): код выхода 1, если пропускная
+#   способность упала или p95 вырос больше чем на --threshold.
+#
+# Примеры:
+#   python scripts/bench_app.py run --output /tmp/base.json
+#   python scripts/bench_app.py run --mode uvicorn --workers 4 --concurrency 64 --output /tmp/new.json
+#   python scripts/bench_app.py run --flows catalog,cart --requests 2000
+#   python scripts/bench_app.py compare /tmp/base.json /tmp/new.json --threshold 0.1
+#   python scripts/bench_app.py run --database-url postgresql://...  # пустая тестовая БД!
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+FLOWS = ("register", "token", "catalog", "cart", "checkout")
+PASSWORD = "bench-password"
+
+
+# --- Данные ---
+
+def seed(args) -> dict:
+    """Заполняет пустую БД пачками INSERT. Возвращает id для сценариев."""
+    from sqlalchemy import insert, select
+
+    from app.core.security import get_password_hash
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    import app.models.job  # noqa: F401
+    from app.models.cart import CartItem
+    from app.models.order import Order, OrderItem, OrderStatus
+    from app.models.product import ChannelPost, ProductDraft
+    from app.models.user import RoleEnum, User
+    from app.services import sales_rollups
+
+    rnd = random.Random(42)
+    started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    hashed = get_password_hash(PASSWORD)  # один хеш на всех: сидирование не упирается в bcrypt
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {"phone": f"bench-{i}", "hashed_password": hashed, "full_name": f"Bench {i}"} for i in range(args.users)
+        ])
+        db.execute(insert(User), [{"phone": "bench-creator", "role": RoleEnum.worker}])
+        user_ids = list(db.execute(select(User.id).where(User.phone.like("bench-%"), User.phone != "bench-creator")
+                                   .order_by(User.id)).scalars())
+        creator_id = db.scalar(select(User.id).where(User.phone == "bench-creator"))
+        words = ("куртка", "платье", "кроссовки", "сумка", "джинсы", "рубашка", "пальто", "шарф")
+        db.execute(insert(ProductDraft), [
+            {
+                "creator_id": creator_id,
+                "title": f"{rnd.choice(words).capitalize()} {i}",
+                "description": " ".join(rnd.choices(words, k=12)),
+                "price": rnd.randint(300, 15000),
+                # запаса хватает на все оформления, резервы не упираются в waitlist
+                "quantity": 1_000_000,
+                "published": True,
+                "created_at": now,
+            }
+            for i in range(args.drafts)
+        ])
+        draft_ids = list(db.execute(select(ProductDraft.id).order_by(ProductDraft.id)).scalars())
+        db.execute(insert(ChannelPost), [{"draft_id": draft_id, "posted_at": now} for draft_id in draft_ids])
+
+        # Корзины: у первых --carts пользователей (они же оформляют заказы в checkout)
+        db.execute(insert(CartItem), [
+            {"user_id": user_id, "draft_id": draft_id, "quantity": rnd.randint(1, 3)}
+            for user_id in user_ids[:args.carts]
+            for draft_id in rnd.sample(draft_ids, k=min(3, len(draft_ids)))
+        ])
+        # История заказов: объём таблиц orders/order_items как в живой базе
+        db.execute(insert(Order), [
+            {"user_id": rnd.choice(user_ids), "total": 0.0, "status": OrderStatus.delivered, "created_at": now}
+            for _ in range(args.orders)
+        ])
+        order_ids = list(db.execute(select(Order.id)).scalars())
+        db.execute(insert(OrderItem), [
+            {"order_id": order_id, "draft_id": rnd.choice(draft_ids), "quantity": 1, "price": 1000.0}
+            for order_id in order_ids
+            for _ in range(2)
+        ])
+        # Массовый INSERT мимо ORM — агрегаты продаж пересчитываем сами
+        sales_rollups.rebuild(db, now.date(), now.date())
+        db.commit()
+    print(f"seeded {args.users} users, {args.drafts} drafts, {args.carts} carts, {args.orders} orders "
+          f"in {time.perf_counter() - started:.1f} s")
+    return {"user_ids": user_ids, "draft_ids": draft_ids, "cart_user_ids": user_ids[:args.carts]}
+
+
+# --- Сценарии ---
+
+def _percentile(values: list[float], q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run_flow(name: str, requests: int, concurrency: int, make_request) -> dict:
+    """
+    requests запросов, не больше concurrency одновременно.
+    make_request(i) выполняет i-й запрос сценария и возвращает True при успехе.
+    """
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                ok = await make_request(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+    print(f"  {name:<9} {result['requests']:6d} req  {result['rps']:8.1f} req/s  "
+          f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+          f"errors {errors}")
+    return result
+
+
+async def run_flows(client, args, data: dict) -> dict:
+    from app.core.security import create_access_token
+
+    rnd = random.Random(1)
+    user_ids, draft_ids = data["user_ids"], data["draft_ids"]
+    # Токены для сценариев с авторизацией выдаются напрямую — без bcrypt
+    tokens = {user_id: create_access_token(str(user_id)) for user_id in user_ids}
+    # Номер регистрации должен проходить нормализацию: +7999<метка запуска><i>
+    run_tag = f"{(time.time_ns() // 10 ** 6 + os.getpid()) % 10 ** 5:05d}"
+
+    async def register(i):
+        r = await client.post("/api/auth/register",
+                              params={"phone": f"+7999{run_tag}{i:05d}", "password": PASSWORD})
+        return r.status_code == 200
+
+    async def token(i):
+        r = await client.post("/api/auth/token",
+                              data={"username": f"bench-{i % len(user_ids)}", "password": PASSWORD})
+        return r.status_code == 200
+
+    next_cursor = None
+
+    async def catalog(i):
+        # первая страница (кэш ленты), следующие по курсору и поиск — поровну
+        nonlocal next_cursor
+        if i % 3 == 0:
+            r = await client.get("/api/products/feed", params={"limit": 20})
+            if r.status_code == 200:
+                next_cursor = r.json().get("next_cursor")
+        elif i % 3 == 1 and next_cursor:
+            r = await client.get("/api/products/feed", params={"limit": 20, "cursor": next_cursor})
+        else:
+            r = await client.get("/api/products/search", params={"q": rnd.choice(("куртка", "платье", "сумка"))})
+        return r.status_code == 200
+
+    # Пользователи без корзин из сида, чтобы не трогать корзины сценария checkout
+    cart_users = user_ids[len(data["cart_user_ids"]):] or user_ids
+
+    async def cart(i):
+        headers = {"Authorization": f"Bearer {tokens[cart_users[i % len(cart_users)]]}"}
+        if i % 2 == 0:
+            items = [{"draft_id": draft_id, "quantity": 1} for draft_id in rnd.sample(draft_ids, k=3)]
+            r = await client.post("/api/cart/bulk", json={"items": items, "mode": "add"}, headers=headers)
+        else:
+            r = await client.get("/api/cart", headers=headers)
+        return r.status_code == 200
+
+    checkout_users = data["cart_user_ids"]
+
+    async def checkout(i):
+        headers = {"Authorization": f"Bearer {tokens[checkout_users[i]]}"}
+        r = await client.post("/api/cart/checkout", headers=headers)
+        return r.status_code == 200
+
+    flows = {"register": register, "token": token, "catalog": catalog, "cart": cart, "checkout": checkout}
+    results = {}
+    for name in args.flows:
+        # Каждая корзина оформляется один раз
+        requests = min(args.requests, len(checkout_users)) if name == "checkout" else args.requests
+        results[name] = await run_flow(name, requests, args.concurrency, flows[name])
+    return results
+
+
+# --- Режимы ---
+
+async def run_asgi(args, data: dict) -> dict:
+    import httpx
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_flows(client, args, data)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(args, data: dict) -> dict:
+    import httpx
+
+    port = args.port or _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=project_root, env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+                try:
+                    if (await client.get("/health/ready")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not become ready in 60 s")
+                await asyncio.sleep(0.2)
+            return await run_flows(client, args, data)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def cmd_run(args) -> int:
+    args.flows = [flow.strip() for flow in args.flows.split(",") if flow.strip()]
+    unknown = set(args.flows) - set(FLOWS)
+    if unknown:
+        print(f"unknown flows: {', '.join(sorted(unknown))}; available: {', '.join(FLOWS)}")
+        return 2
+
+    tmp = tempfile.mkdtemp(prefix="phoenix_bench_app_")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ.setdefault("UPLOAD_DIR", tmp)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("ACCESS_LOG_SAMPLE_RATE", "0")
+    # SQLite сериализует запись: под конкурентной нагрузкой «медленных» INSERT сотни
+    os.environ.setdefault("SLOW_QUERY_MS", "0")
+    os.environ.setdefault("NOTIFICATIONS_FILE", f"{tmp}/notifications.jsonl")
+    os.environ.setdefault("AUTH_CACHE_BROADCAST_FILE", f"{tmp}/auth_invalidations.log")
+
+    data = seed(args)
+    from app.db.session import engine
+
+    print(f"{args.mode}, {engine.dialect.name}, concurrency {args.concurrency}, "
+          f"bcrypt rounds {args.bcrypt_rounds}" + (f", {args.workers} workers" if args.mode == "uvicorn" else ""))
+    runner = run_asgi if args.mode == "asgi" else run_uvicorn
+    flows = asyncio.run(runner(args, data))
+
+    result = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git": _git_revision(),
+            "mode": args.mode,
+            "workers": args.workers if args.mode == "uvicorn" else 1,
+            "database": engine.dialect.name,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "seed": {"users": args.users, "drafts": args.drafts, "carts": args.carts, "orders": args.orders},
+            "python": platform.python_version(),
+            "host": platform.node(),
+        },
+        "flows": flows,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"saved {args.output}")
+    return 1 if any(flow["errors"] for flow in flows.values()) else 0
+
+
+# --- Сравнение ---
+
+def compare(base: dict, new: dict, threshold: float) -> tuple[list[str], list[str]]:
+    """Строки отчёта и список регрессий (падение rps или рост p95 больше threshold)."""
+    lines = [f"{'flow':<10}{'rps base':>10}{'rps new':>10}{'Δ rps':>9}{'p95 base':>11}{'p95 new':>10}{'Δ p95':>9}"]
+    regressions = []
+    for name in [flow for flow in FLOWS if flow in base["flows"] and flow in new["flows"]]:
+        b, n = base["flows"][name], new["flows"][name]
+        rps_change = n["rps"] / b["rps"] - 1 if b["rps"] else 0.0
+        p95_change = n["p95_ms"] / b["p95_ms"] - 1 if b["p95_ms"] else 0.0
+        flag = ""
+        if rps_change < -threshold:
+            regressions.append(f"{name}: throughput {rps_change:+.1%}")
+            flag = "  <-- regression"
+        if p95_change > threshold:
+            regressions.append(f"{name}: p95 {p95_change:+.1%}")
+            flag = "  <-- regression"
+        lines.append(f"{name:<10}{b['rps']:>10.1f}{n['rps']:>10.1f}{rps_change:>+9.1%}"
+                     f"{b['p95_ms']:>11.2f}{n['p95_ms']:>10.2f}{p95_change:>+9.1%}{flag}")
+    for key in ("mode", "workers", "database", "concurrency", "bcrypt_rounds", "seed"):
+        if base["meta"].get(key) != new["meta"].get(key):
+            lines.append(f"warning: {key} differs ({base['meta'].get(key)} vs {new['meta'].get(key)}), "
+                         "results are not directly comparable")
+    return lines, regressions
+
+
+def cmd_compare(args) -> int:
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+    print(f"base: {args.base} ({base['meta'].get('git')}, {base['meta'].get('created_at')})")
+    print(f"new:  {args.new} ({new['meta'].get('git')}, {new['meta'].get('created_at')})")
+    lines, regressions = compare(base, new, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"regressions over {args.threshold:.0%}: " + "; ".join(regressions))
+        return 1
+    print(f"no regressions over {args.threshold:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API load benchmark with JSON baselines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Заполнить БД и прогнать сценарии")
+    run.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    run.add_argument("--workers", type=int, default=1, help="Воркеры uvicorn (--mode uvicorn)")
+    run.add_argument("--port", type=int, default=0, help="Порт uvicorn (по умолчанию свободный)")
+    run.add_argument("--flows", default=",".join(FLOWS), help=f"Через запятую из: {', '.join(FLOWS)}")
+    run.add_argument("--requests", type=int, default=500, help="Запросов на сценарий")
+    run.add_argument("--concurrency", type=int, default=32)
+    run.add_argument("--users", type=int, default=5000)
+    run.add_argument("--drafts", type=int, default=2000)
+    run.add_argument("--carts", type=int, default=500, help="Пользователей с корзиной (оформляют заказы)")
+    run.add_argument("--orders", type=int, default=20000, help="Заказов в истории")
+    # 4 — register/token меряют API и БД, а не bcrypt (шторм логинов — bench_login_flood.py)
+    run.add_argument("--bcrypt-rounds", type=int, default=4, help="Стоимость bcrypt (в проде 12)")
+    run.add_argument("--database-url", default=None, help="По умолчанию — временная SQLite")
+    run.add_argument("--output", default=None, help="Сохранить результат в JSON (базовая линия)")
+    run.set_defaults(handler=cmd_run)
+
+    cmp = commands.add_parser("compare", help="Сравнить два результата")
+    cmp.add_argument("base")
+    cmp.add_argument("new")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="Допустимое ухудшение, доля (0.1 = 10%%)")
+    cmp.set_defaults(handler=cmd_compare)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# scripts/bench_channel_fanout.py
+# Бенчмарк раздачи постов хабом живой ленты (app.services.channel_hub).
+#
+# N подписчиков (как соединения SSE/WebSocket, без сети) читают посты,
+# публикуемые в канал; печатаются доставки в секунду, задержка от commit
+# до получения (p50/p99) и сколько «медленных» подписчиков отключено.
+#
+# Примеры:
+#   python scripts/bench_channel_fanout.py --subscribers 5000 --posts 50
+#   python scripts/bench_channel_fanout.py --slow 100 --queue-size 8
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+async def run(args):
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    import app.models.user, app.models.cart, app.models.order  # noqa: F401
+    from app.crud import product_crud
+    from app.models.product import ProductDraft
+    from app.models.user import User
+    from app.services.channel_hub import ChannelHub, SlowConsumer
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        creator = User(phone="bench-channel")
+        db.add(creator)
+        db.flush()
+        drafts = [ProductDraft(creator_id=creator.id, title=f"Post {i}", price=100, quantity=1) for i in range(args.posts)]
+        db.add_all(drafts)
+        db.commit()
+        draft_ids = [d.id for d in drafts]
+
+    hub = ChannelHub(SessionLocal, queue_size=args.queue_size, max_subscribers=args.subscribers + args.slow,
+                     poll_interval=60)
+    await hub.start(engine)
+    committed_at: dict[int, float] = {}
+    latencies: list[float] = []
+    received = 0
+    dropped = 0
+
+    async def consumer(slow: bool):
+        nonlocal received, dropped
+        async with hub.subscribe() as subscription:
+            for _ in range(args.posts):
+                try:
+                    item = await subscription.next(timeout=30)
+                except SlowConsumer:
+                    dropped += 1
+                    return
+                if item is None:
+                    return
+                received += 1
+                latencies.append(time.perf_counter() - committed_at[item.post_id])
+                if slow:
+                    await asyncio.sleep(0.05)
+
+    tasks = [asyncio.create_task(consumer(False)) for _ in range(args.subscribers)]
+    tasks += [asyncio.create_task(consumer(True)) for _ in range(args.slow)]
+    await asyncio.sleep(0.1)
+
+    def publish(draft_id):
+        with SessionLocal() as db:
+            post = product_crud.publish_draft(db, db.get(ProductDraft, draft_id))
+            committed_at[post.id] = time.perf_counter()
+
+    started = time.perf_counter()
+    for draft_id in draft_ids:
+        await asyncio.to_thread(publish, draft_id)
+        await asyncio.sleep(args.interval)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    await hub.stop()
+
+    latencies.sort()
+    print(f"{args.subscribers} subscribers (+{args.slow} slow), {args.posts} posts, queue {args.queue_size}")
+    print(f"{received} deliveries in {elapsed:.2f} s -> {received / elapsed:.0f} deliveries/s")
+    if latencies:
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"commit -> receive latency: p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+    print(f"slow subscribers dropped: {dropped}; hub: {hub.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Channel hub fan-out benchmark")
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--slow", type=int, default=0, help="Подписчики, читающие раз в 50 мс")
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.0, help="Пауза между публикациями, с")
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--database-url", default=None, help="По умолчанию — временная SQLite")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or (
+        f"sqlite:///{tempfile.mkdtemp(prefix='phoenix_channel_')}/channel.db"
+    )
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# scripts/bench_contact_lookup.py
+# Бенчмарк синхронизации контактов (user_crud.normalize_phones / find_by_phones).
+#
+# Адресная книга из --numbers номеров в разных форматах (8 (900) ..., +7 900 ...,
+# 900-..., мусор), часть принадлежит зарегистрированным пользователям, часть из
+# них заблокирована. Сравниваются:
+#   - нормализация: str.translate по всей книге сразу против регулярного
+#     выражения на каждый номер;
+#   - поиск: SELECT на каждый номер (замер на --naive-sample номерах,
+#     пересчёт на всю книгу) против одного запроса на всю книгу;
+#   - весь эндпоинт POST /api/users/contacts/lookup (ASGI, без сети).
+#
+# Примеры:
+#   python scripts/bench_contact_lookup.py
+#   python scripts/bench_contact_lookup.py --users 500000 --numbers 10000 --requests 20
+#   python scripts/bench_contact_lookup.py --database-url postgresql://...  # пустая тестовая БД!
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+PASSWORD = "bench-password"
+
+
+def make_address_book(rnd: random.Random, registered: list[str], count: int, share: float) -> list[str]:
+    book = []
+    for _ in range(count):
+        if registered and rnd.random() < share:
+            digits = rnd.choice(registered)[2:]  # без +7
+        else:
+            digits = f"9{rnd.randrange(10 ** 9):09d}"
+        style = rnd.randrange(5)
+        if style == 0:
+            book.append(f"8 ({digits[:3]}) {digits[3:6]}-{digits[6:8]}-{digits[8:]}")
+        elif style == 1:
+            book.append(f"+7 {digits[:3]} {digits[3:]}")
+        elif style == 2:
+            book.append(digits)
+        elif style == 3:
+            book.append(f"7-{digits[:3]}-{digits[3:6]}-{digits[6:]}")
+        else:
+            book.append(rnd.choice(("112", "*100#", "Мама", f"{digits[:5]}")))
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk phone lookup benchmark")
+    parser.add_argument("--users", type=int, default=200000, help="Зарегистрированных пользователей")
+    parser.add_argument("--numbers", type=int, default=10000, help="Номеров в адресной книге")
+    parser.add_argument("--registered-share", type=float, default=0.3, help="Доля номеров книги из базы")
+    parser.add_argument("--naive-sample", type=int, default=1000, help="Номеров для замера поштучного поиска")
+    parser.add_argument("--requests", type=int, default=10, help="Запросов к эндпоинту")
+    parser.add_argument("--database-url", default=None, help="По умолчанию — временная SQLite")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="phoenix_contacts_")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+    os.environ.setdefault("UPLOAD_DIR", tmp)
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Лимит на пользователя не должен влиять на замер
+    os.environ["CONTACT_SYNC_NUMBERS_PER_HOUR"] = "0"
+    os.environ["CONTACT_SYNC_MAX_NUMBERS"] = str(max(args.numbers, 10000))
+
+    from sqlalchemy import insert, select
+
+    from app.core.security import get_password_hash
+    from app.crud.user_crud import find_by_phones, normalize_phones
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    import app.models.user, app.models.product, app.models.cart, app.models.order  # noqa: F401
+    from app.models.user import User
+
+    rnd = random.Random(7)
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    phones = [f"+79{n:09d}" for n in rnd.sample(range(10 ** 9), args.users)]
+    with SessionLocal() as db:
+        for i in range(0, len(phones), 50000):
+            db.execute(insert(User), [
+                {"phone": phone, "full_name": f"User {i + j}", "blacklisted": (i + j) % 50 == 0}
+                for j, phone in enumerate(phones[i:i + 50000])
+            ])
+        db.execute(insert(User), [{"phone": "bench-contacts", "hashed_password": get_password_hash(PASSWORD)}])
+        db.commit()
+    book = make_address_book(rnd, phones, args.numbers, args.registered_share)
+    print(f"{engine.dialect.name}: {args.users} users seeded in {time.perf_counter() - started:.1f} s, "
+          f"address book of {len(book)} numbers")
+
+    # --- Нормализация ---
+    not_digits = re.compile(r"[^0-9]+")
+
+    def normalize_one(number: str) -> str | None:
+        digits = not_digits.sub("", number)
+        if number.lstrip().startswith("+"):
+            return "+" + digits if 8 <= len(digits) <= 15 else None
+        if len(digits) == 10:
+            return "+7" + digits
+        if len(digits) == 11 and digits[0] == "8":
+            return "+7" + digits[1:]
+        return "+" + digits if 11 <= len(digits) <= 15 else None
+
+    elapsed = min(timeit(lambda: [normalize_one(number) for number in book]) for _ in range(5))
+    print(f"  {'regex per number':<36} {elapsed * 1000:8.2f} ms")
+    elapsed = min(timeit(lambda: normalize_phones(book)) for _ in range(5))
+    normalized = normalize_phones(book)
+    unique = list(dict.fromkeys(phone for phone in normalized if phone is not None))
+    print(f"  {'normalize_phones (batched)':<36} {elapsed * 1000:8.2f} ms  "
+          f"({len(unique)} unique, {normalized.count(None)} invalid)")
+
+    # --- Поиск ---
+    sample = unique[:args.naive_sample]
+    with SessionLocal() as db:
+        def one_by_one():
+            return [db.execute(select(User.id).where(User.phone == phone, User.blacklisted.is_not(True))).first()
+                    for phone in sample]
+        elapsed = timeit(one_by_one)
+        found = sum(row is not None for row in one_by_one())
+        print(f"  {'SELECT per number':<36} {elapsed * 1000:8.2f} ms for {len(sample)} "
+              f"-> ~{elapsed / max(1, len(sample)) * len(unique) * 1000:.0f} ms for {len(unique)} ({found} found)")
+        elapsed = min(timeit(lambda: find_by_phones(db, unique)) for _ in range(5))
+        print(f"  {'find_by_phones (one query)':<36} {elapsed * 1000:8.2f} ms for {len(unique)} "
+              f"({len(find_by_phones(db, unique))} found)")
+
+    # --- Эндпоинт ---
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        token = client.post("/api/auth/token", data={"username": "bench-contacts", "password": PASSWORD}).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        durations = []
+        for _ in range(args.requests):
+            request_started = time.perf_counter()
+            response = client.post("/api/users/contacts/lookup", json={"phones": book}, headers=headers)
+            durations.append(time.perf_counter() - request_started)
+            response.raise_for_status()
+        matches = len(response.json()["matches"])
+    print(f"  {'POST /api/users/contacts/lookup':<36} p50 {statistics.median(durations) * 1000:8.2f} ms, "
+          f"max {max(durations) * 1000:.2f} ms ({matches} matches)")
+
+
+def timeit(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# scripts/bench_exports.py
+# Бенчмарк выгрузок для бухгалтерии (app.services.exports).
+#
+# Засевает --orders заказов по --items позиций и для каждого размера из --sizes
+# (доля заказов, попадающих в период) сравнивает пиковую память Python
+# (tracemalloc) и время:
+#   - наивная выгрузка: .all() по всему периоду и файл целиком в памяти;
+#   - потоковая: курсор с yield_per и запись кусками (CSV / XLSX write_only).
+# У потоковой пик не должен расти с числом строк.
+#
+# Примеры:
+#   python scripts/bench_exports.py
+#   python scripts/bench_exports.py --orders 200000 --items 3 --formats csv
+#   python scripts/bench_exports.py --database-url postgresql://...  # пустая тестовая БД!
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+def measure(func) -> tuple[float, int, int]:
+    """
+    (секунды, пик памяти в байтах, размер результата). Время и память замеряются
+    отдельными прогонами: под tracemalloc код работает в разы медленнее.
+    """
+    started = time.perf_counter()
+    size = func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming export benchmark")
+    parser.add_argument("--orders", type=int, default=20000, help="Заказов в базе")
+    parser.add_argument("--items", type=int, default=3, help="Позиций в заказе")
+    parser.add_argument("--products", type=int, default=2000, help="Товаров")
+    parser.add_argument("--sizes", default="0.1,1", help="Доли заказов в выгружаемом периоде")
+    parser.add_argument("--formats", default="csv,xlsx", help="Форматы через запятую")
+    parser.add_argument("--database-url", default=None, help="По умолчанию — временная SQLite")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="phoenix_exports_")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+    os.environ.setdefault("UPLOAD_DIR", tmp)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from sqlalchemy import insert
+
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    import app.models.user, app.models.product, app.models.cart, app.models.order  # noqa: F401
+    from app.models.order import Order, OrderItem, OrderStatus
+    from app.models.product import ProductDraft
+    from app.models.user import User
+    from app.services import exports
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    # Заказы равномерно по дням от first_day: период [first_day, first_day + share * days)
+    days = 365
+    first_day = datetime(2024, 1, 1)
+    with SessionLocal() as db:
+        db.execute(insert(User), [{"phone": "bench-exports"}])
+        db.execute(insert(ProductDraft), [
+            {"creator_id": 1, "sku": f"SKU-{i}", "title": f"Товар {i}", "price": 10.0 + i % 500, "quantity": 100,
+             "created_at": first_day, "published": True}
+            for i in range(args.products)
+        ])
+        for start in range(0, args.orders, 10000):
+            ids = range(start + 1, min(args.orders, start + 10000) + 1)
+            db.execute(insert(Order), [
+                {"id": i, "user_id": 1, "total": 0.0, "status": OrderStatus.processed,
+                 "created_at": first_day + timedelta(seconds=(i - 1) * days * 86400 // args.orders)}
+                for i in ids
+            ])
+            db.execute(insert(OrderItem), [
+                {"order_id": i, "draft_id": (i * 7 + j) % args.products + 1, "quantity": 1 + j, "price": 10.0}
+                for i in ids for j in range(args.items)
+            ])
+        db.commit()
+    print(f"{engine.dialect.name}: {args.orders} orders x {args.items} items seeded "
+          f"in {time.perf_counter() - started:.1f} s")
+
+    def naive(fmt, date_from, date_to):
+        with SessionLocal() as db:
+            rows = db.execute(exports._orders_query(date_from, date_to)).all()
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, delimiter=";")
+            writer.writerow(exports.ORDER_COLUMNS)
+            writer.writerows([exports._csv_value(value) for value in row] for row in rows)
+            return len(buffer.getvalue().encode("utf-8"))
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(exports.ORDER_COLUMNS)
+        for row in rows:
+            sheet.append([exports._csv_value(value) for value in row])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return len(buffer.getvalue())
+
+    def streamed(fmt, date_from, date_to):
+        return sum(len(chunk) for chunk in exports.stream_export("orders", fmt, date_from, date_to))
+
+    for share in (float(value) for value in args.sizes.split(",")):
+        date_from = first_day.date()
+        date_to = date_from + timedelta(days=max(0, round(days * share) - 1))
+        rows = round(args.orders * share) * args.items
+        for fmt in args.formats.split(","):
+            for name, func in (("naive (all rows in memory)", naive), ("streamed (yield_per)", streamed)):
+                elapsed, peak, size = measure(lambda: func(fmt, date_from, date_to))
+                print(f"  ~{rows:>8} rows {fmt:<4} {name:<28} {elapsed:7.2f} s  "
+                      f"peak {peak / 2 ** 20:8.1f} MiB  file {size / 2 ** 20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
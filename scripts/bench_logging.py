@@ -0,0 +1,134 @@
+# scripts/bench_logging.py
+# Бенчмарк логирования (app.core.logging).
+#
+# 1. Стоимость вызова logger.info в потоке запроса: синхронный StreamHandler
+#    с JSON-форматтером против DeferredQueueHandler (JSON пишет поток слушателя).
+# 2. Сколько микросекунд добавляет RequestTimingMiddleware к запросу (ASGI-вызовы
+#    без сети) при сэмплировании access-лога и при записи каждого запроса —
+#    в сравнении со временем простейшего эндпоинта FastAPI.
+#
+# Примеры:
+#   python scripts/bench_logging.py
+#   python scripts/bench_logging.py --calls 200000 --requests 50000 --sample-rate 0.05
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+def bench_calls(args) -> None:
+    from logging.handlers import QueueListener
+    import queue
+
+    from app.core.logging import DeferredQueueHandler, RequestIdFilter, _build_formatter
+
+    devnull = open(os.devnull, "w")
+    logger = logging.getLogger("bench.calls")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    def run(label: str) -> float:
+        started = time.perf_counter()
+        for i in range(args.calls):
+            logger.info("order %s moved to %s by %d", i, "processed", 42)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<28} {elapsed / args.calls * 1e6:6.2f} µs/call in request thread")
+        return elapsed
+
+    sync_handler = logging.StreamHandler(devnull)
+    sync_handler.setFormatter(_build_formatter("json"))
+    sync_handler.addFilter(RequestIdFilter())
+    logger.handlers = [sync_handler]
+    run("sync StreamHandler + JSON")
+
+    output = logging.StreamHandler(devnull)
+    output.setFormatter(_build_formatter("json"))
+    queue_handler = DeferredQueueHandler(queue.Queue(args.calls + 1))
+    queue_handler.addFilter(RequestIdFilter())
+    logger.handlers = [queue_handler]
+    # Слушатель запускается после замера: иначе он делит GIL с циклом бенчмарка,
+    # а в сервере форматирует, пока поток запроса ждёт сеть или БД
+    run("DeferredQueueHandler")
+    listener = QueueListener(queue_handler.queue, output)
+    drain_started = time.perf_counter()
+    listener.start()
+    listener.stop()
+    drained = time.perf_counter() - drain_started
+    print(f"{'':<28} listener: {drained / args.calls * 1e6:.2f} µs/record in its own thread, "
+          f"dropped {queue_handler.dropped}")
+
+
+async def bench_requests(args) -> None:
+    from fastapi import FastAPI
+
+    from app.core.logging import RequestTimingMiddleware, setup_logging, shutdown_logging
+
+    setup_logging(log_format="json", stream=open(os.devnull, "w"))
+
+    api = FastAPI()
+
+    @api.get("/api/products/{draft_id}")
+    async def product(draft_id: int):
+        return {"id": draft_id, "title": "Товар", "price": 100}
+
+    async def bare(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"2")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/products/7", "raw_path": b"/api/products/7",
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def per_request(app) -> float:
+        for _ in range(200):  # прогрев
+            await app(dict(scope), receive, send)
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                await app(dict(scope), receive, send)
+            best = min(best, (time.perf_counter() - started) / args.requests)
+        return best
+
+    endpoint = await per_request(api)
+    print(f"{'FastAPI endpoint (no DB)':<28} {endpoint * 1e6:7.1f} µs/request")
+    baseline = await per_request(bare)
+    for label, rate in ((f"middleware, sample {args.sample_rate}", args.sample_rate),
+                        ("middleware, log every request", 1.0)):
+        added = await per_request(RequestTimingMiddleware(bare, sample_rate=rate)) - baseline
+        print(f"{label:<28} +{added * 1e6:6.1f} µs/request "
+              f"({added / endpoint * 100:.1f}% of the trivial endpoint)")
+    shutdown_logging()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument("--calls", type=int, default=100000, help="Вызовов logger.info")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sample-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='phoenix_logging_')}/logging.db")
+    bench_calls(args)
+    asyncio.run(bench_requests(args))
+
+
+if __name__ == "__main__":
+    main()
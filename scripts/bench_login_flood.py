@@ -0,0 +1,132 @@
+# scripts/bench_login_flood.py
+# Бенчмарк: пропускная способность /api/auth/token и задержка остальных
+# (синхронных, из общего threadpool) эндпоинтов во время шторма логинов.
+#
+# Приложение запускается in-process (httpx + ASGITransport) на отдельной
+# SQLite-базе, поэтому скрипт не трогает рабочую БД.
+#
+# Пример:
+#   python scripts/bench_login_flood.py --users 200 --concurrency 64 --duration 10
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def describe(name, latencies, duration):
+    ms = [v * 1000 for v in latencies]
+    print(
+        f"{name:<22} n={len(ms):<6} rps={len(ms) / duration:8.1f} "
+        f"p50={percentile(ms, 50):7.1f}ms p95={percentile(ms, 95):7.1f}ms "
+        f"p99={percentile(ms, 99):7.1f}ms max={max(ms, default=0):7.1f}ms"
+    )
+
+
+# Синхронный (def) эндпоинт: FastAPI выполняет его в общем threadpool, который
+# шторм логинов не должен занимать. /health не подходит — его проба идёт через
+# asyncio.to_thread (пул event loop), и голодание threadpool он не покажет.
+PROBE_PATH = "/api/products/search?q=bench"
+
+
+async def probe(client, stop, latencies, path=PROBE_PATH):
+    """Фоновый «другой» трафик: последовательные GET с замером задержки."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def login_loop(client, stop, phones, password, latencies, statuses):
+    i = 0
+    while not stop.is_set():
+        phone = phones[i % len(phones)]
+        i += 1
+        started = time.perf_counter()
+        r = await client.post("/api/auth/token", data={"username": phone, "password": password})
+        latencies.append(time.perf_counter() - started)
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+
+async def run(args):
+    import httpx
+
+    from app.core import security
+    from app.db.base import Base
+    from app.db.session import engine, SessionLocal
+    from app.main import app
+    from app.models.user import User, RoleEnum
+
+    Base.metadata.create_all(bind=engine)
+    password = "bench-password"
+    hashed = security.get_password_hash(password)
+    phones = [f"+7900{i:07d}" for i in range(args.users)]
+    with SessionLocal() as db:
+        db.add_all(User(phone=p, hashed_password=hashed, role=RoleEnum.client) for p in phones)
+        db.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # 1. Базовая задержка без нагрузки
+        stop = asyncio.Event()
+        idle = []
+        task = asyncio.create_task(probe(client, stop, idle))
+        await asyncio.sleep(args.warmup)
+        stop.set()
+        await task
+
+        # 2. Шторм логинов + тот же фоновый трафик
+        stop = asyncio.Event()
+        busy, logins, statuses = [], [], {}
+        tasks = [asyncio.create_task(probe(client, stop, busy))]
+        tasks += [
+            asyncio.create_task(login_loop(client, stop, phones, password, logins, statuses))
+            for _ in range(args.concurrency)
+        ]
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    print(f"bcrypt rounds={security.settings.BCRYPT_ROUNDS} pool={security.password_pool.stats()}")
+    describe("search idle", idle, args.warmup)
+    describe("search under flood", busy, elapsed)
+    describe("/api/auth/token", logins, elapsed)
+    ok = statuses.get(200, 0)
+    print(f"logins ok/s={ok / elapsed:.1f} statuses={dict(sorted(statuses.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login flood benchmark")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    args = parser.parse_args()
+
+    # Отдельная временная БД; настройки читаются при импорте app, поэтому до него
+    tmp_dir = tempfile.mkdtemp(prefix="phoenix_bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/bench.db"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# scripts/bench_order_transitions.py
+# Бенчмарк массовой смены статусов заказов (transition_orders) и очереди задач.
+#
+# Заказы проводятся по цепочке reserved -> processing -> ... -> delivered
+# пачками заданного размера; печатается заказов в секунду на переходах
+# и задач в секунду у воркера очереди. Для сравнения --batch 1 даёт
+# поштучную обработку («один заказ — один запрос»).
+#
+# Примеры:
+#   python scripts/bench_order_transitions.py --orders 5000 --batch 200
+#   python scripts/bench_order_transitions.py --orders 500 --batch 1
+#   python scripts/bench_order_transitions.py --database-url postgresql://...  # пустая тестовая БД!
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+CHAIN = ("processing", "processed", "handed_to_courier", "in_delivery", "delivered")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk order transition benchmark")
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--database-url", default=None, help="По умолчанию — временная SQLite")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="phoenix_transitions_")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+    os.environ.setdefault("UPLOAD_DIR", tmp)
+
+    from sqlalchemy import func, insert, select
+
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    import app.models.user, app.models.product, app.models.cart, app.models.job  # noqa: F401
+    from app.models.job import Job, JobStatus
+    from app.models.order import Order, OrderStatus
+    from app.models.user import User
+    from app.services.job_queue import JobWorker
+    from app.services import sales_rollups
+    from app.services.order_processing import transition_orders
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(phone="bench-transitions")
+        db.add(user)
+        db.flush()
+        db.execute(insert(Order), [
+            {"user_id": user.id, "total": 1000.0, "status": OrderStatus.reserved} for _ in range(args.orders)
+        ])
+        # Массовый INSERT мимо ORM — агрегаты продаж пересчитываем сами
+        today = datetime.utcnow().date()
+        sales_rollups.rebuild(db, today, today)
+        db.commit()
+        order_ids = list(db.execute(select(Order.id).order_by(Order.id)).scalars())
+
+    print(f"{engine.dialect.name}, {args.orders} orders, batch {args.batch}")
+    total_elapsed = 0.0
+    for status in CHAIN:
+        started = time.perf_counter()
+        updated = 0
+        for i in range(0, len(order_ids), args.batch):
+            with SessionLocal() as db:
+                result = transition_orders(db, order_ids[i:i + args.batch], OrderStatus(status))
+                db.commit()
+            updated += len(result["updated"])
+        elapsed = time.perf_counter() - started
+        total_elapsed += elapsed
+        print(f"  -> {status:<18} {updated} orders in {elapsed:.2f} s -> {updated / elapsed:.0f} orders/s")
+    print(f"chain total: {args.orders * len(CHAIN) / total_elapsed:.0f} transitions/s")
+
+    worker = JobWorker(SessionLocal, batch_size=200)
+    started = time.perf_counter()
+    handled = 0
+    while (count := worker.run_once()):
+        handled += count
+    elapsed = time.perf_counter() - started
+    with SessionLocal() as db:
+        left = db.scalar(select(func.count()).select_from(Job).where(Job.status != JobStatus.done))
+    print(f"jobs: {handled} handled in {elapsed:.2f} s -> {handled / elapsed:.0f} jobs/s, not done: {left}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# scripts/bench_route_planner.py
+# Бенчмарк планировщика курьерских маршрутов (app.services.route_planner).
+#
+# --stops случайных адресов в радиусе --radius-km от склада (плотнее к центру),
+# у доли --windowed — часовые окна доставки в течение смены. Печатает:
+#   - длину маршрутов после «ближайшего соседа» и после 2-opt;
+#   - время планирования в процессе и в пуле из --workers процессов
+#     (первый вызов пула — с запуском процессов, дальше — тёплый пул);
+#   - опоздания по окнам.
+#
+# Примеры:
+#   python scripts/bench_route_planner.py
+#   python scripts/bench_route_planner.py --stops 5000 --max-stops 40 --workers 8
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Courier route planner benchmark")
+    parser.add_argument("--stops", type=int, default=2000, help="Стопов за день")
+    parser.add_argument("--max-stops", type=int, default=25, help="Стопов на курьера")
+    parser.add_argument("--radius-km", type=float, default=20, help="Радиус зоны доставки")
+    parser.add_argument("--windowed", type=float, default=0.3, help="Доля стопов с окном доставки")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Процессов в пуле")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов каждого замера")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import numpy as np
+
+    from app.core.config import settings
+    from app.services import route_planner as rp
+
+    rnd = np.random.default_rng(7)
+    depot = (settings.COURIER_DEPOT_LAT, settings.COURIER_DEPOT_LON)
+    distance = args.radius_km * np.sqrt(rnd.random(args.stops)) * rnd.random(args.stops)
+    bearing = rnd.random(args.stops) * 2 * np.pi
+    lat = depot[0] + distance * np.sin(bearing) / 111.2
+    lon = depot[1] + distance * np.cos(bearing) / (111.2 * np.cos(np.radians(depot[0])))
+    start_at = datetime(2024, 6, 3, 7)
+    stops = []
+    for i in range(args.stops):
+        window_start = window_end = None
+        if rnd.random() < args.windowed:
+            window_start = start_at + timedelta(hours=int(rnd.integers(1, 10)))
+            window_end = window_start + timedelta(hours=1)
+        stops.append({
+            "order_id": i + 1, "address": f"stop {i + 1}", "latitude": float(lat[i]), "longitude": float(lon[i]),
+            "window_start": window_start, "window_end": window_end,
+        })
+    print(f"{args.stops} stops within {args.radius_km:g} km, {args.windowed:.0%} with windows, "
+          f"{args.max_stops} per courier")
+
+    # --- Качество: ближайший сосед против ближайшего соседа + 2-opt (без окон) ---
+    clusters = rp.sweep_clusters(lat, lon, depot, args.max_stops)
+    seeded = improved = 0.0
+    started = time.perf_counter()
+    for indexes in clusters:
+        points_lat = np.concatenate(([depot[0]], lat[indexes]))
+        points_lon = np.concatenate(([depot[1]], lon[indexes]))
+        dist = rp.distance_matrix(points_lat, points_lon) * settings.COURIER_ROAD_FACTOR
+        no_window = np.full(len(points_lat), -np.inf), np.full(len(points_lat), np.inf)
+        tour = rp._nearest_neighbour(dist, *no_window, 0.0)
+        seeded += dist[tour[:-1], tour[1:]].sum()
+        tour = rp._two_opt(tour, dist, dist, *no_window, 0.0, timed=False)
+        improved += dist[tour[:-1], tour[1:]].sum()
+    print(f"  {len(clusters)} couriers: nearest neighbour {seeded:.0f} km, + 2-opt {improved:.0f} km "
+          f"({(1 - improved / seeded):.1%} shorter), {time.perf_counter() - started:.2f} s")
+
+    # --- Время планирования ---
+    def run(planner, label):
+        durations = []
+        for _ in range(args.repeat):
+            plan_started = time.perf_counter()
+            plan = planner.plan(stops, start_at, args.max_stops, depot)
+            durations.append(time.perf_counter() - plan_started)
+        late = sum(route["late_stops"] for route in plan["routes"])
+        windowed = sum(stop["window_end"] is not None for stop in stops)
+        print(f"  {label:<28} first {durations[0]:6.2f} s, best {min(durations):6.2f} s  "
+              f"({plan['distance_km']:.0f} km, {late}/{windowed} windowed stops late)")
+
+    run(rp.RoutePlanner(workers=1, parallel_min_stops=0), "in-process")
+    pool = rp.RoutePlanner(workers=args.workers, parallel_min_stops=0)
+    try:
+        run(pool, f"process pool x{args.workers}")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# scripts/bench_serialization.py
+# Бенчмарк сериализации больших списков (лента каталога, 1k/10k элементов).
+#
+# Сравниваются пути ответа FastAPI:
+#   before — эндпоинт отдаёт список словарей без response_model:
+#            jsonable_encoder обходит данные, затем JSONResponse (json.dumps);
+#   after  — response_model=CatalogPage из строк (from_attributes):
+#            pydantic-core готовит JSON-данные, ORJSONResponse (orjson.dumps);
+#   feed   — CatalogPage.model_dump_json(), как _render_page в app.api.products.
+# Замеряется и весь ASGI-вызов эндпоинта (без сети и БД), и отдельные шаги,
+# плюс размер и время сжатия (gzip, br — если установлен brotli).
+#
+# Примеры:
+#   python scripts/bench_serialization.py
+#   python scripts/bench_serialization.py --sizes 1000 10000 50000 --repeat 5
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# Строка SELECT CATALOG_COLUMNS (app.crud.product_crud)
+CatalogRow = namedtuple(
+    "CatalogRow", "post_id posted_at draft_id title description price quantity image_path"
+)
+
+
+def make_rows(count: int) -> list:
+    started = datetime(2024, 1, 1, 12, 0, 0, 123456)
+    return [
+        CatalogRow(
+            post_id=count - i,
+            posted_at=started - timedelta(seconds=i),
+            draft_id=count - i,
+            title=f"Товар {i} — куртка зимняя, размер {40 + i % 12}",
+            description="Тёплая куртка с капюшоном, мембрана, утеплитель 200 г. " * 2,
+            price=1990.0 + i % 500,
+            quantity=i % 30,
+            image_path=f"drafts/{i % 97}/{i}.jpg",
+        )
+        for i in range(count)
+    ]
+
+
+def best_of(repeat: int, func) -> float:
+    func()  # прогрев
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def build_apps(rows: list):
+    from fastapi import FastAPI, Response
+    from fastapi.responses import JSONResponse
+
+    from app.api.products import _render_page
+    from app.core.responses import ORJSONResponse
+    from app.crud.product_crud import catalog_item
+    from app.schemas.product import CatalogItem, CatalogPage
+    from app.services.image_variants import variant_url
+
+    before = FastAPI(default_response_class=JSONResponse)
+
+    @before.get("/api/products/feed")
+    def feed_before():
+        items = [catalog_item(row) for row in rows]
+        for item in items:
+            item["image_url"] = variant_url(item["image_path"], None)
+        return {"items": items, "next_cursor": None}
+
+    after = FastAPI(default_response_class=ORJSONResponse)
+
+    @after.get("/api/products/feed", response_model=CatalogPage)
+    def feed_after():
+        items = [CatalogItem.model_validate(row) for row in rows]
+        for item in items:
+            item.image_url = variant_url(item.image_path, None)
+        return CatalogPage(items=items)
+
+    @after.get("/api/products/feed-bytes")
+    def feed_bytes():
+        return Response(_render_page(rows, len(rows) + 1, None), media_type="application/json")
+
+    return before, after
+
+
+async def call(app, path: str) -> bytes:
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+
+def bench_size(count: int, args) -> None:
+    import gzip
+
+    from fastapi.encoders import jsonable_encoder
+
+    from app.core.compression import brotli
+    from app.core.responses import dumps
+    from app.crud.product_crud import catalog_item
+    from app.schemas.product import CatalogItem, CatalogPage
+
+    rows = make_rows(count)
+    dicts = [catalog_item(row) for row in rows]
+    page = CatalogPage(items=[CatalogItem.model_validate(row) for row in rows])
+    before_app, after_app = build_apps(rows)
+    loop = asyncio.new_event_loop()
+
+    def row_ms(label: str, seconds: float, base: float | None = None) -> None:
+        speedup = f"x{base / seconds:5.1f}" if base else ""
+        print(f"  {label:<50} {seconds * 1000:9.2f} ms {speedup}")
+
+    print(f"\n{count} items")
+    endpoint_before = best_of(args.repeat, lambda: loop.run_until_complete(call(before_app, "/api/products/feed")))
+    row_ms("endpoint before: dict + jsonable_encoder + json", endpoint_before)
+    row_ms("endpoint after: response_model + orjson",
+           best_of(args.repeat, lambda: loop.run_until_complete(call(after_app, "/api/products/feed"))),
+           endpoint_before)
+    row_ms("endpoint feed: model_dump_json (feed cache miss)",
+           best_of(args.repeat, lambda: loop.run_until_complete(call(after_app, "/api/products/feed-bytes"))),
+           endpoint_before)
+
+    print("  steps:")
+    encode_before = best_of(args.repeat, lambda: jsonable_encoder({"items": dicts}))
+    row_ms("jsonable_encoder(dicts)", encode_before)
+    encoded = jsonable_encoder({"items": dicts})
+    row_ms("json.dumps(encoded)", best_of(
+        args.repeat, lambda: json.dumps(encoded, ensure_ascii=False, separators=(",", ":")).encode()))
+    row_ms("CatalogItem.model_validate(rows)",
+           best_of(args.repeat, lambda: [CatalogItem.model_validate(row) for row in rows]))
+    row_ms("page.model_dump(mode=json)", best_of(args.repeat, lambda: page.model_dump(mode="json")), encode_before)
+    dumped = page.model_dump(mode="json")
+    row_ms("orjson dumps(dumped)", best_of(args.repeat, lambda: dumps(dumped)))
+    row_ms("page.model_dump_json()", best_of(args.repeat, lambda: page.model_dump_json()))
+
+    body = dumps(dumped)
+    print(f"  compression of {len(body) / 1024:.0f} KiB:")
+    for level in (1, 5, 9):
+        compressed = gzip.compress(body, compresslevel=level, mtime=0)
+        seconds = best_of(args.repeat, lambda: gzip.compress(body, compresslevel=level, mtime=0))
+        print(f"  {f'gzip level {level}':<50} {seconds * 1000:9.2f} ms  {len(compressed) / 1024:7.0f} KiB")
+    if brotli is not None:
+        for quality in (4, 6):
+            compressed = brotli.compress(body, quality=quality)
+            seconds = best_of(args.repeat, lambda: brotli.compress(body, quality=quality))
+            print(f"  {f'brotli quality {quality}':<50} {seconds * 1000:9.2f} ms  {len(compressed) / 1024:7.0f} KiB")
+    else:
+        print("  brotli не установлен — br пропущен")
+    loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Элементов в ответе")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов, берётся лучший")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='phoenix_serialization_')}/bench.db")
+    for count in args.sizes:
+        bench_size(count, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# scripts/import_from_excel.py
+# Потоковый импорт каталога поставщика (XLSX/CSV) в product_drafts.
+#
+# - файл читается построчно (openpyxl read_only / csv), целиком в памяти не держится;
+# - строки валидируются и пишутся пачками: Postgres — COPY + upsert,
+#   SQLite — executemany upsert (app.crud.product_crud.bulk_upsert_drafts);
+# - повторный импорт того же артикула обновляет товар (ключ creator_id + sku);
+# - пополненный остаток сначала уходит листу ожидания (promote_after_restock);
+# - после каждой пачки пишется checkpoint, --resume продолжает с него.
+#
+# Пример:
+#   python scripts/import_from_excel.py catalog.xlsx --creator-id 1 --batch-size 2000 --resume
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.core.catalog_cache import feed_cache
+from app.crud.product_crud import bulk_upsert_drafts
+from app.db.session import SessionLocal, engine
+from app.services.order_processing import promote_after_restock
+
+logger = logging.getLogger("import_from_excel")
+
+# Допустимые заголовки колонок (в нижнем регистре) -> поле ProductDraft
+COLUMN_ALIASES = {
+    "sku": ("sku", "артикул", "код", "код товара"),
+    "title": ("title", "название", "наименование", "товар"),
+    "description": ("description", "описание"),
+    "price": ("price", "цена", "цена, руб"),
+    "quantity": ("quantity", "количество", "кол-во", "остаток"),
+    "image_path": ("image", "image_path", "фото", "изображение"),
+}
+
+
+class RowError(ValueError):
+    """Строка не прошла валидацию."""
+
+
+def iter_xlsx(path: Path, sheet: str | None):
+    from openpyxl import load_workbook
+
+    # read_only: openpyxl читает лист потоково, не строя всю модель книги
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_csv(path: Path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def iter_rows(path: Path, sheet: str | None):
+    if path.suffix.lower() in (".xlsx", ".xlsm"):
+        return iter_xlsx(path, sheet)
+    return iter_csv(path)
+
+
+def map_header(header) -> dict[str, int]:
+    """Позиции нужных колонок по заголовку."""
+    positions = {}
+    for index, name in enumerate(header):
+        key = str(name or "").strip().lower()
+        for field, aliases in COLUMN_ALIASES.items():
+            if key in aliases and field not in positions:
+                positions[field] = index
+    missing = {"sku", "title", "price"} - positions.keys()
+    if missing:
+        raise SystemExit(f"В заголовке нет обязательных колонок: {', '.join(sorted(missing))}")
+    return positions
+
+
+def _number(value, field: str) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    cleaned = str(value or "").replace("\xa0", "").replace(" ", "").replace(",", ".")
+    try:
+        return float(cleaned)
+    except ValueError:
+        raise RowError(f"{field}: не число {value!r}")
+
+
+def validate_row(values, positions: dict[str, int], creator_id: int) -> dict:
+    def cell(field):
+        index = positions.get(field)
+        if index is None or index >= len(values):
+            return None
+        value = values[index]
+        if isinstance(value, str):
+            value = value.strip()
+        return value if value not in ("", None) else None
+
+    sku = cell("sku")
+    title = cell("title")
+    if sku is None:
+        raise RowError("пустой артикул")
+    if title is None:
+        raise RowError("пустое название")
+    price = _number(cell("price"), "price")
+    if price < 0:
+        raise RowError("отрицательная цена")
+    raw_quantity = cell("quantity")
+    quantity = 1 if raw_quantity is None else _number(raw_quantity, "quantity")
+    # 2.7 шт. — ошибка в файле, а не 2 шт.: такую строку отклоняем, а не округляем
+    if not float(quantity).is_integer():
+        raise RowError(f"quantity: не целое число {raw_quantity!r}")
+    quantity = int(quantity)
+    if quantity < 0:
+        raise RowError("отрицательное количество")
+    description = cell("description")
+    image_path = cell("image_path")
+    return {
+        "creator_id": creator_id,
+        "sku": str(sku)[:255],
+        "title": str(title),
+        "description": None if description is None else str(description),
+        "price": price,
+        "quantity": quantity,
+        "image_path": None if image_path is None else str(image_path),
+    }
+
+
+def load_checkpoint(path: Path, source: Path, resume: bool) -> dict:
+    fingerprint = {"source": str(source.resolve()), "size": source.stat().st_size, "mtime": source.stat().st_mtime}
+    if resume and path.exists():
+        state = json.loads(path.read_text())
+        if all(state.get(k) == v for k, v in fingerprint.items()):
+            return state
+        logger.warning("Checkpoint относится к другому файлу или файл изменился — начинаем с начала")
+    return dict(fingerprint, rows_done=0, imported=0, invalid=0, batches=0)
+
+
+def save_checkpoint(path: Path, state: dict) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def write_batch(batch: dict[str, dict], state: dict, checkpoint: Path, rows_done: int) -> None:
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        written = bulk_upsert_drafts(connection, list(batch.values()))
+    # Пополненный остаток сначала получает лист ожидания, а не новые покупатели
+    with SessionLocal() as db:
+        creator_id = next(iter(batch.values()))["creator_id"]
+        promoted = promote_after_restock(db, creator_id, list(batch))
+        db.commit()
+    # Upsert обновляет и опубликованные товары: кэш ленты воркеров сбрасывается через журнал
+    feed_cache.invalidate()
+    elapsed = time.perf_counter() - started
+    state["rows_done"] = rows_done
+    state["imported"] += written
+    state["batches"] += 1
+    save_checkpoint(checkpoint, state)
+    logger.info(
+        f"batch #{state['batches']}: {written} rows in {elapsed * 1000:.0f} ms "
+        f"({written / elapsed if elapsed else 0:.0f} rows/s), total {state['imported']}"
+        + (f", waitlist promoted to {len(promoted)} orders" if promoted else "")
+    )
+
+
+def run(args) -> dict:
+    source = Path(args.file)
+    checkpoint = Path(args.checkpoint or f"{source}.checkpoint.json")
+    state = load_checkpoint(checkpoint, source, args.resume)
+    skip = state["rows_done"]
+    if skip:
+        logger.info(f"Продолжаем с checkpoint: пропускаем {skip} уже обработанных строк")
+
+    rows = iter_rows(source, args.sheet)
+    positions = map_header(next(rows))
+    started = time.perf_counter()
+    # Пачка по артикулу: внутри одного upsert ключ должен быть уникальным,
+    # при повторе артикула в файле побеждает последняя строка
+    batch: dict[str, dict] = {}
+    rows_done = 0
+    for values in rows:
+        rows_done += 1
+        if rows_done <= skip:
+            continue
+        if not values or all(v in (None, "") for v in values):
+            continue
+        try:
+            row = validate_row(values, positions, args.creator_id)
+        except RowError as e:
+            state["invalid"] += 1
+            if state["invalid"] <= args.max_reported_errors:
+                logger.warning(f"строка {rows_done + 1}: {e}")
+            continue
+        batch[row["sku"]] = row
+        if len(batch) >= args.batch_size:
+            write_batch(batch, state, checkpoint, rows_done)
+            batch = {}
+    if batch:
+        write_batch(batch, state, checkpoint, rows_done)
+    elif rows_done > state["rows_done"]:
+        state["rows_done"] = rows_done
+        save_checkpoint(checkpoint, state)
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Готово: {state['imported']} строк записано, {state['invalid']} отклонено, "
+        f"{elapsed:.1f} s ({(rows_done - skip) / elapsed if elapsed else 0:.0f} rows/s)"
+    )
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming import of supplier catalogs into product_drafts")
+    parser.add_argument("file", help="Путь к .xlsx или .csv")
+    parser.add_argument("--creator-id", type=int, required=True, help="id пользователя-автора черновиков")
+    parser.add_argument("--sheet", default=None, help="Имя листа XLSX (по умолчанию активный)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", default=None, help="Файл checkpoint (по умолчанию <file>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="Продолжить с последнего checkpoint")
+    parser.add_argument("--max-reported-errors", type=int, default=50)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
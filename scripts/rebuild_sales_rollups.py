@@ -0,0 +1,63 @@
+# scripts/rebuild_sales_rollups.py
+# Пересчёт агрегатов продаж (sales_daily, sales_product_daily, sales_creator_daily)
+# из orders/order_items: первичное заполнение после выкладки, исправление после
+# массовых правок заказов в обход transition_orders.
+# Период обрабатывается кусками по --chunk-days, каждый — своей транзакцией:
+# на Postgres запись в orders ждёт только пересчёт текущего куска.
+#
+# Примеры:
+#   python scripts/rebuild_sales_rollups.py                       # вся история
+#   python scripts/rebuild_sales_rollups.py --from 2024-01-01 --to 2024-03-31
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild sales rollup tables")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="Первый день, YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Последний день, YYYY-MM-DD")
+    parser.add_argument("--chunk-days", type=int, default=31, help="Дней в одной транзакции")
+    args = parser.parse_args()
+
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    import app.models.user, app.models.product, app.models.cart, app.models.order, app.models.sales  # noqa: F401
+    from app.services import sales_rollups
+
+    # Таблицы агрегатов могли ещё не создаваться (create_all не трогает существующие)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        bounds = sales_rollups.order_days(db)
+    if bounds is None and (args.date_from is None or args.date_to is None):
+        print("No orders, nothing to rebuild")
+        return
+    date_from = args.date_from or bounds[0]
+    date_to = args.date_to or bounds[1]
+    if date_from > date_to:
+        parser.error("--from is after --to")
+
+    started = time.perf_counter()
+    totals: dict[str, int] = {}
+    chunk_start = date_from
+    while chunk_start <= date_to:
+        chunk_end = min(date_to, chunk_start + timedelta(days=args.chunk_days - 1))
+        with SessionLocal() as db:
+            counts = sales_rollups.rebuild(db, chunk_start, chunk_end)
+            db.commit()
+        for table, count in counts.items():
+            totals[table] = totals.get(table, 0) + count
+        print(f"{chunk_start} .. {chunk_end}: " + ", ".join(f"{table} {count}" for table, count in counts.items()))
+        chunk_start = chunk_end + timedelta(days=1)
+    print(f"Rebuilt {date_from} .. {date_to} in {time.perf_counter() - started:.1f} s: "
+          + ", ".join(f"{table} {count}" for table, count in totals.items()))
+
+
+if __name__ == "__main__":
+    main()
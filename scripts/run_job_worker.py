@@ -0,0 +1,59 @@
+# scripts/run_job_worker.py
+# Отдельный процесс-воркер очереди фоновых задач (таблица jobs).
+# Можно запускать несколько экземпляров: задачи разбираются через SKIP LOCKED.
+#
+# Примеры:
+#   python scripts/run_job_worker.py
+#   python scripts/run_job_worker.py --once          # одна пачка и выход
+import argparse
+import logging
+import signal
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+def main():
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Background job worker")
+    parser.add_argument("--batch-size", type=int, default=settings.JOB_BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=settings.JOB_POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Обработать готовые задачи и выйти")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    import app.models.user, app.models.product, app.models.cart, app.models.order, app.models.job, app.models.sales  # noqa: F401
+    from app.services.job_queue import JobWorker
+    from app.services.notifications import notification_dispatcher
+
+    worker = JobWorker(
+        batch_size=args.batch_size,
+        poll_interval=args.poll_interval,
+        visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT,
+    )
+    # Уведомления из обработчиков задач отправляются из этого же процесса
+    notification_dispatcher.start_in_thread()
+    try:
+        if args.once:
+            total = 0
+            while (handled := worker.run_once()):
+                total += handled
+            print(f"handled {total} jobs: {worker.stats()}")
+            return
+
+        signal.signal(signal.SIGTERM, lambda *_: worker._stop.set())
+        logging.getLogger(__name__).info(f"Job worker {worker.worker_id} started")
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            pass
+    finally:
+        notification_dispatcher.stop_thread()
+
+
+if __name__ == "__main__":
+    main()
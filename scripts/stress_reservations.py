@@ -0,0 +1,136 @@
+# scripts/stress_reservations.py
+# Стресс-тест резервирования (app.services.order_processing).
+#
+# Сотни пользователей одновременно резервируют несколько «горячих» товаров.
+# Скрипт печатает резервирований в секунду и проверяет инварианты:
+#   - остаток товара никогда не уходит в минус;
+#   - начальный остаток = текущий остаток + зарезервировано;
+#   - позиции в листе ожидания по каждому товару идут подряд 1..N;
+#   - каждая позиция корзины либо зарезервирована, либо в листе ожидания.
+# Код выхода 1, если инвариант нарушен.
+#
+# Примеры:
+#   python scripts/stress_reservations.py --users 500 --drafts 5 --stock 100
+#   python scripts/stress_reservations.py --mode single   # без батчинга, для сравнения
+#   python scripts/stress_reservations.py --database-url postgresql://...  # пустая тестовая БД!
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+def seed(SessionLocal, args):
+    from app.models.cart import CartItem
+    from app.models.product import ProductDraft
+    from app.models.user import User
+
+    rnd = random.Random(7)
+    with SessionLocal() as db:
+        creator = User(phone="stress-creator")
+        db.add(creator)
+        db.flush()
+        drafts = [
+            ProductDraft(creator_id=creator.id, title=f"Hot {i}", price=500, quantity=args.stock, published=True)
+            for i in range(args.drafts)
+        ]
+        users = [User(phone=f"stress-{i}") for i in range(args.users)]
+        db.add_all(drafts + users)
+        db.flush()
+        lines = 0
+        for user in users:
+            for draft in rnd.sample(drafts, k=rnd.randint(1, min(3, len(drafts)))):
+                db.add(CartItem(user_id=user.id, draft_id=draft.id, quantity=rnd.randint(1, 2)))
+                lines += 1
+        db.commit()
+        return [u.id for u in users], {d.id: args.stock for d in drafts}, lines
+
+
+def verify(SessionLocal, initial_stock, lines_total, results) -> list[str]:
+    from sqlalchemy import func, select
+
+    from app.models.order import OrderItem, WaitlistEntry
+    from app.models.product import ProductDraft
+
+    errors = []
+    with SessionLocal() as db:
+        remaining = dict(db.execute(select(ProductDraft.id, ProductDraft.quantity)
+                                    .where(ProductDraft.id.in_(initial_stock))).all())
+        reserved = dict(db.execute(select(OrderItem.draft_id, func.sum(OrderItem.quantity))
+                                   .group_by(OrderItem.draft_id)).all())
+        positions = defaultdict(list)
+        for draft_id, position in db.execute(select(WaitlistEntry.draft_id, WaitlistEntry.position)):
+            positions[draft_id].append(position)
+    for draft_id, initial in initial_stock.items():
+        if remaining[draft_id] < 0:
+            errors.append(f"draft {draft_id}: negative stock {remaining[draft_id]}")
+        if remaining[draft_id] + (reserved.get(draft_id) or 0) != initial:
+            errors.append(f"draft {draft_id}: {remaining[draft_id]} left + {reserved.get(draft_id)} reserved != {initial}")
+        if sorted(positions[draft_id]) != list(range(1, len(positions[draft_id]) + 1)):
+            errors.append(f"draft {draft_id}: waitlist positions are not contiguous")
+    handled = sum(len(r["items"]) + len(r["waitlisted"]) for r in results)
+    if handled != lines_total:
+        errors.append(f"{handled} cart lines handled, expected {lines_total}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent stock reservation stress test")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--drafts", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--mode", choices=("batched", "single"), default="batched")
+    parser.add_argument("--database-url", default=None, help="По умолчанию — временная SQLite")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or (
+        f"sqlite:///{tempfile.mkdtemp(prefix='phoenix_stress_')}/stress.db"
+    )
+
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    import app.models.user, app.models.product, app.models.cart, app.models.order  # noqa: F401
+    from app.services.order_processing import ReservationBatcher, run_reservation
+
+    Base.metadata.create_all(bind=engine)
+    user_ids, initial_stock, lines_total = seed(SessionLocal, args)
+
+    batcher = ReservationBatcher(SessionLocal, max_batch=100, window_seconds=0.002)
+
+    def reserve_single(user_id):
+        return run_reservation(SessionLocal, [user_id], attempts=20)[user_id]
+
+    reserve = batcher.reserve if args.mode == "batched" else reserve_single
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(reserve, user_ids))
+    elapsed = time.perf_counter() - started
+    batcher.shutdown()
+
+    reserved = sum(1 for r in results if r["order_id"] is not None)
+    waitlisted = sum(len(r["waitlisted"]) for r in results)
+    print(f"{engine.dialect.name}, mode={args.mode}, {args.users} users, {args.drafts} drafts x {args.stock} stock")
+    print(f"{len(results)} reservations in {elapsed:.2f} s -> {len(results) / elapsed:.0f} reservations/s")
+    print(f"orders created: {reserved}, waitlisted lines: {waitlisted}")
+    if args.mode == "batched":
+        print(f"batcher: {batcher.stats()}")
+
+    errors = verify(SessionLocal, initial_stock, lines_total, results)
+    for error in errors:
+        print("INVARIANT VIOLATED:", error)
+    if errors:
+        sys.exit(1)
+    print("OK: stock never negative, stock + reserved == initial, waitlist positions contiguous")
+
+
+if __name__ == "__main__":
+    main()